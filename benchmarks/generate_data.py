@@ -0,0 +1,166 @@
+"""生成性能测试用的模拟数据
+
+使用 database.Database 创建数据库，表结构、迁移、触发器与正式数据库完全一致，
+积分汇总、积分分配和全文索引都由触发器在写入时维护。
+
+    python -m benchmarks.generate_data 100k
+    python -m benchmarks.generate_data 10k --db benchmarks/data/custom.db --students 500
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import time
+from datetime import date, timedelta
+
+from database import STUDENT_IDENTITY, Database
+from utils.data_manager import GRADE_FILE_NAME, MAJOR_FILE_NAME
+
+# 预设规模：(学生数, 处分记录数, 公益活动记录数)
+SCALES = {
+    "1k": (200, 1000, 1000),
+    "10k": (2000, 10000, 10000),
+    "100k": (20000, 100000, 100000),
+    "1m": (200000, 1000000, 1000000),
+}
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA_DIR = os.path.join(BENCHMARK_DIR, "data")
+REFERENCE_DATA_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), "data")
+
+# 每个事务写入的行数
+BATCH_SIZE = 10000
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈姚卢姜崔钟谭陆汪范金石廖贾夏韦付方白邹孟熊秦邱江尹薛闫段雷侯龙史陶黎贺顾毛郝龚邵万钱严覃武戴莫孔向汤"
+GIVEN_NAME_CHARS = "伟芳娜秀英敏静丽强磊军洋勇艳杰娟涛明超秀兰霞平刚桂英华玉兰萍红鹏辉玲丹飞建华宇浩然子涵欣怡梓轩雨萱一诺思远佳琪俊杰晨曦嘉怡"
+PUNISHMENT_REASONS = [
+    "上课迟到", "旷课", "考试作弊", "宿舍使用违规电器", "夜不归宿", "打架斗殴",
+    "顶撞老师", "抽烟", "破坏公物", "私自外出", "晚自习缺勤", "酗酒",
+]
+ACTIVITY_CONTENTS = [
+    "校园卫生清扫", "图书馆整理图书", "社区敬老院志愿服务", "食堂帮厨", "运动会志愿者",
+    "献血", "交通文明引导", "植树活动", "迎新志愿服务", "宿舍楼值班",
+]
+
+
+def random_name(rng):
+    return rng.choice(SURNAMES) + "".join(rng.choice(GIVEN_NAME_CHARS) for _ in range(rng.choice((1, 2, 2))))
+
+
+def random_date(rng, start=date(2021, 9, 1), days=1200):
+    return (start + timedelta(days=rng.randrange(days))).isoformat()
+
+
+def insert_batches(db, statement, rows, total, label, progress):
+    """按批在各自的事务中写入，rows 为生成器，返回写入的行数"""
+    batch = []
+    done = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            with db.writer() as conn:
+                conn.executemany(statement, batch)
+            done += len(batch)
+            batch = []
+            progress(f"{label}: {done}/{total}")
+    if batch:
+        with db.writer() as conn:
+            conn.executemany(statement, batch)
+        done += len(batch)
+        progress(f"{label}: {done}/{total}")
+    return done
+
+
+def generate(db_path, students, punishments, activities, seed=0, progress=print):
+    """生成模拟数据库，返回各表的实际行数
+
+    已存在的 db_path 会被删除后重新生成。年级.txt 和 专业.txt 从项目 data 目录复制到数据库所在目录。
+    """
+    data_dir = os.path.dirname(os.path.abspath(db_path))
+    os.makedirs(data_dir, exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    for file_name in (GRADE_FILE_NAME, MAJOR_FILE_NAME):
+        if os.path.abspath(data_dir) != os.path.abspath(REFERENCE_DATA_DIR):
+            shutil.copyfile(os.path.join(REFERENCE_DATA_DIR, file_name), os.path.join(data_dir, file_name))
+    
+    rng = random.Random(seed)
+    started_at = time.perf_counter()
+    db = Database(db_path)
+    try:
+        classes = db.get_classes()
+        
+        def student_rows():
+            for _ in range(students):
+                class_id, grade_id, _ = rng.choice(classes)
+                yield (random_name(rng), rng.choice("男女"), grade_id, class_id)
+        
+        # 姓名、性别、年级、专业班级都相同的学生只保留一个，实际学生数可能略少
+        insert_batches(db, f"""
+            INSERT INTO students (name, gender, grade_id, class_id) VALUES (?, ?, ?, ?)
+            ON CONFLICT ({STUDENT_IDENTITY}) DO NOTHING
+        """, student_rows(), students, "学生", progress)
+        
+        with db.reader() as conn:
+            student_ids = [row[0] for row in conn.execute("SELECT id FROM students")]
+            punishment_types = conn.execute("SELECT id, required_points FROM punishment_types").fetchall()
+        
+        def punishment_rows():
+            for _ in range(punishments):
+                type_id, required_points = rng.choice(punishment_types)
+                yield (rng.choice(student_ids), type_id, rng.choice(PUNISHMENT_REASONS),
+                       random_date(rng), required_points, 1 if rng.random() < 0.2 else 0)
+        
+        insert_batches(db, """
+            INSERT INTO punishments (student_id, type_id, reason, date, required_points, is_cleared)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, punishment_rows(), punishments, "处分记录", progress)
+        
+        def activity_rows():
+            for _ in range(activities):
+                duration = rng.choice((0.5, 1.0, 1.5, 2.0, 3.0, 4.0))
+                yield (rng.choice(student_ids), rng.choice(ACTIVITY_CONTENTS), random_date(rng),
+                       duration, int(duration * 5))
+        
+        insert_batches(db, """
+            INSERT INTO activities (student_id, content, date, duration, points)
+            VALUES (?, ?, ?, ?, ?)
+        """, activity_rows(), activities, "公益活动记录", progress)
+        
+        with db.writer() as conn:
+            conn.execute("ANALYZE")
+        with db.reader() as conn:
+            counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                      for table in ("students", "punishments", "activities")}
+    finally:
+        db.close()
+    
+    progress(f"生成完成，用时 {time.perf_counter() - started_at:.1f} 秒：{counts}")
+    return counts
+
+
+def scale_db_path(scale, data_dir=DEFAULT_DATA_DIR):
+    return os.path.join(data_dir, f"benchmark_{scale}.db")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成性能测试用的模拟数据库")
+    parser.add_argument("scale", choices=sorted(SCALES), help="预设规模")
+    parser.add_argument("--db", help="数据库文件路径，默认 benchmarks/data/benchmark_<规模>.db")
+    parser.add_argument("--students", type=int, help="学生数，默认按规模")
+    parser.add_argument("--punishments", type=int, help="处分记录数，默认按规模")
+    parser.add_argument("--activities", type=int, help="公益活动记录数，默认按规模")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    args = parser.parse_args()
+    
+    students, punishments, activities = SCALES[args.scale]
+    generate(args.db or scale_db_path(args.scale),
+             args.students or students, args.punishments or punishments, args.activities or activities,
+             args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""界面主要操作的性能测试
+
+在无界面（QT_QPA_PLATFORM=offscreen）模式下创建各标签页，对每个规模的模拟数据库
+计时以下操作，结果写入 JSON 文件便于比较不同版本：
+
+- PunishmentTab.refreshTable / searchPunishment：到第一页数据加载完成
+- ActivityTab.refreshTable：到第一页数据加载完成
+- StatisticsTab.searchRecords：到统计表格更新，分别计时不使用结果缓存和命中缓存的情况
+- StatisticsTab.exportToExcel / ActivityTab.exportToExcel：到文件写入完成
+
+    python -m benchmarks.run_benchmarks --scales 1k 100k --repeat 5
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QEventLoop, QThreadPool, QTimer
+from PyQt5.QtWidgets import QApplication, QFileDialog, QMessageBox
+
+from benchmarks.generate_data import BENCHMARK_DIR, DEFAULT_DATA_DIR, SCALES, generate, scale_db_path
+from database import Database
+
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+# 单次操作的最长等待时间（秒）
+OPERATION_TIMEOUT = 600
+
+
+def wait_for_signal(signal, timeout=OPERATION_TIMEOUT):
+    """运行事件循环直到 signal 发出，超时时抛出 TimeoutError"""
+    loop = QEventLoop()
+    timer = QTimer()
+    timer.setSingleShot(True)
+    timer.timeout.connect(loop.quit)
+    signal.connect(loop.quit)
+    timer.start(int(timeout * 1000))
+    try:
+        loop.exec_()
+    finally:
+        signal.disconnect(loop.quit)
+    # 信号发出时计时器仍在运行，否则是计时器到期结束了事件循环
+    if not timer.isActive():
+        raise TimeoutError("操作超时")
+    timer.stop()
+
+
+def wait_until(condition, timeout=OPERATION_TIMEOUT):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("操作超时")
+        QApplication.processEvents(QEventLoop.AllEvents, 50)
+        QThreadPool.globalInstance().waitForDone(10)
+
+
+def time_operation(start, wait):
+    started_at = time.perf_counter()
+    start()
+    wait()
+    return time.perf_counter() - started_at
+
+
+def silence_dialogs(export_dir):
+    """替换会阻塞的对话框：消息框直接返回，保存文件对话框返回临时目录中的文件"""
+    for name in ("information", "warning", "critical"):
+        setattr(QMessageBox, name, staticmethod(lambda *args: QMessageBox.Ok))
+    QMessageBox.question = staticmethod(lambda *args: QMessageBox.Yes)
+    
+    def save_file_name(parent, caption, default_name, *args):
+        file_name = os.path.basename(default_name) or "export.xlsx"
+        return os.path.join(export_dir, file_name), ""
+    QFileDialog.getSaveFileName = staticmethod(save_file_name)
+
+
+def benchmark_database(db_path, repeat):
+    """对一个数据库计时各操作，返回 {操作名: [每次用时（秒）, ...]}"""
+    from ui.activity_tab import ActivityTab
+    from ui.punishment_tab import PunishmentTab
+    from ui.statistics_tab import StatisticsTab
+    
+    db = Database(db_path)
+    try:
+        with db.reader() as conn:
+            # 取一个处分数较多的学生姓名的前两个字作为查询条件
+            search_name = conn.execute("""
+                SELECT s.name FROM punishments p JOIN students s ON s.id = p.student_id
+                GROUP BY s.id ORDER BY COUNT(*) DESC LIMIT 1
+            """).fetchone()[0][:2]
+        
+        timings = {}
+        
+        def run(name, start, wait):
+            timings[name] = [time_operation(start, wait) for _ in range(repeat)]
+        
+        constructed_at = time.perf_counter()
+        punishment_tab = PunishmentTab(db)
+        wait_for_signal(punishment_tab.loader.pageLoaded)
+        activity_tab = ActivityTab(db)
+        wait_for_signal(activity_tab.loader.pageLoaded)
+        statistics_tab = StatisticsTab(db)
+        timings["create_tabs"] = [time.perf_counter() - constructed_at]
+        
+        run("PunishmentTab.refreshTable", punishment_tab.refreshTable,
+            lambda: wait_for_signal(punishment_tab.loader.pageLoaded))
+        
+        def search_punishment():
+            punishment_tab.name_edit.setText(search_name)
+            punishment_tab.searchPunishment()
+        run("PunishmentTab.searchPunishment", search_punishment,
+            lambda: wait_for_signal(punishment_tab.loader.pageLoaded))
+        
+        run("ActivityTab.refreshTable", activity_tab.refreshTable,
+            lambda: wait_for_signal(activity_tab.loader.pageLoaded))
+        
+        # 不使用结果缓存时的查询耗时，以及命中缓存（数据未修改时重复同一查询）的耗时
+        def search_statistics():
+            db.statistics_cache.clear()
+            statistics_tab.searchRecords()
+        run("StatisticsTab.searchRecords", search_statistics,
+            lambda: wait_for_signal(statistics_tab.model.modelReset))
+        run("StatisticsTab.searchRecords（缓存）", statistics_tab.searchRecords, lambda: None)
+        
+        run("StatisticsTab.exportToExcel", statistics_tab.exportToExcel,
+            lambda: wait_until(lambda: not statistics_tab.export_runner.isRunning()))
+        run("ActivityTab.exportToExcel", activity_tab.exportToExcel,
+            lambda: wait_until(lambda: not activity_tab.export_runner.isRunning()))
+        
+        with db.reader() as conn:
+            counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                      for table in ("students", "punishments", "activities")}
+        return counts, timings
+    finally:
+        db.close()
+
+
+def summarize(runs):
+    return {
+        "runs": [round(value, 6) for value in runs],
+        "min": round(min(runs), 6),
+        "median": round(statistics.median(runs), 6),
+        "max": round(max(runs), 6),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="界面主要操作的性能测试")
+    parser.add_argument("--scales", nargs="+", choices=sorted(SCALES), default=["1k"], help="测试的数据规模")
+    parser.add_argument("--repeat", type=int, default=3, help="每个操作重复的次数")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="模拟数据库所在目录")
+    parser.add_argument("--regenerate", action="store_true", help="重新生成已存在的模拟数据库")
+    parser.add_argument("--output", help="结果文件路径，默认 benchmarks/results/benchmark_<时间>.json")
+    args = parser.parse_args()
+    
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "scales": {},
+    }
+    
+    with tempfile.TemporaryDirectory() as export_dir:
+        silence_dialogs(export_dir)
+        for scale in args.scales:
+            db_path = scale_db_path(scale, args.data_dir)
+            if args.regenerate or not os.path.exists(db_path):
+                print(f"生成 {scale} 规模的模拟数据...")
+                generate(db_path, *SCALES[scale], progress=lambda message: None)
+            
+            print(f"测试 {scale} 规模...")
+            counts, timings = benchmark_database(db_path, args.repeat)
+            results["scales"][scale] = {
+                "rows": counts,
+                "timings": {name: summarize(runs) for name, runs in timings.items()},
+            }
+            for name, runs in timings.items():
+                print(f"  {name}: 中位数 {statistics.median(runs) * 1000:.1f} ms")
+    
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
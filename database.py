@@ -1,137 +1,1397 @@
-import sqlite3
-import os
-
-class Database:
-    def __init__(self, db_path):
-        try:
-            # 确保数据目录存在
-            os.makedirs(os.path.dirname(db_path), exist_ok=True)
-            
-            # 连接到数据库
-            self.conn = sqlite3.connect(db_path)
-            self.cursor = self.conn.cursor()
-            self.create_tables()
-            self.initialize_data()
-        except Exception as e:
-            print(f"数据库初始化失败: {str(e)}")
-            raise
-    
-    def create_tables(self):
-        try:
-            # 创建年级表
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS grades (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL UNIQUE
-            )
-            ''')
-            
-            # 创建专业班级表
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS classes (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL UNIQUE
-            )
-            ''')
-            
-            # 创建学生表
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS students (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                gender TEXT NOT NULL,
-                grade_id INTEGER,
-                class_id INTEGER,
-                FOREIGN KEY (grade_id) REFERENCES grades (id),
-                FOREIGN KEY (class_id) REFERENCES classes (id)
-            )
-            ''')
-            
-            # 创建处分类型表
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS punishment_types (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL UNIQUE,
-                required_points INTEGER NOT NULL,
-                display_order INTEGER NOT NULL DEFAULT 0
-            )
-            ''')
-            
-            # 创建处分记录表
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS punishments (
-                id INTEGER PRIMARY KEY,
-                student_id INTEGER,
-                type_id INTEGER,
-                reason TEXT,
-                date TEXT,
-                required_points INTEGER,
-                is_cleared INTEGER DEFAULT 0,
-                FOREIGN KEY (student_id) REFERENCES students (id),
-                FOREIGN KEY (type_id) REFERENCES punishment_types (id)
-            )
-            ''')
-            
-            # 创建公益活动记录表
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS activities (
-                id INTEGER PRIMARY KEY,
-                student_id INTEGER,
-                content TEXT,
-                date TEXT,
-                duration REAL,
-                points INTEGER,
-                punishment_id INTEGER,
-                FOREIGN KEY (student_id) REFERENCES students (id),
-                FOREIGN KEY (punishment_id) REFERENCES punishments (id)
-            )
-            ''')
-            
-            self.conn.commit()
-        except Exception as e:
-            print(f"创建数据表失败: {str(e)}")
-            self.conn.rollback()
-            raise
-    
-    def initialize_data(self):
-        try:
-            # 初始化年级数据
-            grades = ["2020级", "2021级", "2022级", "2023级"]
-            for grade in grades:
-                self.cursor.execute("INSERT OR IGNORE INTO grades (name) VALUES (?)", (grade,))
-            
-            # 初始化专业班级数据
-            classes = ["计算机科学与技术1班", "计算机科学与技术2班", 
-                      "软件工程1班", "软件工程2班",
-                      "人工智能1班", "人工智能2班",
-                      "数据科学与大数据技术1班", "数据科学与大数据技术2班"]
-            for cls in classes:
-                self.cursor.execute("INSERT OR IGNORE INTO classes (name) VALUES (?)", (cls,))
-            
-            # 初始化处分类型数据
-            punishment_types = [
-                ("警告", 20),
-                ("严重警告", 40),
-                ("记过", 60),
-                ("留校察看一学期", 80),
-                ("留校察看一学年", 100),
-                ("留校察看两学年", 120),
-                ("开除学籍", 0)  # 开除学籍不需要核销
-            ]
-            for i, (name, points) in enumerate(punishment_types):
-                self.cursor.execute("INSERT OR IGNORE INTO punishment_types (name, required_points, display_order) VALUES (?, ?, ?)", 
-                                   (name, points, i))
-            
-            self.conn.commit()
-        except Exception as e:
-            print(f"初始化数据失败: {str(e)}")
-            self.conn.rollback()
-            raise
-    
-    def close(self):
-        try:
-            if self.conn:
-                self.conn.close()
-        except Exception as e:
-            print(f"关闭数据库连接失败: {str(e)}")
+import json
+import sqlite3
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.request import pathname2url
+from utils.data_manager import DataManager
+from utils.event_bus import EventBus
+from utils.name_index import NameIndex
+from utils.result_cache import ResultCache
+
+# 连接池中只读连接的最大数量
+READER_CONNECTIONS = 4
+
+# 每个连接打开后设置的 PRAGMA，按顺序执行。
+# cache_size 为负数时单位是 KiB，这里约为 64MB；mmap_size 单位是字节。
+CONNECTION_PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -64000),
+    ("mmap_size", 256 * 1024 * 1024),
+    ("temp_store", "MEMORY"),
+]
+
+
+# 需要的最低 SQLite 版本：find_or_create_student 使用 RETURNING 子句（3.35），
+# 积分分配使用 UPDATE ... FROM（3.33），全文索引优先使用 trigram 分词器（3.34）
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+# 每个连接缓存的已编译语句数（sqlite3.connect 的 cached_statements）。
+# repository 中的语句文本固定，同一形状的查询可以直接复用缓存中的语句。
+STATEMENT_CACHE_SIZE = 256
+
+# 学生身份唯一索引 idx_students_identity 的列，也是写入学生时 ON CONFLICT 的冲突目标。
+# UNIQUE 索引中 NULL 互不相等，年级、专业班级为空时按 0 比较，使其同样只保留一条记录。
+STUDENT_IDENTITY = "name, gender, IFNULL(grade_id, 0), IFNULL(class_id, 0)"
+
+# 单次执行（含读取结果）超过该秒数的语句写入慢查询日志
+SLOW_QUERY_THRESHOLD = 0.2
+# 慢查询日志文件名，与数据库文件放在同一目录
+SLOW_QUERY_LOG_NAME = "slow_queries.log"
+# 逐行迭代结果时，每读取多少行把累计的耗时和行数汇总一次
+ITERATION_FLUSH_ROWS = 1000
+
+# 调用位置显示为相对于程序目录的路径
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def connect(db_path, stats=None, **kwargs):
+    """创建数据库连接并应用 CONNECTION_PRAGMAS 中的设置
+
+    WAL 模式下提交只需追加写日志，读操作不会阻塞写操作；
+    传入 stats（QueryStats）时返回 InstrumentedConnection，记录之后执行的每条语句；
+    未指定 cached_statements 时使用 STATEMENT_CACHE_SIZE。
+    额外的关键字参数原样传给 sqlite3.connect。
+    """
+    if stats is not None:
+        kwargs["factory"] = InstrumentedConnection
+    kwargs.setdefault("cached_statements", STATEMENT_CACHE_SIZE)
+    conn = sqlite3.connect(db_path, **kwargs)
+    if stats is not None:
+        conn.stats = stats
+    for name, value in CONNECTION_PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+class StatementStats:
+    """一条语句（按去掉多余空白后的 SQL 区分）的累计统计"""
+    
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.rows = 0
+        self.call_sites = Counter()
+    
+    @property
+    def average_time(self):
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+class Execution:
+    """语句的一次执行，累计 execute 和读取结果所用的时间及行数
+
+    累计耗时超过阈值时立即获取 EXPLAIN QUERY PLAN：此时仍在执行语句的游标方法中，
+    连接由当前线程使用。finish 可能在游标被回收时调用，只写日志，不再执行语句。
+    """
+    
+    def __init__(self, stats, connection, key, sql, parameters, call_site):
+        self.stats = stats
+        self.connection = connection
+        self.key = key
+        self.sql = sql
+        self.parameters = parameters
+        self.call_site = call_site
+        self.elapsed = 0.0
+        self.rows = 0
+        self.pending_time = 0.0
+        self.pending_rows = 0
+        self.plan = None
+    
+    def add(self, elapsed, rows, flush=True):
+        self.elapsed += elapsed
+        self.rows += rows
+        self.pending_time += elapsed
+        self.pending_rows += rows
+        if self.plan is None and self.parameters is not None and self.elapsed >= self.stats.slow_threshold:
+            self.plan = explain_query_plan(self.connection, self.sql, self.parameters)
+        if flush:
+            self.flush()
+    
+    def flush(self):
+        if self.pending_time or self.pending_rows:
+            self.stats.add(self)
+    
+    def finish(self):
+        """结果读取完毕、游标再次执行或被关闭时调用，超过阈值的写入慢查询日志"""
+        self.flush()
+        if self.elapsed >= self.stats.slow_threshold:
+            self.stats.logSlowQuery(self)
+
+
+class QueryStats:
+    """各连接共享的语句统计，可在多个线程中同时记录
+    
+    statements 以规范化的 SQL 为键；单次执行超过 slow_threshold 秒的语句
+    连同参数和 EXPLAIN QUERY PLAN 追加到 slow_log_path。
+    """
+    
+    def __init__(self, slow_log_path=None, slow_threshold=SLOW_QUERY_THRESHOLD):
+        self.slow_log_path = slow_log_path
+        self.slow_threshold = slow_threshold
+        self.statements = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+    
+    def begin(self, connection, sql, parameters, call_site):
+        key = " ".join(sql.split())
+        with self._lock:
+            entry = self.statements.get(key)
+            if entry is None:
+                entry = self.statements[key] = StatementStats(key)
+            entry.calls += 1
+            entry.call_sites[call_site] += 1
+        return Execution(self, connection, key, sql, parameters, call_site)
+    
+    def add(self, execution):
+        with self._lock:
+            entry = self.statements[execution.key]
+            entry.total_time += execution.pending_time
+            entry.rows += execution.pending_rows
+            entry.max_time = max(entry.max_time, execution.elapsed)
+        execution.pending_time = 0.0
+        execution.pending_rows = 0
+    
+    def snapshot(self):
+        """返回各语句统计的副本列表，按总耗时从高到低排列"""
+        with self._lock:
+            entries = []
+            for entry in self.statements.values():
+                copy = StatementStats(entry.sql)
+                copy.calls = entry.calls
+                copy.total_time = entry.total_time
+                copy.max_time = entry.max_time
+                copy.rows = entry.rows
+                copy.call_sites = Counter(entry.call_sites)
+                entries.append(copy)
+        entries.sort(key=lambda entry: entry.total_time, reverse=True)
+        return entries
+    
+    def reset(self):
+        with self._lock:
+            self.statements = {}
+            self.started_at = time.time()
+    
+    def logSlowQuery(self, execution):
+        if not self.slow_log_path:
+            return
+        lines = [
+            f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {execution.elapsed * 1000:.1f} ms，"
+            f"{execution.rows} 行，调用位置 {execution.call_site}",
+            f"SQL: {execution.key}",
+        ]
+        if execution.parameters:
+            lines.append(f"参数: {execution.parameters!r}")
+        if execution.plan:
+            lines.append("查询计划:")
+            lines.extend(f"  {line}" for line in execution.plan)
+        try:
+            with self._log_lock:
+                with open(self.slow_log_path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n\n")
+        except OSError as e:
+            print(f"写入慢查询日志失败: {str(e)}")
+
+
+def explain_query_plan(conn, sql, parameters=()):
+    """返回语句的 EXPLAIN QUERY PLAN，按层级缩进的文本行
+    
+    使用未记录统计的普通游标执行，不会计入语句统计。
+    """
+    try:
+        plan = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+    except sqlite3.Error as e:
+        return [f"无法获取查询计划: {str(e)}"]
+    depths = {0: -1}
+    lines = []
+    for node_id, parent_id, _, detail in plan:
+        depth = depths.get(parent_id, -1) + 1
+        depths[node_id] = depth
+        lines.append("  " * depth + detail)
+    return lines
+
+
+def _call_site():
+    """返回执行语句的代码位置：跳过统计层自身的调用帧"""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code in _INSTRUMENTATION_CODE:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    path = frame.f_code.co_filename
+    if path.startswith(_APP_DIR):
+        path = os.path.relpath(path, _APP_DIR)
+    return f"{path}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """记录每条语句耗时、返回行数和调用位置的游标
+    
+    SELECT 的大部分时间花在读取结果上，因此 fetch 和迭代的耗时也计入
+    最近一次 execute 的语句。
+    """
+    
+    _execution = None
+    
+    def _begin(self, sql, parameters):
+        self._finish()
+        self._execution = self.connection.stats.begin(self.connection, sql, parameters, _call_site())
+    
+    def _finish(self):
+        if self._execution is not None:
+            execution = self._execution
+            self._execution = None
+            execution.finish()
+    
+    def execute(self, sql, parameters=()):
+        self._begin(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._execution.add(time.perf_counter() - started, max(self.rowcount, 0))
+    
+    def executemany(self, sql, seq_of_parameters):
+        # 参数可能是只能遍历一次的生成器，批量执行不记录参数和查询计划
+        self._begin(sql, None)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._execution.add(time.perf_counter() - started, max(self.rowcount, 0))
+    
+    def executescript(self, sql_script):
+        self._begin(sql_script, None)
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._execution.add(time.perf_counter() - started, 0)
+    
+    def _fetched(self, started, rows, exhausted):
+        if self._execution is not None:
+            self._execution.add(time.perf_counter() - started, rows)
+            if exhausted:
+                self._finish()
+    
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, 0 if row is None else 1, row is None)
+        return row
+    
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+    
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+    
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        execution = self._execution
+        if execution is not None:
+            # 逐行迭代时只在本地累计，每 ITERATION_FLUSH_ROWS 行汇总一次
+            execution.add(time.perf_counter() - started, 1,
+                          flush=execution.pending_rows + 1 >= ITERATION_FLUSH_ROWS)
+        return row
+    
+    def close(self):
+        self._finish()
+        super().close()
+    
+    def __del__(self):
+        # 回收可能发生在任意线程，连接此时可能已关闭或正由其他线程使用；
+        # 查询计划已在执行时获取，这里只写入统计和日志
+        try:
+            self._finish()
+        except Exception:
+            # 解释器退出时模块可能已被清理，此时放弃记录
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """cursor() 默认返回 InstrumentedCursor 的连接，统计记录在 self.stats 中"""
+    
+    stats = None
+    
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+    
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+_INSTRUMENTATION_CODE = {
+    function.__code__
+    for cls in (InstrumentedCursor, InstrumentedConnection)
+    for function in vars(cls).values()
+    if callable(function) and hasattr(function, "__code__")
+}
+
+
+class WriterCursor:
+    """Database.cursor：供旧代码直接执行语句的游标
+
+    每条语句都在 ConnectionPool.writer() 中执行，持有写锁并在执行后立即提交，
+    不会与其他线程的写事务交错；因此旧代码随后调用的 db.conn.commit() 没有作用，
+    db.conn.rollback() 也不能撤销已执行的语句。查询结果在执行时全部读出。
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.rows = []
+        self.position = 0
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+
+    def _run(self, method, *args):
+        with self.pool.writer() as conn:
+            cursor = getattr(conn.cursor(), method)(*args)
+            self.rows = cursor.fetchall()
+            self.position = 0
+            self.rowcount = cursor.rowcount
+            self.lastrowid = cursor.lastrowid
+            self.description = cursor.description
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._run("execute", sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run("executemany", sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self._run("executescript", sql_script)
+
+    def fetchone(self):
+        if self.position >= len(self.rows):
+            return None
+        self.position += 1
+        return self.rows[self.position - 1]
+
+    def fetchmany(self, size=1):
+        rows = self.rows[self.position:self.position + size]
+        self.position += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self.rows[self.position:]
+        self.position = len(self.rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+
+class ConnectionPool:
+    """一个写连接加若干只读连接的连接池
+
+    所有连接都以 check_same_thread=False 打开，由连接池保证同一时刻
+    只有一个线程使用某个连接：写连接由锁保护，只读连接从队列中借出、用完归还。
+    只读连接按需创建，最多 max_readers 个，全部借出时其余线程等待归还。
+    """
+    
+    def __init__(self, db_path, max_readers=READER_CONNECTIONS, stats=None):
+        self.db_path = db_path
+        self.max_readers = max_readers
+        self.stats = stats
+        self.writer_connection = connect(db_path, stats=stats, check_same_thread=False)
+        self._write_lock = threading.RLock()
+        self._readers = queue.LifoQueue()
+        self._all_readers = []
+        self._readers_lock = threading.Lock()
+    
+    def _open_reader(self):
+        uri = "file:" + pathname2url(os.path.abspath(self.db_path)) + "?mode=ro"
+        return connect(uri, stats=self.stats, uri=True, check_same_thread=False)
+    
+    def _acquire_reader(self):
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._readers_lock:
+            if len(self._all_readers) < self.max_readers:
+                conn = self._open_reader()
+                self._all_readers.append(conn)
+                return conn
+        return self._readers.get()
+    
+    @contextmanager
+    def reader(self):
+        """借出一个只读连接，退出时归还"""
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+    
+    @contextmanager
+    def writer(self):
+        """独占写连接，正常退出时提交，出现异常时回滚"""
+        with self._write_lock:
+            try:
+                yield self.writer_connection
+                self.writer_connection.commit()
+            except Exception:
+                self.writer_connection.rollback()
+                raise
+    
+    def close(self):
+        with self._readers_lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers = []
+        self.writer_connection.close()
+
+
+def _migration_1(cursor):
+    """为列表查询和连接查询常用的列建立索引"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_punishments_student_id ON punishments (student_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_punishments_date ON punishments (date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_activities_student_id ON activities (student_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_activities_punishment_id ON activities (punishment_id)")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_students_identity
+        ON students (name, gender, grade_id, class_id)
+    """)
+
+
+def _migration_2(cursor):
+    """公益活动列表按日期分页查询所需的索引"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_activities_date ON activities (date)")
+
+
+def _migration_3(cursor):
+    """年级和专业班级改为从文本文件同步
+
+    原有的 grades/classes 内容是写死的初始数据，与界面实际使用的文本文件编号不一致，
+    这里清空后由 Database.sync_reference_data 按文本文件重新写入。
+    classes 增加所属年级，同一专业在不同年级下是不同的专业班级。
+    """
+    cursor.execute("DELETE FROM grades")
+    cursor.execute("ALTER TABLE grades ADD COLUMN active INTEGER NOT NULL DEFAULT 1")
+    cursor.execute("DROP TABLE classes")
+    cursor.execute("""
+        CREATE TABLE classes (
+            id INTEGER PRIMARY KEY,
+            grade_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            active INTEGER NOT NULL DEFAULT 1,
+            UNIQUE (grade_id, name),
+            FOREIGN KEY (grade_id) REFERENCES grades (id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_grade_class ON students (grade_id, class_id)")
+
+
+# 按学生汇总积分的语句，student_points 的内容应始终与它的结果一致
+STUDENT_POINTS_AGGREGATE_SQL = """
+    SELECT student_id,
+           SUM(earned_points), SUM(required_points), SUM(punishment_count), SUM(cleared_count)
+    FROM (
+        SELECT student_id, COALESCE(points, 0) AS earned_points, 0 AS required_points,
+               0 AS punishment_count, 0 AS cleared_count
+        FROM activities WHERE student_id IS NOT NULL
+        UNION ALL
+        SELECT student_id, 0, COALESCE(required_points, 0), 1, CASE WHEN is_cleared = 1 THEN 1 ELSE 0 END
+        FROM punishments WHERE student_id IS NOT NULL
+    )
+    GROUP BY student_id
+"""
+
+
+def _rebuild_student_points(cursor):
+    cursor.execute("DELETE FROM student_points")
+    cursor.execute("""
+        INSERT INTO student_points
+            (student_id, earned_points, required_points, punishment_count, cleared_count)
+    """ + STUDENT_POINTS_AGGREGATE_SQL)
+
+
+def _migration_4(cursor):
+    """按学生汇总的积分表，由触发器随 activities、punishments 的修改同步更新"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS student_points (
+            student_id INTEGER PRIMARY KEY,
+            earned_points INTEGER NOT NULL DEFAULT 0,
+            required_points INTEGER NOT NULL DEFAULT 0,
+            punishment_count INTEGER NOT NULL DEFAULT 0,
+            cleared_count INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (student_id) REFERENCES students (id)
+        )
+    """)
+    
+    # 公益活动积分
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_activities_points_insert
+        AFTER INSERT ON activities WHEN NEW.student_id IS NOT NULL
+        BEGIN
+            INSERT OR IGNORE INTO student_points (student_id) VALUES (NEW.student_id);
+            UPDATE student_points SET earned_points = earned_points + COALESCE(NEW.points, 0)
+            WHERE student_id = NEW.student_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_activities_points_delete
+        AFTER DELETE ON activities WHEN OLD.student_id IS NOT NULL
+        BEGIN
+            UPDATE student_points SET earned_points = earned_points - COALESCE(OLD.points, 0)
+            WHERE student_id = OLD.student_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_activities_points_update
+        AFTER UPDATE OF student_id, points ON activities
+        BEGIN
+            UPDATE student_points SET earned_points = earned_points - COALESCE(OLD.points, 0)
+            WHERE student_id = OLD.student_id;
+            INSERT OR IGNORE INTO student_points (student_id)
+            SELECT NEW.student_id WHERE NEW.student_id IS NOT NULL;
+            UPDATE student_points SET earned_points = earned_points + COALESCE(NEW.points, 0)
+            WHERE student_id = NEW.student_id;
+        END
+    """)
+    
+    # 处分所需积分及核销数量
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_punishments_points_insert
+        AFTER INSERT ON punishments WHEN NEW.student_id IS NOT NULL
+        BEGIN
+            INSERT OR IGNORE INTO student_points (student_id) VALUES (NEW.student_id);
+            UPDATE student_points
+            SET required_points = required_points + COALESCE(NEW.required_points, 0),
+                punishment_count = punishment_count + 1,
+                cleared_count = cleared_count + CASE WHEN NEW.is_cleared = 1 THEN 1 ELSE 0 END
+            WHERE student_id = NEW.student_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_punishments_points_delete
+        AFTER DELETE ON punishments WHEN OLD.student_id IS NOT NULL
+        BEGIN
+            UPDATE student_points
+            SET required_points = required_points - COALESCE(OLD.required_points, 0),
+                punishment_count = punishment_count - 1,
+                cleared_count = cleared_count - CASE WHEN OLD.is_cleared = 1 THEN 1 ELSE 0 END
+            WHERE student_id = OLD.student_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_punishments_points_update
+        AFTER UPDATE OF student_id, required_points, is_cleared ON punishments
+        BEGIN
+            UPDATE student_points
+            SET required_points = required_points - COALESCE(OLD.required_points, 0),
+                punishment_count = punishment_count - 1,
+                cleared_count = cleared_count - CASE WHEN OLD.is_cleared = 1 THEN 1 ELSE 0 END
+            WHERE student_id = OLD.student_id;
+            INSERT OR IGNORE INTO student_points (student_id)
+            SELECT NEW.student_id WHERE NEW.student_id IS NOT NULL;
+            UPDATE student_points
+            SET required_points = required_points + COALESCE(NEW.required_points, 0),
+                punishment_count = punishment_count + 1,
+                cleared_count = cleared_count + CASE WHEN NEW.is_cleared = 1 THEN 1 ELSE 0 END
+            WHERE student_id = NEW.student_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_students_points_delete
+        AFTER DELETE ON students
+        BEGIN
+            DELETE FROM student_points WHERE student_id = OLD.id;
+        END
+    """)
+    
+    _rebuild_student_points(cursor)
+
+
+def _migration_5(cursor):
+    """合并身份相同的重复学生记录，并为学生身份建立唯一索引
+
+    每组重复记录保留ID最小的一条，其余记录的处分和公益活动改为指向保留的记录，
+    student_points 由触发器随之更新。年级或专业班级为空的记录之间同样视为身份相同。
+    """
+    cursor.execute("""
+        CREATE TEMP TABLE student_merge AS
+        SELECT s.id AS old_id, k.keep_id
+        FROM students s
+        JOIN (
+            SELECT MIN(id) AS keep_id, name, gender, grade_id, class_id
+            FROM students
+            GROUP BY name, gender, grade_id, class_id
+        ) k ON s.name = k.name AND s.gender = k.gender
+           AND s.grade_id IS k.grade_id AND s.class_id IS k.class_id
+        WHERE s.id != k.keep_id
+    """)
+    for table in ("punishments", "activities"):
+        cursor.execute(f"""
+            UPDATE {table}
+            SET student_id = (SELECT keep_id FROM student_merge WHERE old_id = {table}.student_id)
+            WHERE student_id IN (SELECT old_id FROM student_merge)
+        """)
+    cursor.execute("DELETE FROM students WHERE id IN (SELECT old_id FROM student_merge)")
+    cursor.execute("DROP TABLE student_merge")
+    
+    cursor.execute("DROP INDEX IF EXISTS idx_students_identity")
+    cursor.execute(f"""
+        CREATE UNIQUE INDEX idx_students_identity
+        ON students ({STUDENT_IDENTITY})
+    """)
+
+
+def _point_allocation_sql(student_id, partition=False):
+    """按先进先出把学生的公益活动积分分配给处分的查询
+
+    活动和处分都按 (日期, ID) 排序，各自累加成连续的积分区间，活动区间与处分区间
+    重叠的部分即为该活动分配给该处分的积分。顺序与是否核销无关：核销处分不会改变
+    分配结果，已核销处分用掉的积分不会再分配给其他处分。
+    student_id 为限定单个学生的表达式；partition 为 True 时按学生分区一次计算所有学生。
+    返回 (学生ID, 活动ID, 处分ID, 分配积分) 的 SELECT 语句。
+    """
+    if partition:
+        activity_window = "PARTITION BY student_id ORDER BY date, id"
+        punishment_window = "PARTITION BY student_id ORDER BY date, id"
+        activity_filter = punishment_filter = "student_id IS NOT NULL"
+        join_student = "AND a.student_id = p.student_id"
+    else:
+        activity_window = "ORDER BY date, id"
+        punishment_window = "ORDER BY date, id"
+        activity_filter = punishment_filter = f"student_id = {student_id}"
+        join_student = ""
+    return f"""
+        SELECT p.student_id AS student_id, a.id AS activity_id, p.id AS punishment_id,
+               MIN(a.end_points, p.end_points) - MAX(a.end_points - a.points, p.end_points - p.required) AS points
+        FROM (
+            SELECT id, student_id, COALESCE(points, 0) AS points,
+                   SUM(COALESCE(points, 0)) OVER ({activity_window} ROWS UNBOUNDED PRECEDING) AS end_points
+            FROM activities WHERE {activity_filter}
+        ) a
+        JOIN (
+            SELECT id, student_id, COALESCE(required_points, 0) AS required,
+                   SUM(COALESCE(required_points, 0)) OVER ({punishment_window} ROWS UNBOUNDED PRECEDING) AS end_points
+            FROM punishments WHERE {punishment_filter}
+        ) p ON a.end_points - a.points < p.end_points AND p.end_points - p.required < a.end_points
+               {join_student}
+    """
+
+
+def _update_allocated_points_sql(student_filter, guard="1"):
+    """把 point_allocations 的合计写入处分的 allocated_points
+
+    只修改值有变化的处分，避免重新分配时改写学生的全部处分记录并触发其更新触发器。
+    student_filter 为限定学生的条件（处分表的别名为 q）。
+    """
+    return f"""
+            UPDATE punishments
+            SET allocated_points = totals.points
+            FROM (
+                SELECT q.id, COALESCE(SUM(pa.points), 0) AS points
+                FROM punishments q
+                LEFT JOIN point_allocations pa ON pa.punishment_id = q.id
+                WHERE {student_filter}
+                GROUP BY q.id
+            ) totals
+            WHERE punishments.id = totals.id AND punishments.allocated_points IS NOT totals.points
+                  AND {guard}
+    """
+
+
+def _reallocate_points_sql(student_id, guard="1"):
+    """重新分配单个学生积分的语句，供触发器使用；guard 为 False 时不做任何修改"""
+    return f"""
+            DELETE FROM point_allocations WHERE student_id = {student_id} AND {guard};
+            INSERT INTO point_allocations (student_id, activity_id, punishment_id, points)
+            SELECT * FROM ({_point_allocation_sql(student_id)}) WHERE {guard};
+            {_update_allocated_points_sql(f"q.student_id = {student_id}", guard)};
+    """
+
+
+def _rebuild_point_allocations(cursor):
+    cursor.execute("DELETE FROM point_allocations")
+    cursor.execute("""
+        INSERT INTO point_allocations (student_id, activity_id, punishment_id, points)
+    """ + _point_allocation_sql(None, partition=True))
+    cursor.execute(_update_allocated_points_sql("1"))
+
+
+def _migration_6(cursor):
+    """公益积分分配表：记录每条活动的积分分配给了哪些处分
+
+    处分的 allocated_points 为分配给它的积分合计，达到 required_points 即可核销，
+    不需要再汇总学生的全部活动记录。活动或处分修改时由触发器重新分配该学生的积分，
+    每个学生的积分只会分配一次，不会被多个处分重复使用。
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS point_allocations (
+            student_id INTEGER NOT NULL,
+            activity_id INTEGER NOT NULL,
+            punishment_id INTEGER NOT NULL,
+            points INTEGER NOT NULL,
+            PRIMARY KEY (activity_id, punishment_id),
+            FOREIGN KEY (activity_id) REFERENCES activities (id),
+            FOREIGN KEY (punishment_id) REFERENCES punishments (id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_point_allocations_student_id ON point_allocations (student_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_point_allocations_punishment_id ON point_allocations (punishment_id)")
+    cursor.execute("ALTER TABLE punishments ADD COLUMN allocated_points INTEGER NOT NULL DEFAULT 0")
+    
+    for table, columns in (("activities", "student_id, points, date"),
+                           ("punishments", "student_id, required_points, date")):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_allocations_insert
+            AFTER INSERT ON {table} WHEN NEW.student_id IS NOT NULL
+            BEGIN {_reallocate_points_sql("NEW.student_id")} END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_allocations_delete
+            AFTER DELETE ON {table} WHEN OLD.student_id IS NOT NULL
+            BEGIN {_reallocate_points_sql("OLD.student_id")} END
+        """)
+        # 记录改到其他学生名下时，原学生的积分也要重新分配
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_allocations_update
+            AFTER UPDATE OF {columns} ON {table}
+            BEGIN
+                {_reallocate_points_sql("OLD.student_id", "OLD.student_id IS NOT NEW.student_id")}
+                {_reallocate_points_sql("NEW.student_id")}
+            END
+        """)
+    
+    _rebuild_point_allocations(cursor)
+
+
+# 全文索引表：(索引表名, 内容表名, 索引的列)，索引表的 rowid 即内容表的 id
+FTS_TABLES = [
+    ("student_fts", "students", "name"),
+    ("punishment_fts", "punishments", "reason"),
+    ("activity_fts", "activities", "content"),
+]
+
+
+def _migration_7(cursor):
+    """为学生姓名、处分原因和活动内容建立 FTS5 全文索引，由触发器同步
+
+    优先使用 trigram 分词器，可以按任意三个字以上的片段查找中文；SQLite 版本
+    不支持时退回 unicode61。SQLite 未编译 FTS5 时跳过，查询时使用 LIKE。
+    """
+    tokenizer = "trigram"
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(x, tokenize = 'trigram')")
+        cursor.execute("DROP TABLE temp.fts_probe")
+    except sqlite3.OperationalError as e:
+        if "no such module" in str(e):
+            print(f"SQLite 不支持 FTS5，跳过全文索引: {str(e)}")
+            return
+        tokenizer = "unicode61"
+    
+    for fts_table, table, column in FTS_TABLES:
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table}
+            USING fts5({column}, content = '{table}', content_rowid = 'id', tokenize = '{tokenizer}')
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_insert
+            AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {fts_table} (rowid, {column}) VALUES (NEW.id, NEW.{column});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_delete
+            AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column}) VALUES ('delete', OLD.id, OLD.{column});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_update
+            AFTER UPDATE OF {column} ON {table}
+            BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column}) VALUES ('delete', OLD.id, OLD.{column});
+                INSERT INTO {fts_table} (rowid, {column}) VALUES (NEW.id, NEW.{column});
+            END
+        """)
+        cursor.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+
+
+# 记录变更的表：(表名, 记录所属学生ID的列)
+CHANGE_LOG_TABLES = [
+    ("punishments", "student_id"),
+    ("activities", "student_id"),
+    ("students", "id"),
+]
+# 启动时和运行中定时清理，change_log 只保留最近的这么多行，落后更多的程序实例改为完整重新加载
+CHANGE_LOG_RETENTION = 100000
+
+
+def _migration_8(cursor):
+    """由触发器把处分、活动和学生的每次修改记录到 change_log
+
+    同时打开同一数据库的其他程序实例据此只重新查询变化的记录。seq 单调递增；
+    记录改为属于另一名学生时，原来的学生也记录一行。没有改变任何列的 UPDATE
+    （如 find_or_create_student 遇到已有学生时的 UPDATE）不记录；比较的列为
+    此时表中的所有列，以后为这些表增加列的迁移需要重建更新触发器。
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            student_id INTEGER
+        )
+    """)
+    for table, student_column in CHANGE_LOG_TABLES:
+        columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()]
+        changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in columns)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_change_log_insert
+            AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, student_id)
+                VALUES ('{table}', NEW.id, NEW.{student_column});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_change_log_delete
+            AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, student_id)
+                VALUES ('{table}', OLD.id, OLD.{student_column});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_change_log_update
+            AFTER UPDATE ON {table} WHEN {changed}
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, student_id)
+                VALUES ('{table}', NEW.id, NEW.{student_column});
+                INSERT INTO change_log (table_name, row_id, student_id)
+                SELECT '{table}', OLD.id, OLD.{student_column}
+                WHERE OLD.{student_column} IS NOT NEW.{student_column};
+            END
+        """)
+
+
+# 数据库结构迁移列表：(版本号, 迁移函数)，按版本号递增排列。
+# 已执行到的版本记录在 PRAGMA user_version 中，新增迁移只需在末尾追加。
+MIGRATIONS = [
+    (1, _migration_1),
+    (2, _migration_2),
+    (3, _migration_3),
+    (4, _migration_4),
+    (5, _migration_5),
+    (6, _migration_6),
+    (7, _migration_7),
+    (8, _migration_8),
+]
+
+# 可核销的处分：未核销，且分配给该处分的公益积分已达到所需积分
+ELIGIBLE_CLEARANCE_CONDITION = """
+    p.is_cleared = 0 AND p.allocated_points >= p.required_points
+"""
+
+
+class Database:
+    def __init__(self, db_path):
+        try:
+            if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+                required = ".".join(str(part) for part in MIN_SQLITE_VERSION)
+                raise RuntimeError(f"需要 SQLite {required} 或更高版本，当前为 {sqlite3.sqlite_version}")
+            
+            # 确保数据目录存在
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            
+            # 连接到数据库
+            self.db_path = db_path
+            self.reference_version = None
+            self._name_index = None
+            # 所有连接执行的语句都记录到 query_stats，慢查询写入数据目录下的日志
+            self.query_stats = QueryStats(os.path.join(os.path.dirname(db_path), SLOW_QUERY_LOG_NAME))
+            # 通过 repository 的写操作提交后在 changes 上发布 DataChange
+            self.changes = EventBus()
+            # 积分统计查询的结果缓存，键中包含 write_generation
+            self.statistics_cache = ResultCache()
+            # 写连接同时作为 self.conn 供旧代码使用，self.cursor 的每条语句都经过写锁
+            self.pool = ConnectionPool(db_path, stats=self.query_stats)
+            self.conn = self.pool.writer_connection
+            self.cursor = WriterCursor(self.pool)
+            self.create_tables()
+            self.migrate()
+            self.prune_change_log()
+            self.fts_tokenizer = self._detect_fts_tokenizer()
+            self.initialize_data()
+            # 年级.txt 和 专业.txt 与数据库放在同一目录
+            DataManager.set_data_dir(os.path.dirname(db_path))
+            self.sync_reference_data()
+        except Exception as e:
+            print(f"数据库初始化失败: {str(e)}")
+            raise
+    
+    def create_tables(self):
+        try:
+            # 创建年级表
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS grades (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+            ''')
+            
+            # 创建专业班级表
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS classes (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+            ''')
+            
+            # 创建学生表
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS students (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                gender TEXT NOT NULL,
+                grade_id INTEGER,
+                class_id INTEGER,
+                FOREIGN KEY (grade_id) REFERENCES grades (id),
+                FOREIGN KEY (class_id) REFERENCES classes (id)
+            )
+            ''')
+            
+            # 创建处分类型表
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS punishment_types (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                required_points INTEGER NOT NULL,
+                display_order INTEGER NOT NULL DEFAULT 0
+            )
+            ''')
+            
+            # 创建处分记录表
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS punishments (
+                id INTEGER PRIMARY KEY,
+                student_id INTEGER,
+                type_id INTEGER,
+                reason TEXT,
+                date TEXT,
+                required_points INTEGER,
+                is_cleared INTEGER DEFAULT 0,
+                FOREIGN KEY (student_id) REFERENCES students (id),
+                FOREIGN KEY (type_id) REFERENCES punishment_types (id)
+            )
+            ''')
+            
+            # 创建公益活动记录表
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS activities (
+                id INTEGER PRIMARY KEY,
+                student_id INTEGER,
+                content TEXT,
+                date TEXT,
+                duration REAL,
+                points INTEGER,
+                punishment_id INTEGER,
+                FOREIGN KEY (student_id) REFERENCES students (id),
+                FOREIGN KEY (punishment_id) REFERENCES punishments (id)
+            )
+            ''')
+        except Exception as e:
+            print(f"创建数据表失败: {str(e)}")
+            raise
+    
+    def reader(self):
+        """只读连接的上下文管理器，可在工作线程中使用
+
+        用法：with db.reader() as conn: conn.execute(...).fetchall()
+        """
+        return self.pool.reader()
+    
+    def writer(self):
+        """写连接的上下文管理器，退出时自动提交或回滚"""
+        return self.pool.writer()
+    
+    def estimate_row_count(self, table):
+        """以最大 rowid 估算表的记录数，只需查找索引的一端，不随数据量增长
+
+        删除过记录时结果会偏大，只用于界面上的数量提示。
+        """
+        with self.reader() as conn:
+            return conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+    
+    def get_connection_settings(self):
+        """返回写连接实际生效的 PRAGMA 设置，在诊断对话框中显示，便于确认配置是否被数据库接受"""
+        settings = {}
+        with self.writer() as conn:
+            for name, _ in CONNECTION_PRAGMAS:
+                row = conn.execute(f"PRAGMA {name}").fetchone()
+                settings[name] = row[0] if row else None
+        return settings
+    
+    def _detect_fts_tokenizer(self):
+        """返回全文索引使用的分词器，没有全文索引时返回 None"""
+        with self.reader() as conn:
+            row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'student_fts'").fetchone()
+        if row is None:
+            return None
+        return "trigram" if "trigram" in row[0] else "unicode61"
+    
+    def fts_terms(self, text):
+        """把以空格分隔的关键词逐个转换为 FTS5 MATCH 表达式，返回表达式列表
+
+        没有全文索引，或 trigram 分词器下有关键词不足三个字时返回 None，由调用方改用 LIKE。
+        两个字的姓名因此总是使用以 % 开头的 LIKE，需要扫描整个表；只按姓名开头查找时
+        应使用 prefix_condition，可以使用姓名索引。
+        """
+        terms = text.split()
+        if not terms or self.fts_tokenizer is None:
+            return None
+        quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+        if self.fts_tokenizer == "trigram":
+            if any(len(term) < 3 for term in terms):
+                return None
+            return quoted
+        return [term + "*" for term in quoted]
+    
+    def fts_match(self, text):
+        """把输入的关键词转换为一个 FTS5 MATCH 表达式，多个关键词须在同一个索引表中同时匹配"""
+        terms = self.fts_terms(text)
+        return None if terms is None else " AND ".join(terms)
+    
+    def text_condition(self, fts_table, id_column, column, text):
+        """返回按关键词筛选的 (条件, 参数)
+
+        能使用全文索引时在 fts_table 中查找匹配的 id_column，否则对 column 使用 LIKE。
+        """
+        match = self.fts_match(text)
+        if match is not None:
+            return f"{id_column} IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)", [match]
+        terms = text.split() or [text]
+        return " AND ".join(f"{column} LIKE ?" for _ in terms), [f"%{term}%" for term in terms]
+    
+    def prefix_condition(self, column, prefix, use_index=True):
+        """返回按前缀筛选的 (条件, 参数)，以范围比较代替 LIKE，可以使用 column 上的索引
+
+        use_index 为 False 时在列名前加一元 +，让查询不使用该列的索引，
+        而是按 ORDER BY 的索引顺序扫描并逐条比较。
+        """
+        if not use_index:
+            column = f"+{column}"
+        return f"{column} >= ? AND {column} < ?", [prefix, prefix + "\U0010ffff"]
+    
+    def get_schema_version(self):
+        with self.writer() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    def migrate(self):
+        """将数据库结构升级到最新版本，每个迁移在单独的事务中执行"""
+        current_version = self.get_schema_version()
+        for version, migration in MIGRATIONS:
+            if version <= current_version:
+                continue
+            try:
+                with self.writer() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("BEGIN")
+                    migration(cursor)
+                    # PRAGMA 不支持参数绑定，版本号来自上面的迁移列表
+                    cursor.execute(f"PRAGMA user_version = {int(version)}")
+                current_version = version
+            except Exception as e:
+                print(f"数据库迁移到版本 {version} 失败: {str(e)}")
+                raise
+    
+    def prune_change_log(self):
+        """删除 change_log 中较早的行，只保留最近的 CHANGE_LOG_RETENTION 行"""
+        try:
+            with self.writer() as conn:
+                conn.execute("""
+                    DELETE FROM change_log
+                    WHERE seq <= (SELECT MAX(seq) FROM change_log) - ?
+                """, (CHANGE_LOG_RETENTION,))
+        except Exception as e:
+            print(f"清理变更记录失败: {str(e)}")
+    
+    def initialize_data(self):
+        # 年级和专业班级数据由 sync_reference_data 从文本文件导入
+        try:
+            # 初始化处分类型数据
+            punishment_types = [
+                ("警告", 20),
+                ("严重警告", 40),
+                ("记过", 60),
+                ("留校察看一学期", 80),
+                ("留校察看一学年", 100),
+                ("留校察看两学年", 120),
+                ("开除学籍", 0)  # 开除学籍不需要核销
+            ]
+            with self.writer() as conn:
+                for i, (name, points) in enumerate(punishment_types):
+                    conn.execute("INSERT OR IGNORE INTO punishment_types (name, required_points, display_order) VALUES (?, ?, ?)", 
+                                 (name, points, i))
+        except Exception as e:
+            print(f"初始化数据失败: {str(e)}")
+            raise
+    
+    def sync_reference_data(self, force=False):
+        """把 年级.txt 和 专业.txt 同步到 grades、classes 表
+
+        首次同步时沿用文本文件的编号方式（年级ID为行号，专业班级ID按专业×年级依次编号），
+        保证已有学生记录中的年级ID、专业班级ID含义不变；之后新增的年级和专业追加新ID
+        （跳过学生记录中已经出现过的ID），已有ID保持不变。从文件中删除的项目只标记为停用，已有记录仍能显示名称。
+        文件未修改时直接返回 False。
+        """
+        version = DataManager.version()
+        if not force and version == self.reference_version:
+            return False
+        
+        grades = DataManager.load_grades()
+        classes = DataManager.load_classes()
+        grade_names = [grade_name for _, grade_name in grades]
+        majors = list(dict.fromkeys(major for _, _, major, _ in classes))
+        
+        with self.writer() as conn:
+            if conn.execute("SELECT COUNT(*) FROM grades").fetchone()[0] == 0:
+                conn.executemany("INSERT INTO grades (id, name) VALUES (?, ?)", grades)
+            else:
+                conn.executemany("""
+                    INSERT INTO grades (id, name)
+                    SELECT MAX((SELECT COALESCE(MAX(id), 0) FROM grades),
+                               (SELECT COALESCE(MAX(grade_id), 0) FROM students)) + 1, ?1
+                    WHERE NOT EXISTS (SELECT 1 FROM grades WHERE name = ?1)
+                """, [(grade_name,) for grade_name in grade_names])
+            conn.execute("UPDATE grades SET active = 0")
+            conn.executemany("UPDATE grades SET active = 1 WHERE name = ?",
+                             [(grade_name,) for grade_name in grade_names])
+            
+            grade_ids = dict(conn.execute("SELECT name, id FROM grades"))
+            class_keys = [(grade_ids[grade_name], major) for major in majors for grade_name in grade_names]
+            if conn.execute("SELECT COUNT(*) FROM classes").fetchone()[0] == 0:
+                conn.executemany("INSERT INTO classes (id, grade_id, name) VALUES (?, ?, ?)",
+                                 [(class_id, grade_id, major) for class_id, grade_id, major, _ in classes])
+            else:
+                conn.executemany("""
+                    INSERT INTO classes (id, grade_id, name)
+                    SELECT MAX((SELECT COALESCE(MAX(id), 0) FROM classes),
+                               (SELECT COALESCE(MAX(class_id), 0) FROM students)) + 1, ?1, ?2
+                    WHERE NOT EXISTS (SELECT 1 FROM classes WHERE grade_id = ?1 AND name = ?2)
+                """, class_keys)
+            conn.execute("UPDATE classes SET active = 0")
+            conn.executemany("UPDATE classes SET active = 1 WHERE grade_id = ? AND name = ?", class_keys)
+        
+        self.reference_version = version
+        return True
+    
+    def get_grades(self):
+        """返回启用的年级 [(年级ID, 名称), ...]"""
+        with self.reader() as conn:
+            return conn.execute("SELECT id, name FROM grades WHERE active = 1 ORDER BY id").fetchall()
+    
+    def get_classes(self, grade_id=None):
+        """返回启用的专业班级 [(专业班级ID, 年级ID, 专业名称), ...]，可按年级筛选"""
+        with self.reader() as conn:
+            if grade_id is None:
+                return conn.execute("""
+                    SELECT id, grade_id, name FROM classes WHERE active = 1 ORDER BY id
+                """).fetchall()
+            return conn.execute("""
+                SELECT id, grade_id, name FROM classes
+                WHERE active = 1 AND grade_id = ? ORDER BY id
+            """, (grade_id,)).fetchall()
+    
+    def find_or_create_student(self, name, gender, grade_id, class_id, cursor=None):
+        """按姓名、性别、年级、专业班级查找学生，不存在时创建，返回学生ID
+
+        一条 INSERT ... ON CONFLICT ... RETURNING 语句完成查找和创建；冲突时执行
+        一次不改变数据的 UPDATE，使 RETURNING 同样返回已有记录的ID。更新的是性别而
+        不是姓名，避免触发姓名全文索引的更新。
+        cursor 为调用方写事务中的游标，由调用方与后续写操作一起提交，提交后再调用
+        sync_name_index；不传入时单独在写连接上执行并提交。
+        """
+        if cursor is None:
+            with self.writer() as conn:
+                student_id = self.find_or_create_student(name, gender, grade_id, class_id, conn.cursor())
+            self.sync_name_index([name])
+            return student_id
+        cursor.execute(f"""
+            INSERT INTO students (name, gender, grade_id, class_id)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT ({STUDENT_IDENTITY}) DO UPDATE SET gender = excluded.gender
+            RETURNING id
+        """, (name, gender, grade_id, class_id))
+        return cursor.fetchone()[0]
+    
+    def refresh_name_index(self):
+        """重新读取所有学生姓名，与姓名索引比较后逐个加入或删除
+
+        用于其他程序实例修改了学生之后：change_log 不记录原来的姓名，无法只检查改名
+        或删除的学生。姓名索引尚未加载时不做任何事。
+        """
+        if self._name_index is None:
+            return
+        with self.reader() as conn:
+            names = {row[0] for row in conn.execute("SELECT DISTINCT name FROM students")}
+        current = set(self._name_index.names())
+        for name in sorted(names - current):
+            self._name_index.add(name)
+        for name in current - names:
+            self._name_index.remove(name)
+    
+    def sync_name_index(self, names):
+        """写操作提交后，按数据库中的学生更新姓名索引中的 names
+
+        仍有学生使用的姓名加入索引，已经没有学生使用的（学生被删除或改名）从索引中删除。
+        事务回滚时不调用，索引中不会出现未提交的姓名。
+        """
+        names = set(names) - {None}
+        if self._name_index is None or not names:
+            return
+        with self.reader() as conn:
+            existing = {row[0] for row in conn.execute(
+                "SELECT DISTINCT name FROM students WHERE name IN (SELECT value FROM json_each(?))",
+                (json.dumps(sorted(names)),))}
+        for name in names:
+            if name in existing:
+                self._name_index.add(name)
+            else:
+                self._name_index.remove(name)
+    
+    @property
+    def write_generation(self):
+        """数据修改的代数，本程序的写操作和发现其他程序实例的修改后都会加一"""
+        return self.changes.generation
+    
+    @property
+    def name_index(self):
+        """学生姓名的内存前缀索引，第一次使用时从数据库加载，之后由 sync_name_index 增量更新"""
+        if self._name_index is None:
+            with self.reader() as conn:
+                # 按 idx_students_identity 的顺序读取，姓名已经有序
+                names = [row[0] for row in conn.execute("SELECT DISTINCT name FROM students ORDER BY name")]
+            self._name_index = NameIndex(names)
+        return self._name_index
+    
+    def rebuild_student_points(self):
+        """按 activities、punishments 重新计算整个 student_points 表"""
+        with self.writer() as conn:
+            _rebuild_student_points(conn.cursor())
+    
+    def verify_student_points(self):
+        """核对 student_points 与实时汇总结果，返回不一致的学生
+
+        返回 [(学生ID, 表中的值, 重新计算的值), ...]，值为
+        (已获得积分, 所需积分, 处分数, 已核销数)，表中缺失时为 None。
+        """
+        with self.reader() as conn:
+            stored = {row[0]: tuple(row[1:]) for row in conn.execute("""
+                SELECT student_id, earned_points, required_points, punishment_count, cleared_count
+                FROM student_points
+            """)}
+            expected = {row[0]: tuple(row[1:]) for row in conn.execute(STUDENT_POINTS_AGGREGATE_SQL)}
+        
+        mismatches = []
+        for student_id in sorted(set(stored) | set(expected)):
+            # 没有任何记录的学生在表中可以是全零行
+            actual = stored.get(student_id)
+            wanted = expected.get(student_id, (0, 0, 0, 0))
+            if actual != wanted:
+                mismatches.append((student_id, actual, wanted))
+        return mismatches
+    
+    def rebuild_point_allocations(self):
+        """重新计算所有学生的公益积分分配"""
+        with self.writer() as conn:
+            _rebuild_point_allocations(conn.cursor())
+    
+    def verify_point_allocations(self):
+        """核对各处分的已分配积分与重新计算的结果，返回 [(处分ID, 表中的值, 重新计算的值), ...]"""
+        with self.reader() as conn:
+            return conn.execute(f"""
+                SELECT p.id, p.allocated_points, COALESCE(e.points, 0)
+                FROM punishments p
+                LEFT JOIN (
+                    SELECT punishment_id, SUM(points) AS points
+                    FROM ({_point_allocation_sql(None, partition=True)})
+                    GROUP BY punishment_id
+                ) e ON e.punishment_id = p.id
+                WHERE p.allocated_points != COALESCE(e.points, 0)
+                ORDER BY p.id
+            """).fetchall()
+    
+    def find_eligible_clearances(self):
+        """一次查询找出所有可核销的处分，用于核销前预览
+
+        返回 [(处分ID, 姓名, 性别, 年级, 专业班级, 处分类型, 处分日期, 所需积分, 已分配积分), ...]
+        """
+        with self.reader() as conn:
+            return conn.execute(f"""
+                SELECT p.id, s.name, s.gender,
+                       COALESCE(g.name, '未知年级'), COALESCE(c.name, '未知专业'),
+                       pt.name, p.date, p.required_points, p.allocated_points
+                FROM punishments p
+                JOIN students s ON p.student_id = s.id
+                JOIN punishment_types pt ON p.type_id = pt.id
+                LEFT JOIN grades g ON s.grade_id = g.id
+                LEFT JOIN classes c ON s.class_id = c.id
+                WHERE {ELIGIBLE_CLEARANCE_CONDITION}
+                ORDER BY s.name, p.date
+            """).fetchall()
+    
+    def apply_clearances(self, punishment_ids=None):
+        """在一个事务中核销可核销的处分，返回核销的数量
+
+        给出 punishment_ids 时只核销其中仍然满足条件的处分（例如预览之后积分被修改的
+        不会核销），否则核销所有可核销的处分。
+        """
+        conditions = ELIGIBLE_CLEARANCE_CONDITION
+        params = []
+        if punishment_ids is not None:
+            conditions += " AND p.id IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(punishment_ids)))
+        with self.writer() as conn:
+            cursor = conn.execute(f"""
+                UPDATE punishments AS p SET is_cleared = 1
+                WHERE {conditions}
+            """, params)
+            return cursor.rowcount
+    
+    def close(self):
+        try:
+            if self.conn:
+                self.pool.close()
+        except Exception as e:
+            print(f"关闭数据库连接失败: {str(e)}")
             raise
\ No newline at end of file
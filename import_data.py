@@ -0,0 +1,242 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from database import STUDENT_IDENTITY, Database
+
+# 各类数据文件必须包含的列，列名与界面和导出文件的表头一致
+STUDENT_COLUMNS = ["姓名", "性别", "年级", "专业班级"]
+REQUIRED_COLUMNS = {
+    "students": STUDENT_COLUMNS,
+    "punishments": STUDENT_COLUMNS + ["处分类型", "处分原因", "处分日期"],
+    "activities": STUDENT_COLUMNS + ["活动内容", "活动日期", "活动时长", "获得积分"],
+}
+# 处分数据中可选的列，为空时使用处分类型的默认所需积分
+REQUIRED_POINTS_COLUMN = "核销所需积分"
+# 拒绝文件中记录错误原因的列
+REJECT_REASON_COLUMN = "错误原因"
+
+# 每个事务写入的行数
+DEFAULT_BATCH_SIZE = 5000
+
+INSERT_STUDENTS = f"""
+    INSERT INTO students (name, gender, grade_id, class_id)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT ({STUDENT_IDENTITY}) DO NOTHING
+"""
+
+INSERT_PUNISHMENTS = """
+    INSERT INTO punishments (student_id, type_id, reason, date, required_points, is_cleared)
+    VALUES (?, ?, ?, ?, ?, 0)
+"""
+
+INSERT_ACTIVITIES = """
+    INSERT INTO activities (student_id, content, date, duration, points)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def read_table(path, sheet=None):
+    """读取 Excel 或 CSV（可为 .csv.gz）文件，所有列按文本读取"""
+    if path.lower().endswith((".xlsx", ".xls")):
+        return pd.read_excel(path, sheet_name=sheet or 0, dtype=str, keep_default_na=False)
+    return pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+
+
+def validate(db, kind, df):
+    """按列整体校验数据并解析年级、专业班级和处分类型，返回 (可导入的数据, 被拒绝的数据)
+    
+    可导入的数据增加 grade_id、class_id 等列，日期和数值已转换为入库格式；
+    被拒绝的数据保留原始内容，并在“错误原因”列中说明原因。
+    """
+    original = df
+    df = df.apply(lambda column: column.astype(str).str.strip())
+    reasons = pd.Series("", index=df.index)
+    
+    def reject(mask, reason):
+        reasons[mask] = reasons[mask] + reason + "；"
+    
+    reject(df["姓名"] == "", "姓名为空")
+    reject(~df["性别"].isin(["男", "女"]), "性别应为男或女")
+    
+    # 年级和专业班级名称一次性映射为ID
+    grades = {name: grade_id for grade_id, name in db.get_grades()}
+    df["grade_id"] = df["年级"].map(grades).astype("Int64")
+    reject(df["grade_id"].isna(), "年级不存在")
+    
+    classes = pd.DataFrame(db.get_classes(), columns=["class_id", "grade_id", "专业班级"])
+    classes["grade_id"] = classes["grade_id"].astype("Int64")
+    class_ids = df[["grade_id", "专业班级"]].reset_index().merge(
+        classes, how="left", on=["grade_id", "专业班级"]).set_index("index")["class_id"]
+    df["class_id"] = class_ids.astype("Int64")
+    reject(df["grade_id"].notna() & df["class_id"].isna(), "该年级下没有此专业班级")
+    
+    if kind == "punishments":
+        with db.reader() as conn:
+            types = conn.execute("SELECT name, id, required_points FROM punishment_types").fetchall()
+        type_ids = {name: type_id for name, type_id, _ in types}
+        type_points = {name: points for name, _, points in types}
+        df["type_id"] = df["处分类型"].map(type_ids).astype("Int64")
+        reject(df["type_id"].isna(), "处分类型不存在")
+        
+        df["date"] = parse_dates(df["处分日期"])
+        reject(df["date"].isna(), "处分日期格式应为 yyyy-MM-dd")
+        
+        default_points = df["处分类型"].map(type_points)
+        if REQUIRED_POINTS_COLUMN in df.columns:
+            points = pd.to_numeric(df[REQUIRED_POINTS_COLUMN], errors="coerce")
+            reject((df[REQUIRED_POINTS_COLUMN] != "") & ~is_whole_number(points, 0, 1000),
+                   "核销所需积分应为 0 到 1000 的整数")
+            df["required_points"] = points.fillna(default_points)
+        else:
+            df["required_points"] = default_points
+    
+    elif kind == "activities":
+        reject(df["活动内容"] == "", "活动内容为空")
+        
+        df["date"] = parse_dates(df["活动日期"])
+        reject(df["date"].isna(), "活动日期格式应为 yyyy-MM-dd")
+        
+        df["duration"] = pd.to_numeric(df["活动时长"], errors="coerce")
+        reject(~df["duration"].between(0, 24), "活动时长应为 0 到 24 小时")
+        
+        df["points"] = pd.to_numeric(df["获得积分"], errors="coerce")
+        reject(~is_whole_number(df["points"], 0, 100), "获得积分应为 0 到 100 的整数")
+    
+    valid = reasons == ""
+    rejected = original[~valid].copy()
+    rejected[REJECT_REASON_COLUMN] = reasons[~valid].str.rstrip("；")
+    return df[valid], rejected
+
+
+def parse_dates(values):
+    """把日期文本转换为 yyyy-MM-dd，无法识别的为空值
+    
+    Excel 中的日期单元格按文本读取后形如 2024-03-01 00:00:00，只取日期部分。
+    """
+    dates = pd.to_datetime(values, format="%Y-%m-%d", exact=False, errors="coerce")
+    return dates.dt.strftime("%Y-%m-%d").where(dates.notna(), None)
+
+
+def is_whole_number(values, low, high):
+    return values.between(low, high) & (values % 1 == 0)
+
+
+def resolve_students(conn, batch):
+    """批量写入本批数据中的学生并返回每行对应的学生ID
+    
+    已存在的学生不会重复创建；学生ID通过临时表一次关联查询取回。
+    """
+    identities = list(zip(batch["姓名"].tolist(), batch["性别"].tolist(),
+                          batch["grade_id"].tolist(), batch["class_id"].tolist()))
+    unique_identities = list(dict.fromkeys(identities))
+    conn.executemany(INSERT_STUDENTS, unique_identities)
+    
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS import_students (
+            name TEXT, gender TEXT, grade_id INTEGER, class_id INTEGER
+        )
+    """)
+    conn.execute("DELETE FROM temp.import_students")
+    conn.executemany("INSERT INTO temp.import_students VALUES (?, ?, ?, ?)", unique_identities)
+    student_ids = {
+        (name, gender, grade_id, class_id): student_id
+        for student_id, name, gender, grade_id, class_id in conn.execute("""
+            SELECT s.id, s.name, s.gender, s.grade_id, s.class_id
+            FROM temp.import_students i
+            JOIN students s ON s.name = i.name AND s.gender = i.gender
+                           AND s.grade_id = i.grade_id AND s.class_id = i.class_id
+        """)
+    }
+    conn.execute("DELETE FROM temp.import_students")
+    return [student_ids[identity] for identity in identities]
+
+
+def import_rows(db, kind, rows, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """把校验过的数据按批写入数据库，每批一个事务，返回写入的行数
+    
+    积分汇总表由触发器随处分和活动记录一起更新。
+    """
+    done = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows.iloc[start:start + batch_size]
+        with db.writer() as conn:
+            student_ids = resolve_students(conn, batch)
+            if kind == "punishments":
+                conn.executemany(INSERT_PUNISHMENTS, zip(
+                    student_ids, batch["type_id"].tolist(), batch["处分原因"].tolist(),
+                    batch["date"].tolist(), batch["required_points"].astype(int).tolist()))
+            elif kind == "activities":
+                conn.executemany(INSERT_ACTIVITIES, zip(
+                    student_ids, batch["活动内容"].tolist(), batch["date"].tolist(),
+                    batch["duration"].tolist(), batch["points"].astype(int).tolist()))
+        done += len(batch)
+        if progress is not None:
+            progress(done, len(rows))
+    return done
+
+
+def reject_file_path(path):
+    base = os.path.basename(path)
+    for suffix in (".csv.gz", ".csv", ".xlsx", ".xls"):
+        if base.lower().endswith(suffix):
+            base = base[:-len(suffix)]
+            break
+    return os.path.join(os.path.dirname(os.path.abspath(path)), f"{base}_rejects.csv")
+
+
+def main():
+    default_db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "student_management.db")
+    
+    parser = argparse.ArgumentParser(description="从 Excel 或 CSV 文件批量导入学生、处分和公益活动记录")
+    parser.add_argument("kind", choices=sorted(REQUIRED_COLUMNS), help="导入的数据类型")
+    parser.add_argument("file", help="Excel（.xlsx）或 CSV（.csv、.csv.gz）文件")
+    parser.add_argument("--db", default=default_db_path, help="数据库文件路径")
+    parser.add_argument("--sheet", help="Excel 文件中的工作表名称，默认第一个工作表")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="每个事务写入的行数")
+    parser.add_argument("--rejects", help="拒绝文件路径，默认与导入文件同目录的 <文件名>_rejects.csv")
+    args = parser.parse_args()
+    
+    started_at = time.perf_counter()
+    try:
+        df = read_table(args.file, args.sheet)
+    except Exception as e:
+        print(f"读取文件失败: {str(e)}")
+        return 2
+    
+    missing = [column for column in REQUIRED_COLUMNS[args.kind] if column not in df.columns]
+    if missing:
+        print(f"文件缺少以下列: {', '.join(missing)}")
+        return 2
+    
+    db = Database(args.db)
+    try:
+        rows, rejected = validate(db, args.kind, df)
+        validated_at = time.perf_counter()
+        print(f"读取并校验 {len(df)} 行，用时 {validated_at - started_at:.2f} 秒")
+        
+        imported = import_rows(db, args.kind, rows, args.batch_size,
+                               lambda done, total: print(f"已导入 {done}/{total} 行"))
+        finished_at = time.perf_counter()
+    finally:
+        db.close()
+    
+    elapsed = finished_at - started_at
+    insert_elapsed = finished_at - validated_at
+    print(f"共 {len(df)} 行，导入 {imported} 行，拒绝 {len(rejected)} 行")
+    print(f"总用时 {elapsed:.2f} 秒（{len(df) / max(elapsed, 1e-9):.0f} 行/秒），"
+          f"写入用时 {insert_elapsed:.2f} 秒（{imported / max(insert_elapsed, 1e-9):.0f} 行/秒）")
+    
+    if len(rejected):
+        rejects_path = args.rejects or reject_file_path(args.file)
+        rejected.to_csv(rejects_path, index=False, encoding="utf-8-sig")
+        print(f"被拒绝的行已写入 {rejects_path}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
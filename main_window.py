@@ -1,11 +1,24 @@
-from PyQt5.QtWidgets import QMainWindow, QTabWidget, QVBoxLayout, QWidget, QLabel, QDesktopWidget, QPushButton, QDialog, QHBoxLayout
-from PyQt5.QtGui import QIcon, QPixmap, QTextCursor
+from PyQt5.QtWidgets import QMainWindow, QTabWidget, QVBoxLayout, QWidget, QLabel, QDesktopWidget, QPushButton, QDialog, QHBoxLayout, QShortcut
+from PyQt5.QtGui import QIcon, QPixmap, QTextCursor, QKeySequence
 from PyQt5.QtCore import Qt, QTimer, QLocale
+import logging
+import time
 import win32api, win32con, win32gui
 
 from ui.punishment_tab import PunishmentTab
 from ui.activity_tab import ActivityTab
 from ui.statistics_tab import StatisticsTab
+from ui.diagnostics_dialog import DiagnosticsDialog
+from ui.change_watcher import ChangeWatcher
+
+logger = logging.getLogger(__name__)
+
+# 标签页按顺序排列：(标题, MainWindow 上的属性名, 标签页类)
+TABS = [
+    ("处分记录管理", "punishment_tab", PunishmentTab),
+    ("公益活动记录", "activity_tab", ActivityTab),
+    ("积分统计", "statistics_tab", StatisticsTab),
+]
 
 class HelpDialog(QDialog):
     def __init__(self, parent=None):
@@ -92,9 +105,11 @@ class HelpDialog(QDialog):
         self.setLayout(layout)
 
 class MainWindow(QMainWindow):
-    def __init__(self, db):
+    def __init__(self, db, started_at=None):
         super().__init__()
         self.db = db
+        # 程序启动时刻，用于记录启动耗时
+        self.started_at = started_at if started_at is not None else time.perf_counter()
         # 设置全局样式
         self.setStyleSheet("""
             QComboBox {
@@ -179,14 +194,16 @@ class MainWindow(QMainWindow):
         
         main_layout.addWidget(header_widget)
         
-        # 创建标签页
+        # 创建标签页，先放入空白页面，各标签页在第一次显示时才创建并加载数据
         self.tab_widget = QTabWidget()
-        self.punishment_tab = PunishmentTab(self.db)
-        self.activity_tab = ActivityTab(self.db)
-        self.statistics_tab = StatisticsTab(self.db)
-        
-        self.tab_widget.addTab(self.punishment_tab, "处分记录管理")
-        self.tab_widget.addTab(self.activity_tab, "公益活动记录")
+        self.tab_pages = []
+        for title, attr, _ in TABS:
+            setattr(self, attr, None)
+            page = QWidget()
+            page_layout = QVBoxLayout(page)
+            page_layout.setContentsMargins(0, 0, 0, 0)
+            self.tab_pages.append(page)
+            self.tab_widget.addTab(page, title)
         
         # 连接标签页切换信号
         self.tab_widget.currentChanged.connect(self.onTabChanged)
@@ -207,9 +224,6 @@ class MainWindow(QMainWindow):
         button_layout.addWidget(exit_button)
         button_layout.setAlignment(Qt.AlignRight)
         
-        # 添加积分统计标签页
-        self.tab_widget.addTab(self.statistics_tab, "积分统计")
-        
         # 将按钮布局添加到主布局
         main_layout.addLayout(button_layout)
         main_layout.addWidget(self.tab_widget)
@@ -217,14 +231,57 @@ class MainWindow(QMainWindow):
         # 设置窗口图标
         self.setWindowIcon(QIcon("logo.png"))
         
-        # 设置初始焦点到姓名输入框
+        # 隐藏的数据库诊断对话框，不在界面上显示入口
+        self.diagnostics_dialog = None
+        diagnostics_shortcut = QShortcut(QKeySequence("Ctrl+Shift+D"), self)
+        diagnostics_shortcut.activated.connect(self.showDiagnostics)
+        
+        # 其他程序实例修改同一数据库后，打开的标签页只更新变化的记录
+        self.change_watcher = ChangeWatcher(self.db, parent=self)
+        self.change_watcher.start()
+        
+        # 窗口显示后再创建第一个标签页，数据在后台线程中加载
         self.tab_widget.setCurrentIndex(0)  # 确保处分记录管理标签页是当前页
+        QTimer.singleShot(0, self.loadInitialTab)
+        
+        # 设置初始焦点到姓名输入框
         QTimer.singleShot(100, self.setInitialFocus)
     
+    def ensureTab(self, index):
+        """返回指定位置的标签页，第一次访问时创建"""
+        title, attr, tab_class = TABS[index]
+        tab = getattr(self, attr)
+        if tab is None:
+            started = time.perf_counter()
+            tab = tab_class(self.db)
+            self.tab_pages[index].layout().addWidget(tab)
+            setattr(self, attr, tab)
+            logger.info("创建标签页「%s」耗时 %.0f ms", title, (time.perf_counter() - started) * 1000)
+        return tab
+    
+    def loadInitialTab(self):
+        logger.info("主窗口显示耗时 %.0f ms", (time.perf_counter() - self.started_at) * 1000)
+        tab = self.ensureTab(self.tab_widget.currentIndex())
+        if tab is self.punishment_tab:
+            tab.loader.pageLoaded.connect(self.onInitialDataLoaded)
+    
+    def onInitialDataLoaded(self, page_rows, loaded_rows):
+        self.punishment_tab.loader.pageLoaded.disconnect(self.onInitialDataLoaded)
+        logger.info("启动完成，首页 %d 条记录加载完毕，总耗时 %.0f ms",
+                    loaded_rows, (time.perf_counter() - self.started_at) * 1000)
+    
     def show_help(self):
         help_dialog = HelpDialog(self)
         help_dialog.exec_()
     
+    def showDiagnostics(self):
+        if self.diagnostics_dialog is None:
+            self.diagnostics_dialog = DiagnosticsDialog(self.db, self)
+        else:
+            self.diagnostics_dialog.refresh()
+        self.diagnostics_dialog.show()
+        self.diagnostics_dialog.raise_()
+    
     def closeEvent(self, event):
         # 关闭所有子窗口
         for child in self.findChildren(QDialog):
@@ -234,13 +291,14 @@ class MainWindow(QMainWindow):
         sys.exit(0)
         
     def onTabChanged(self, index):
-        # 当切换到积分统计标签页时，自动加载数据
+        tab = self.ensureTab(index)
+        # 切换到积分统计标签页时，第一次完整加载，之后只重新统计数据有变化的学生
         if index == 2:  # 积分统计标签页的索引是2
-            self.statistics_tab.searchRecords()
+            tab.refreshIfChanged()
     
     def setInitialFocus(self):
         # 设置焦点到姓名输入框
-        self.punishment_tab.name_edit.setFocus()
+        self.ensureTab(0).name_edit.setFocus()
         
         # 设置输入法为中文
         # 获取当前窗口句柄
@@ -0,0 +1,85 @@
+import argparse
+import os
+import sys
+import time
+
+from database import Database
+
+
+def rebuild_points(db):
+    db.rebuild_student_points()
+    db.rebuild_point_allocations()
+    print("积分汇总表和积分分配已重建")
+    return verify_points(db)
+
+
+def verify_points(db):
+    mismatches = db.verify_student_points()
+    allocation_mismatches = db.verify_point_allocations()
+    if not mismatches and not allocation_mismatches:
+        print("积分汇总表和积分分配与明细记录一致")
+        return 0
+    
+    if mismatches:
+        print(f"发现 {len(mismatches)} 名学生的积分汇总不一致（已获得积分, 所需积分, 处分数, 已核销数）：")
+        for student_id, actual, expected in mismatches:
+            print(f"  学生ID {student_id}: 汇总表 {actual}，应为 {expected}")
+    if allocation_mismatches:
+        print(f"发现 {len(allocation_mismatches)} 条处分的已分配积分不一致：")
+        for punishment_id, actual, expected in allocation_mismatches:
+            print(f"  处分ID {punishment_id}: 已分配 {actual}，应为 {expected}")
+    print("可运行 python maintenance.py rebuild-points 重建")
+    return 1
+
+
+def clear_eligible(db, apply=False):
+    started_at = time.perf_counter()
+    eligible = db.find_eligible_clearances()
+    elapsed = time.perf_counter() - started_at
+    print(f"可核销的处分共 {len(eligible)} 条（查询用时 {elapsed:.2f} 秒）")
+    for punishment_id, name, gender, grade, major, type_name, date, required, allocated in eligible:
+        print(f"  处分ID {punishment_id}: {name} {gender} {grade} {major} {type_name} {date}"
+              f"，所需 {required} 分，已分配 {allocated} 分")
+    
+    if not apply:
+        if eligible:
+            print("加 --apply 参数执行核销")
+        return 0
+    
+    started_at = time.perf_counter()
+    cleared = db.apply_clearances([row[0] for row in eligible])
+    elapsed = time.perf_counter() - started_at
+    print(f"已核销 {cleared} 条处分（用时 {elapsed:.2f} 秒）")
+    return 0
+
+
+def main():
+    default_db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "student_management.db")
+    
+    parser = argparse.ArgumentParser(description="学生处分核销管理系统数据库维护工具")
+    parser.add_argument("--db", default=default_db_path, help="数据库文件路径")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("rebuild-points", help="根据处分和公益活动记录重建积分汇总表和积分分配")
+    subparsers.add_parser("verify-points", help="核对积分汇总表和积分分配与明细记录是否一致")
+    clear_parser = subparsers.add_parser("clear-eligible", help="列出已分配到足够积分的未核销处分，加 --apply 批量核销")
+    clear_parser.add_argument("--apply", action="store_true", help="在一个事务中核销列出的处分")
+    args = parser.parse_args()
+    
+    commands = {
+        "rebuild-points": rebuild_points,
+        "verify-points": verify_points,
+        "clear-eligible": lambda db: clear_eligible(db, args.apply),
+    }
+    if args.command not in commands:
+        parser.print_help()
+        return 2
+    
+    db = Database(args.db)
+    try:
+        return commands[args.command](db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,768 @@
+"""界面使用的所有查询和写操作
+
+每条语句都是固定文本的命名语句（Statement），筛选条件由 FilterBuilder 组合成
+WHERE 子句，值一律通过参数传入。相同形状的查询得到完全相同的 SQL 文本，
+sqlite3 的语句缓存（见 database.STATEMENT_CACHE_SIZE）因此可以复用已编译的语句。
+语句名以注释的形式写在 SQL 开头，在诊断对话框和慢查询日志中可以直接看到。
+"""
+import json
+from typing import NamedTuple, Optional
+
+from utils.event_bus import DataChange
+
+
+class PunishmentType(NamedTuple):
+    id: int
+    name: str
+    required_points: int
+
+
+class PunishmentRow(NamedTuple):
+    """处分列表中的一行"""
+    id: int
+    name: str
+    gender: str
+    grade_name: str
+    class_name: str
+    punishment_type: str
+    date: str
+    required_points: int
+    status: str
+    student_id: int
+
+
+class PunishmentDetail(NamedTuple):
+    """编辑处分时填入表单的数据"""
+    name: str
+    gender: str
+    grade_id: int
+    class_id: int
+    type_id: int
+    reason: str
+    date: str
+    required_points: int
+
+
+class ClearanceState(NamedTuple):
+    is_cleared: int
+    allocated_points: int
+    required_points: int
+
+
+class ActivityRow(NamedTuple):
+    """活动列表中的一行"""
+    id: int
+    name: str
+    gender: str
+    grade_name: str
+    class_name: str
+    content: str
+    date: str
+    duration: float
+    points: int
+    student_id: int
+
+
+class ActivityDetail(NamedTuple):
+    """编辑活动时填入表单的数据"""
+    name: str
+    gender: str
+    grade_id: int
+    class_id: int
+    content: str
+    date: str
+    duration: float
+    points: int
+
+
+class StudentStatistics(NamedTuple):
+    """积分统计表中的一行"""
+    student_id: int
+    name: str
+    gender: str
+    grade_name: str
+    class_name: str
+    required_points: int
+    earned_points: int
+    status: str
+
+
+class StudentPunishment(NamedTuple):
+    type_name: str
+    reason: str
+    date: str
+    required_points: int
+    status: str
+    id: int
+
+
+class StudentActivity(NamedTuple):
+    content: str
+    date: str
+    duration: float
+    points: int
+
+
+class EligibleClearance(NamedTuple):
+    id: int
+    name: str
+    gender: str
+    grade_name: str
+    class_name: str
+    punishment_type: str
+    date: str
+    required_points: int
+    allocated_points: int
+
+
+class StatisticsFilter(NamedTuple):
+    """积分统计的筛选条件，空字符串和 None 表示不筛选"""
+    name: str = ""
+    grade_id: Optional[int] = None
+    major: Optional[str] = None
+    punishment_type: Optional[str] = None
+    # True 时按姓名前缀筛选（边输入边查询），否则按姓名中的片段筛选
+    name_prefix: bool = False
+
+
+class Query(NamedTuple):
+    """绑定了参数的语句，可交给 QueryWorker 或导出函数执行"""
+    sql: str
+    params: list
+    row_type: Optional[type] = None
+
+
+class FilterBuilder:
+    """逐个添加筛选条件，组合成 WHERE 子句和对应的参数列表
+
+    值为 None 或空字符串的条件不会添加，调用方不需要逐个判断。
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.conditions = []
+        self.params = []
+
+    def __bool__(self):
+        return bool(self.conditions)
+
+    def copy(self):
+        filters = FilterBuilder(self.db)
+        filters.conditions = list(self.conditions)
+        filters.params = list(self.params)
+        return filters
+
+    def add(self, condition, params=()):
+        self.conditions.append(condition)
+        self.params.extend(params)
+        return self
+
+    def equals(self, column, value):
+        if value is not None and value != "":
+            self.add(f"{column} = ?", [value])
+        return self
+
+    def text(self, fts_table, id_column, column, text):
+        """按关键词筛选，能使用全文索引时查 fts_table，否则对 column 使用 LIKE"""
+        if text:
+            self.add(*self.db.text_condition(fts_table, id_column, column, text))
+        return self
+
+    def prefix(self, column, prefix, use_index=True):
+        if prefix:
+            self.add(*self.db.prefix_condition(column, prefix, use_index))
+        return self
+
+    def either(self, *filters):
+        """添加一个条件：给出的几组条件满足其中一组即可"""
+        filters = [f for f in filters if f]
+        if filters:
+            self.add("(" + " OR ".join(f"({' AND '.join(f.conditions)})" for f in filters) + ")",
+                     [param for f in filters for param in f.params])
+        return self
+
+    def where(self):
+        if not self.conditions:
+            return ""
+        return " WHERE " + " AND ".join(self.conditions)
+
+
+class Statement:
+    """命名的参数化语句
+
+    sql 为不含 WHERE 的语句主体，tail 为跟在 WHERE 之后的 GROUP BY/ORDER BY/LIMIT 等。
+    """
+
+    def __init__(self, name, sql, row_type=None, tail=""):
+        self.name = name
+        self.sql = f"/* {name} */ " + " ".join(sql.split())
+        self.row_type = row_type
+        self.tail = tail
+
+    def query(self, params=(), filters=None, tail=None):
+        sql = self.sql
+        all_params = []
+        if filters is not None:
+            sql += filters.where()
+            all_params.extend(filters.params)
+        tail = self.tail if tail is None else tail
+        if tail:
+            sql += " " + tail
+        all_params.extend(params)
+        return Query(sql, all_params, self.row_type)
+
+
+class PagedStatement(Statement):
+    """按 key_columns 降序键集分页的列表语句
+
+    取下一页时以上一页最后一条记录的键作为条件，不使用 OFFSET，
+    每页的代价与已加载的页数无关。
+    """
+
+    def __init__(self, name, sql, row_type, key_columns):
+        super().__init__(name, sql, row_type)
+        self.key_columns = key_columns
+        placeholders = ", ".join("?" * len(key_columns))
+        self.after_condition = f"({', '.join(key_columns)}) < ({placeholders})"
+        self.order_by = "ORDER BY " + ", ".join(f"{column} DESC" for column in key_columns)
+
+    def page(self, filters, after=None, limit=200):
+        """返回 filters 筛选后、键小于 after 的 limit 条记录的查询"""
+        page_filters = filters.copy()
+        if after is not None:
+            page_filters.add(self.after_condition, after)
+        return self.query([limit], page_filters, f"{self.order_by} LIMIT ?")
+
+    def row(self, conn, id_column, record_id, filters=None):
+        """在 conn 上按主键读取一条记录，给出 filters 时记录须同时满足筛选条件，否则返回 None"""
+        row_filters = filters.copy() if filters is not None else FilterBuilder(None)
+        query = self.query(filters=row_filters.add(f"{id_column} = ?", [record_id]))
+        row = conn.execute(query.sql, query.params).fetchone()
+        return None if row is None else self.row_type._make(row)
+
+    def rows(self, conn, id_column, record_ids, filters=None):
+        """在 conn 上按主键读取多条记录，只返回满足 filters 的记录"""
+        row_filters = filters.copy() if filters is not None else FilterBuilder(None)
+        row_filters.add(f"{id_column} IN (SELECT value FROM json_each(?))", [json.dumps(sorted(record_ids))])
+        query = self.query(filters=row_filters)
+        return [self.row_type._make(row) for row in conn.execute(query.sql, query.params)]
+
+    def ordered(self, filters, order_by=()):
+        """返回不分页的查询，按 order_by 排序，同值时保持列表默认的降序"""
+        order_by = list(order_by) + [f"{column} DESC" for column in self.key_columns]
+        return self.query((), filters, "ORDER BY " + ", ".join(order_by))
+
+
+class KeywordSearch(NamedTuple):
+    """关键词搜索的查询方式
+
+    query 为按相关度排序的查询，关键词过短或没有全文索引时为 None，此时按
+    filters 分页显示 LIKE 匹配的记录。filters 同时是与搜索结果等价的筛选条件，
+    供导出使用。
+    """
+    query: Optional[Query]
+    filters: FilterBuilder
+
+
+PUNISHMENT_LIST_SQL = """
+    SELECT p.id, s.name, s.gender,
+           COALESCE(g.name, '未知年级') as grade_name, COALESCE(c.name, '未知专业') as class_name,
+           pt.name as punishment_type, p.date, p.required_points,
+           CASE WHEN p.is_cleared = 1 THEN '已核销' ELSE '未核销' END as status,
+           p.student_id
+    FROM punishments p
+    JOIN students s ON p.student_id = s.id
+    JOIN punishment_types pt ON p.type_id = pt.id
+    LEFT JOIN grades g ON s.grade_id = g.id
+    LEFT JOIN classes c ON s.class_id = c.id
+"""
+
+# 关键词命中的处分及相关度：每个关键词须命中处分原因或学生姓名（此时为该学生的所有处分），
+# 参数为三次关键词 MATCH 表达式的 JSON 数组
+PUNISHMENT_KEYWORD_HITS = """
+    SELECT id, MIN(rank) AS rank FROM (
+        SELECT t.key AS term, f.rowid AS id, f.rank AS rank
+        FROM json_each(?) t JOIN punishment_fts f ON f.punishment_fts MATCH t.value
+        UNION ALL
+        SELECT t.key, p.id, f.rank FROM json_each(?) t
+        JOIN student_fts f ON f.student_fts MATCH t.value
+        JOIN punishments p ON p.student_id = f.rowid
+    )
+    GROUP BY id
+    HAVING COUNT(DISTINCT term) = json_array_length(?)
+"""
+
+# 活动表格各列，导出活动列表时只输出这些列，不含列表记录末尾的学生ID
+ACTIVITY_TABLE_COLUMNS = """
+    a.id, s.name, s.gender,
+    COALESCE(g.name, '未知年级') as grade_name, COALESCE(c.name, '未知专业') as class_name,
+    a.content, a.date, a.duration, a.points
+"""
+ACTIVITY_LIST_FROM = """
+    FROM activities a
+    JOIN students s ON a.student_id = s.id
+    LEFT JOIN grades g ON s.grade_id = g.id
+    LEFT JOIN classes c ON s.class_id = c.id
+"""
+ACTIVITY_LIST_SQL = f"SELECT {ACTIVITY_TABLE_COLUMNS}, a.student_id {ACTIVITY_LIST_FROM}"
+
+# 关键词命中的活动及相关度：每个关键词须命中活动内容或学生姓名（此时为该学生的所有活动）
+ACTIVITY_KEYWORD_HITS = """
+    SELECT id, MIN(rank) AS rank FROM (
+        SELECT t.key AS term, f.rowid AS id, f.rank AS rank
+        FROM json_each(?) t JOIN activity_fts f ON f.activity_fts MATCH t.value
+        UNION ALL
+        SELECT t.key, a.id, f.rank FROM json_each(?) t
+        JOIN student_fts f ON f.student_fts MATCH t.value
+        JOIN activities a ON a.student_id = f.rowid
+    )
+    GROUP BY id
+    HAVING COUNT(DISTINCT term) = json_array_length(?)
+"""
+
+PUNISHMENT_LIST = PagedStatement("punishment_list", PUNISHMENT_LIST_SQL, PunishmentRow, ("p.date", "p.id"))
+PUNISHMENT_KEYWORD_SEARCH = Statement(
+    "punishment_keyword_search",
+    PUNISHMENT_LIST_SQL + f" JOIN ({PUNISHMENT_KEYWORD_HITS}) h ON h.id = p.id",
+    PunishmentRow, "ORDER BY h.rank, p.date DESC, p.id DESC LIMIT ?")
+PUNISHMENT_DETAIL = Statement("punishment_detail", """
+    SELECT s.name, s.gender, s.grade_id, s.class_id,
+           p.type_id, p.reason, p.date, p.required_points
+    FROM punishments p
+    JOIN students s ON p.student_id = s.id
+    WHERE p.id = ?
+""", PunishmentDetail)
+PUNISHMENT_TYPES = Statement("punishment_types", """
+    SELECT id, name, required_points FROM punishment_types ORDER BY display_order
+""", PunishmentType)
+PUNISHMENT_TYPE_POINTS = Statement("punishment_type_points", """
+    SELECT required_points FROM punishment_types WHERE id = ?
+""")
+PUNISHMENT_CLEARANCE_STATE = Statement("punishment_clearance_state", """
+    SELECT is_cleared, allocated_points, required_points FROM punishments WHERE id = ?
+""", ClearanceState)
+INSERT_PUNISHMENT = Statement("insert_punishment", """
+    INSERT INTO punishments (student_id, type_id, reason, date, required_points, is_cleared)
+    VALUES (?, ?, ?, ?, ?, 0)
+""")
+UPDATE_PUNISHMENT = Statement("update_punishment", """
+    UPDATE punishments
+    SET student_id = ?, type_id = ?, reason = ?, date = ?, required_points = ?
+    WHERE id = ?
+""")
+DELETE_PUNISHMENT = Statement("delete_punishment", "DELETE FROM punishments WHERE id = ?")
+PUNISHMENT_STUDENT = Statement("punishment_student", "SELECT student_id FROM punishments WHERE id = ?")
+PUNISHMENT_STUDENTS = Statement("punishment_students", """
+    SELECT DISTINCT student_id FROM punishments WHERE id IN (SELECT value FROM json_each(?))
+""")
+CLEAR_PUNISHMENT = Statement("clear_punishment", "UPDATE punishments SET is_cleared = 1 WHERE id = ?")
+
+ACTIVITY_LIST = PagedStatement("activity_list", ACTIVITY_LIST_SQL, ActivityRow, ("a.date", "a.id"))
+ACTIVITY_TABLE_EXPORT = PagedStatement(
+    "activity_table_export",
+    f"SELECT {ACTIVITY_TABLE_COLUMNS} {ACTIVITY_LIST_FROM}",
+    None, ACTIVITY_LIST.key_columns)
+ACTIVITY_KEYWORD_SEARCH = Statement(
+    "activity_keyword_search",
+    ACTIVITY_LIST_SQL + f" JOIN ({ACTIVITY_KEYWORD_HITS}) h ON h.id = a.id",
+    ActivityRow, "ORDER BY h.rank, a.date DESC, a.id DESC LIMIT ?")
+ACTIVITY_DETAIL = Statement("activity_detail", """
+    SELECT s.name, s.gender, s.grade_id, s.class_id, a.content, a.date, a.duration, a.points
+    FROM activities a
+    JOIN students s ON a.student_id = s.id
+    WHERE a.id = ?
+""", ActivityDetail)
+INSERT_ACTIVITY = Statement("insert_activity", """
+    INSERT INTO activities (student_id, content, date, duration, points)
+    VALUES (?, ?, ?, ?, ?)
+""")
+UPDATE_ACTIVITY = Statement("update_activity", """
+    UPDATE activities
+    SET student_id = ?, content = ?, date = ?, duration = ?, points = ?
+    WHERE id = ?
+""")
+DELETE_ACTIVITY = Statement("delete_activity", "DELETE FROM activities WHERE id = ?")
+ACTIVITY_STUDENT = Statement("activity_student", "SELECT student_id FROM activities WHERE id = ?")
+
+# 不按处分类型筛选时，所需积分和核销状态都已汇总在 student_points 中
+STATISTICS = Statement("statistics", """
+    SELECT s.id as student_id, s.name, s.gender,
+           COALESCE(g.name, '未知') as grade_name, COALESCE(c.name, '未知') as class_name,
+           sp.required_points, sp.earned_points,
+           CASE WHEN sp.cleared_count = sp.punishment_count THEN '已核销' ELSE '' END as status
+    FROM student_points sp
+    JOIN students s ON s.id = sp.student_id
+    LEFT JOIN grades g ON s.grade_id = g.id
+    LEFT JOIN classes c ON s.class_id = c.id
+""", StudentStatistics, "ORDER BY s.name")
+# 按处分类型筛选时，所需积分和状态只统计该类型的处分
+STATISTICS_BY_TYPE = Statement("statistics_by_type", """
+    SELECT s.id as student_id, s.name, s.gender,
+           COALESCE(g.name, '未知') as grade_name, COALESCE(c.name, '未知') as class_name,
+           SUM(p.required_points) as total_required_points,
+           COALESCE(sp.earned_points, 0) as earned_points,
+           CASE WHEN COUNT(*) = SUM(CASE WHEN p.is_cleared = 1 THEN 1 ELSE 0 END) THEN '已核销' ELSE '' END as status
+    FROM students s
+    JOIN punishments p ON s.id = p.student_id
+    JOIN punishment_types pt ON p.type_id = pt.id
+    LEFT JOIN student_points sp ON sp.student_id = s.id
+    LEFT JOIN grades g ON s.grade_id = g.id
+    LEFT JOIN classes c ON s.class_id = c.id
+""", StudentStatistics, "GROUP BY s.id ORDER BY s.name")
+STUDENT_PUNISHMENTS = Statement("student_punishments", """
+    SELECT pt.name, p.reason, p.date, p.required_points,
+           CASE WHEN p.is_cleared = 1 THEN '已核销' ELSE '未核销' END,
+           p.id
+    FROM punishments p
+    JOIN punishment_types pt ON p.type_id = pt.id
+    WHERE p.student_id = ?
+    ORDER BY p.date DESC
+""", StudentPunishment)
+STUDENT_ACTIVITIES = Statement("student_activities", """
+    SELECT content, date, duration, points
+    FROM activities
+    WHERE student_id = ?
+    ORDER BY date DESC
+""", StudentActivity)
+DELETE_STUDENT_ACTIVITIES = Statement("delete_student_activities", "DELETE FROM activities WHERE student_id = ?")
+DELETE_STUDENT_PUNISHMENTS = Statement("delete_student_punishments", "DELETE FROM punishments WHERE student_id = ?")
+DELETE_STUDENT = Statement("delete_student", "DELETE FROM students WHERE id = ?")
+STUDENT_NAME = Statement("student_name", "SELECT name FROM students WHERE id = ?")
+
+CHANGE_LOG_RANGE = Statement("change_log_range", "SELECT MIN(seq), MAX(seq) FROM change_log")
+CHANGES_SINCE = Statement("changes_since", """
+    SELECT seq, table_name, row_id, student_id
+    FROM change_log
+    WHERE seq > ?
+    ORDER BY seq
+    LIMIT ?
+""")
+
+# 导出统计表时，统计查询的结果加上尚需积分列
+STATISTICS_EXPORT_SQL = """
+    /* statistics_export */ WITH stats(student_id, name, gender, grade_name, class_name,
+               required_points, earned_points, status) AS ({query})
+    SELECT name, gender, grade_name, class_name, required_points, earned_points,
+           MAX(0, required_points - earned_points) AS remaining_points, status
+    FROM stats
+"""
+# 导出统计表时各列对应的排序列，顺序与统计表格的列一致
+STATISTICS_EXPORT_COLUMNS = ["name", "gender", "grade_name", "class_name", "required_points",
+                             "earned_points", "remaining_points", "status"]
+PUNISHMENT_EXPORT = Statement("punishment_export", """
+    SELECT s.name, pt.name, p.reason, p.date, p.required_points,
+           CASE WHEN p.is_cleared = 1 THEN '已核销' ELSE '未核销' END
+    FROM punishments p
+    JOIN students s ON p.student_id = s.id
+    JOIN punishment_types pt ON p.type_id = pt.id
+""", tail="ORDER BY s.name, p.date DESC")
+ACTIVITY_EXPORT = Statement("activity_export", """
+    SELECT s.name, a.content, a.date, a.duration, a.points
+    FROM activities a
+    JOIN students s ON a.student_id = s.id
+""", tail="ORDER BY s.name, a.date DESC")
+# 导出活动列表时表格各列对应的排序表达式，顺序与活动表格的列一致
+ACTIVITY_EXPORT_ORDER = ["a.id", "s.name", "s.gender", "grade_name", "class_name",
+                         "a.content", "a.date", "a.duration", "a.points"]
+
+
+def order_by_column(columns, sort_column, descending):
+    """把表格的排序列转换为 ORDER BY 项，列号不在 columns 范围内时返回空列表"""
+    if not 0 <= sort_column < len(columns):
+        return []
+    return [f"{columns[sort_column]} {'DESC' if descending else 'ASC'}"]
+
+
+class Repository:
+    """界面访问数据库的唯一入口，读操作使用只读连接，写操作在一个事务中完成"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def filters(self):
+        return FilterBuilder(self.db)
+
+    def _all(self, statement, params=()):
+        query = statement.query(params)
+        with self.db.reader() as conn:
+            rows = conn.execute(query.sql, query.params).fetchall()
+        if statement.row_type is None:
+            return rows
+        return [statement.row_type._make(row) for row in rows]
+
+    def _one(self, statement, params=()):
+        query = statement.query(params)
+        with self.db.reader() as conn:
+            row = conn.execute(query.sql, query.params).fetchone()
+        if row is None or statement.row_type is None:
+            return row
+        return statement.row_type._make(row)
+
+    def _write(self, conn, statement, params=()):
+        return conn.execute(statement.sql, params)
+
+    def _student_of(self, conn, statement, record_id):
+        row = conn.execute(statement.sql, (record_id,)).fetchone()
+        return row[0] if row else None
+
+    def _keyword_filters(self, keyword, *targets):
+        """每个关键词须在 targets（(索引表名, ID列, 文本列) 的列表）的任一列中出现
+
+        逐个关键词选择全文索引或 LIKE，较长的关键词仍可使用全文索引。
+        """
+        filters = self.filters()
+        for term in keyword.split():
+            filters.either(*(self.filters().text(fts_table, id_column, column, term)
+                             for fts_table, id_column, column in targets))
+        return filters
+
+    def _publish(self, student_ids=(), punishment_ids=(), activity_ids=(), names=()):
+        """事务提交后更新姓名索引中的 names 并发布数据变更，None 表示记录不存在，不计入"""
+        self.db.sync_name_index(names)
+        self.db.changes.publish(DataChange(
+            frozenset(student_ids) - {None}, frozenset(punishment_ids), frozenset(activity_ids), self))
+
+    # 写操作在同一事务中按主键读回受影响的列表记录，界面据此只更新这一行。
+    # 给出 filters（列表当前的筛选条件）时，记录不满足条件则返回 None。
+    # 事务提交后在 db.changes 上发布受影响的学生和记录ID。
+
+    # 年级、专业班级和处分类型
+
+    def sync_reference_data(self):
+        return self.db.sync_reference_data()
+
+    def grades(self):
+        return self.db.get_grades()
+
+    def classes(self, grade_id=None):
+        return self.db.get_classes(grade_id)
+
+    def punishment_types(self):
+        return self._all(PUNISHMENT_TYPES)
+
+    def punishment_type_points(self, type_id):
+        row = self._one(PUNISHMENT_TYPE_POINTS, (type_id,))
+        return row[0] if row else None
+
+    # 处分记录
+
+    def punishment_count_estimate(self):
+        return self.db.estimate_row_count("punishments")
+
+    def punishment_filters(self, name="", grade_id=None, class_id=None):
+        return (self.filters()
+                .text("student_fts", "s.id", "s.name", name)
+                .equals("s.grade_id", grade_id)
+                .equals("s.class_id", class_id))
+
+    def punishment_name_prefix_filters(self, prefix, page_size):
+        """按姓名前缀筛选处分列表，根据匹配的学生占比选择执行方式
+
+        匹配的学生占比为 f 时，按姓名索引需要读取约 f × 处分总数 条记录再排序，
+        按日期顺序扫描取满一页约需读取 page_size / f 条，选择读取较少的方式。
+        """
+        name_index = self.db.name_index
+        fraction = name_index.count(prefix) / max(len(name_index), 1)
+        use_index = fraction * fraction * self.punishment_count_estimate() <= page_size
+        return self.filters().prefix("s.name", prefix, use_index)
+
+    def punishment_keyword_search(self, keyword, limit):
+        """每个关键词须出现在学生姓名或处分原因中"""
+        terms = self.db.fts_terms(keyword)
+        if terms is None:
+            return KeywordSearch(None, self._keyword_filters(
+                keyword, ("student_fts", "s.id", "s.name"), ("punishment_fts", "p.id", "p.reason")))
+        params = [json.dumps(terms)] * 3
+        filters = self.filters().add(f"p.id IN (SELECT id FROM ({PUNISHMENT_KEYWORD_HITS}))", params)
+        return KeywordSearch(PUNISHMENT_KEYWORD_SEARCH.query(params + [limit]), filters)
+
+    def punishment_rows(self, punishment_ids, filters=None):
+        """按ID重新查询处分列表中的记录，只返回满足 filters 的记录"""
+        with self.db.reader() as conn:
+            return PUNISHMENT_LIST.rows(conn, "p.id", punishment_ids, filters)
+
+    def punishment_detail(self, punishment_id):
+        return self._one(PUNISHMENT_DETAIL, (punishment_id,))
+
+    def clearance_state(self, punishment_id):
+        return self._one(PUNISHMENT_CLEARANCE_STATE, (punishment_id,))
+
+    def add_punishment(self, name, gender, grade_id, class_id, type_id, reason, date, required_points,
+                       filters=None):
+        """添加处分记录，学生不存在时一并创建，返回新记录（PunishmentRow）"""
+        with self.db.writer() as conn:
+            student_id = self.db.find_or_create_student(name, gender, grade_id, class_id, conn.cursor())
+            cursor = self._write(conn, INSERT_PUNISHMENT, (student_id, type_id, reason, date, required_points))
+            punishment_id = cursor.lastrowid
+            row = PUNISHMENT_LIST.row(conn, "p.id", punishment_id, filters)
+        self._publish([student_id], punishment_ids=[punishment_id], names=[name])
+        return row
+
+    def update_punishment(self, punishment_id, name, gender, grade_id, class_id,
+                          type_id, reason, date, required_points, filters=None):
+        """修改处分记录，学生不存在时一并创建，返回修改后的记录（PunishmentRow）"""
+        with self.db.writer() as conn:
+            # 处分可能改为属于另一名学生，原来和现在的学生积分都会变化
+            old_student_id = self._student_of(conn, PUNISHMENT_STUDENT, punishment_id)
+            student_id = self.db.find_or_create_student(name, gender, grade_id, class_id, conn.cursor())
+            self._write(conn, UPDATE_PUNISHMENT, (student_id, type_id, reason, date, required_points, punishment_id))
+            row = PUNISHMENT_LIST.row(conn, "p.id", punishment_id, filters)
+        self._publish([old_student_id, student_id], punishment_ids=[punishment_id], names=[name])
+        return row
+
+    def delete_punishment(self, punishment_id):
+        """删除处分记录，返回是否删除了记录"""
+        with self.db.writer() as conn:
+            student_id = self._student_of(conn, PUNISHMENT_STUDENT, punishment_id)
+            deleted = self._write(conn, DELETE_PUNISHMENT, (punishment_id,)).rowcount > 0
+        self._publish([student_id], punishment_ids=[punishment_id])
+        return deleted
+
+    def clear_punishment(self, punishment_id, filters=None):
+        """核销处分，返回核销后的记录（PunishmentRow）"""
+        with self.db.writer() as conn:
+            self._write(conn, CLEAR_PUNISHMENT, (punishment_id,))
+            student_id = self._student_of(conn, PUNISHMENT_STUDENT, punishment_id)
+            row = PUNISHMENT_LIST.row(conn, "p.id", punishment_id, filters)
+        self._publish([student_id], punishment_ids=[punishment_id])
+        return row
+
+    def eligible_clearances(self):
+        return [EligibleClearance._make(row) for row in self.db.find_eligible_clearances()]
+
+    def apply_clearances(self, punishment_ids):
+        """核销预览中仍然满足条件的处分，返回核销的数量"""
+        punishment_ids = list(punishment_ids)
+        student_ids = [row[0] for row in self._all(PUNISHMENT_STUDENTS, (json.dumps(punishment_ids),))]
+        cleared = self.db.apply_clearances(punishment_ids)
+        if cleared:
+            self._publish(student_ids, punishment_ids=punishment_ids)
+        return cleared
+
+    # 公益活动记录
+
+    def activity_count_estimate(self):
+        return self.db.estimate_row_count("activities")
+
+    def activity_keyword_search(self, keyword, limit):
+        """每个关键词须出现在学生姓名或活动内容中"""
+        terms = self.db.fts_terms(keyword)
+        if terms is None:
+            return KeywordSearch(None, self._keyword_filters(
+                keyword, ("student_fts", "s.id", "s.name"), ("activity_fts", "a.id", "a.content")))
+        params = [json.dumps(terms)] * 3
+        filters = self.filters().add(f"a.id IN (SELECT id FROM ({ACTIVITY_KEYWORD_HITS}))", params)
+        return KeywordSearch(ACTIVITY_KEYWORD_SEARCH.query(params + [limit]), filters)
+
+    def activity_export_query(self, filters, sort_column=-1, descending=False):
+        """按列表的筛选条件和表格当前的排序列导出活动记录"""
+        return ACTIVITY_TABLE_EXPORT.ordered(filters, order_by_column(ACTIVITY_EXPORT_ORDER, sort_column, descending))
+
+    def activity_rows(self, activity_ids, filters=None):
+        """按ID重新查询活动列表中的记录，只返回满足 filters 的记录"""
+        with self.db.reader() as conn:
+            return ACTIVITY_LIST.rows(conn, "a.id", activity_ids, filters)
+
+    def activity_detail(self, activity_id):
+        return self._one(ACTIVITY_DETAIL, (activity_id,))
+
+    def add_activity(self, name, gender, grade_id, class_id, content, date, duration, points, filters=None):
+        """添加活动记录，学生不存在时一并创建，返回新记录（ActivityRow）"""
+        with self.db.writer() as conn:
+            student_id = self.db.find_or_create_student(name, gender, grade_id, class_id, conn.cursor())
+            cursor = self._write(conn, INSERT_ACTIVITY, (student_id, content, date, duration, points))
+            activity_id = cursor.lastrowid
+            row = ACTIVITY_LIST.row(conn, "a.id", activity_id, filters)
+        self._publish([student_id], activity_ids=[activity_id], names=[name])
+        return row
+
+    def update_activity(self, activity_id, name, gender, grade_id, class_id, content, date, duration, points,
+                        filters=None):
+        """修改活动记录，学生不存在时一并创建，返回修改后的记录（ActivityRow）"""
+        with self.db.writer() as conn:
+            # 活动可能改为属于另一名学生，原来和现在的学生积分都会变化
+            old_student_id = self._student_of(conn, ACTIVITY_STUDENT, activity_id)
+            student_id = self.db.find_or_create_student(name, gender, grade_id, class_id, conn.cursor())
+            self._write(conn, UPDATE_ACTIVITY, (student_id, content, date, duration, points, activity_id))
+            row = ACTIVITY_LIST.row(conn, "a.id", activity_id, filters)
+        self._publish([old_student_id, student_id], activity_ids=[activity_id], names=[name])
+        return row
+
+    def delete_activity(self, activity_id):
+        """删除活动记录，返回是否删除了记录"""
+        with self.db.writer() as conn:
+            student_id = self._student_of(conn, ACTIVITY_STUDENT, activity_id)
+            deleted = self._write(conn, DELETE_ACTIVITY, (activity_id,)).rowcount > 0
+        self._publish([student_id], activity_ids=[activity_id])
+        return deleted
+
+    # 积分统计
+
+    def statistics_query(self, statistics_filter, student_ids=None):
+        """按筛选条件返回学生积分统计的查询，结果行为 StudentStatistics
+
+        给出 student_ids 时只统计其中的学生，用于数据变化后只重新统计受影响的学生。
+        """
+        name = statistics_filter.name
+        filters = self.filters()
+        if student_ids is not None:
+            filters.add("s.id IN (SELECT value FROM json_each(?))", [json.dumps(sorted(student_ids))])
+        if statistics_filter.name_prefix:
+            filters.prefix("s.name", name)
+        else:
+            filters.text("student_fts", "s.id", "s.name", name)
+        filters.equals("s.grade_id", statistics_filter.grade_id)
+        filters.equals("c.name", statistics_filter.major)
+
+        if statistics_filter.punishment_type is None:
+            filters.add("sp.punishment_count > 0")
+            return STATISTICS.query(filters=filters)
+        filters.equals("pt.name", statistics_filter.punishment_type)
+        return STATISTICS_BY_TYPE.query(filters=filters)
+
+    def student_statistics(self, statistics_filter, student_ids):
+        """按筛选条件重新统计指定的学生，返回 StudentStatistics 列表"""
+        query = self.statistics_query(statistics_filter, student_ids)
+        with self.db.reader() as conn:
+            return [StudentStatistics._make(row) for row in conn.execute(query.sql, query.params)]
+
+    def statistics_export_queries(self, statistics_filter, sort_column=-1, descending=False):
+        """返回导出用的 (学生统计, 处分记录, 公益活动记录) 查询
+
+        学生统计按当前筛选条件重新查询，并按表格当前的排序列排序，默认按姓名。
+        """
+        query = self.statistics_query(statistics_filter)
+        order_by = order_by_column(STATISTICS_EXPORT_COLUMNS, sort_column, descending) or ["name"]
+        sql = " ".join(STATISTICS_EXPORT_SQL.format(query=query.sql).split())
+        stats = Query(sql + " ORDER BY " + ", ".join(order_by), query.params)
+        return stats, PUNISHMENT_EXPORT.query(), ACTIVITY_EXPORT.query()
+
+    def student_punishments(self, student_id):
+        return self._all(STUDENT_PUNISHMENTS, (student_id,))
+
+    def student_activities(self, student_id):
+        return self._all(STUDENT_ACTIVITIES, (student_id,))
+
+    def delete_student(self, student_id):
+        """删除学生及其所有处分和公益活动记录"""
+        with self.db.writer() as conn:
+            name = self._student_of(conn, STUDENT_NAME, student_id)
+            self._write(conn, DELETE_STUDENT_ACTIVITIES, (student_id,))
+            self._write(conn, DELETE_STUDENT_PUNISHMENTS, (student_id,))
+            self._write(conn, DELETE_STUDENT, (student_id,))
+        self._publish([student_id], names=[name])
+
+    # 其他程序实例的修改
+
+    def data_version(self):
+        """写连接上的 PRAGMA data_version，其他连接（包括其他程序实例）提交修改后会变化"""
+        with self.db.writer() as conn:
+            return conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def change_log_range(self):
+        """返回 change_log 中 (最小, 最大) 的 seq，没有记录时为 (None, None)"""
+        return self._one(CHANGE_LOG_RANGE)
+
+    def changes_since(self, seq, limit):
+        """返回 seq 之后的变更记录 [(seq, 表名, 记录ID, 学生ID), ...]，最多 limit 行"""
+        return self._all(CHANGES_SINCE, (seq, limit))
@@ -1,11 +1,17 @@
 import sys
 import os
+import time
+import logging
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtGui import QIcon
 from main_window import MainWindow
 from database import Database
 
 def main():
+    # 记录启动时刻，主窗口据此输出启动耗时
+    started_at = time.perf_counter()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    
     # 创建应用程序实例
     app = QApplication(sys.argv)
     
@@ -16,7 +22,7 @@ def main():
     db = Database(db_path)
     
     # 创建并显示主窗口
-    window = MainWindow(db)
+    window = MainWindow(db, started_at=started_at)
     window.show()
     
     # 运行应用程序
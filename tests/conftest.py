@@ -0,0 +1,35 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database import Database  # noqa: E402
+from repository import Repository  # noqa: E402
+
+SHIPPED_DATA_DIR = os.path.join(ROOT, "data")
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """随程序发布的数据库和年级、专业文件的副本"""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for file_name in ("student_management.db", "年级.txt", "专业.txt"):
+        shutil.copy(os.path.join(SHIPPED_DATA_DIR, file_name), data_dir / file_name)
+    return data_dir
+
+
+@pytest.fixture
+def db(data_dir):
+    db = Database(str(data_dir / "student_management.db"))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def repo(db):
+    return Repository(db)
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+from PyQt5.QtCore import QCoreApplication
+
+import database
+from database import Database
+from repository import Repository
+from ui.change_watcher import ChangeWatcher
+
+
+def change_log_count(db):
+    with db.reader() as conn:
+        return conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+
+
+@pytest.fixture
+def qt_app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def other(data_dir, db):
+    """同时打开同一数据库的另一个程序实例"""
+    other = Database(str(data_dir / "student_management.db"))
+    yield other
+    other.close()
+
+
+def test_unchanged_rows_are_not_logged(db):
+    db.find_or_create_student("张三", "男", 1, 1)
+    with db.writer() as conn:
+        conn.execute("UPDATE activities SET points = points")
+    assert change_log_count(db) == 0
+
+    with db.writer() as conn:
+        conn.execute("UPDATE students SET gender = '男' WHERE id = 21")
+    assert change_log_count(db) == 1
+
+
+def test_watcher_updates_name_index_from_other_instance(qt_app, db, other):
+    index = db.name_index
+    watcher = ChangeWatcher(db)
+    watcher.start()
+    try:
+        changes = []
+        db.changes.subscribe(changes.append)
+        student_id = other.find_or_create_student("远程新生", "女", 1, 1)
+        watcher.poll()
+        assert "远程新生" in index.names()
+        assert student_id in changes[-1].student_ids
+
+        Repository(other).delete_student(student_id)
+        watcher.poll()
+        assert "远程新生" not in index.names()
+    finally:
+        watcher.stop()
+
+
+def test_watcher_prunes_change_log(qt_app, db, monkeypatch):
+    monkeypatch.setattr(database, "CHANGE_LOG_RETENTION", 2)
+    for i in range(5):
+        db.find_or_create_student(f"学生{i}", "男", 1, 1)
+    assert change_log_count(db) == 5
+
+    watcher = ChangeWatcher(db, prune_interval=0)
+    watcher.start()
+    try:
+        deadline = time.monotonic() + 5
+        while change_log_count(db) > 2 and time.monotonic() < deadline:
+            qt_app.processEvents()
+    finally:
+        watcher.stop()
+    assert change_log_count(db) == 2
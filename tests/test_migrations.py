@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+from database import MIGRATIONS, Database, connect
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate_to(db_path, version):
+    """按 Database.migrate 的方式只执行前 version 个迁移，得到停留在该版本的数据库"""
+    conn = connect(db_path)
+    try:
+        for migration_version, migration in MIGRATIONS[:version]:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {migration_version}")
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def snapshot(db):
+    """迁移结果中需要一致的数据：学生、处分的归属和已分配积分、积分汇总"""
+    with db.reader() as conn:
+        return (
+            conn.execute("SELECT id, name, gender, grade_id, class_id FROM students ORDER BY id").fetchall(),
+            conn.execute("SELECT id, student_id, allocated_points FROM punishments ORDER BY id").fetchall(),
+            conn.execute("SELECT student_id, activity_id, punishment_id, points FROM point_allocations "
+                         "ORDER BY activity_id, punishment_id").fetchall(),
+            conn.execute("SELECT * FROM student_points ORDER BY student_id").fetchall(),
+        )
+
+
+def test_shipped_database_is_unversioned(data_dir):
+    conn = sqlite3.connect(data_dir / "student_management.db")
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+    conn.close()
+
+
+def test_shipped_database_migrates_to_latest(db):
+    assert db.get_schema_version() == LATEST_VERSION
+    with db.reader() as conn:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        # 合并重复学生后，处分和活动仍然指向存在的学生（发布的数据库中有学生的年级已不在年级.txt 中）
+        for table in ("punishments", "activities"):
+            assert conn.execute(f"PRAGMA foreign_key_check({table})").fetchall() == []
+        # 重复的学生 16、22、23 合并为 ID 最小的一条，处分改为指向它
+        assert conn.execute("""
+            SELECT id FROM students WHERE name = '张三' AND gender = '男' AND grade_id = 1 AND class_id = 1
+        """).fetchall() == [(16,)]
+        assert conn.execute("SELECT student_id FROM punishments WHERE id IN (13, 14)").fetchall() == [(16,), (16,)]
+        # 迁移之前的数据不记入 change_log
+        assert conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0] == 0
+    assert db.fts_tokenizer == "trigram"
+    assert db.verify_student_points() == []
+    assert db.verify_point_allocations() == []
+
+
+def test_student_identity_is_unique_after_migration(db):
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.writer() as conn:
+            conn.execute("INSERT INTO students (name, gender, grade_id, class_id) VALUES ('张三', '男', 1, 1)")
+
+
+@pytest.mark.parametrize("version", range(1, LATEST_VERSION))
+def test_upgrade_from_intermediate_version(data_dir, tmp_path, version):
+    """停留在任一中间版本的数据库继续升级后，与直接从发布的数据库升级的结果相同"""
+    db_path = str(data_dir / "student_management.db")
+    expected_dir = tmp_path / "expected"
+    expected_dir.mkdir()
+    for path in data_dir.iterdir():
+        (expected_dir / path.name).write_bytes(path.read_bytes())
+    expected = Database(str(expected_dir / "student_management.db"))
+
+    migrate_to(db_path, version)
+    db = Database(db_path)
+    try:
+        assert db.get_schema_version() == LATEST_VERSION
+        assert snapshot(db) == snapshot(expected)
+        assert db.verify_student_points() == []
+        assert db.verify_point_allocations() == []
+    finally:
+        db.close()
+        expected.close()
+
+
+def test_reopening_does_not_migrate_again(data_dir, db):
+    before = snapshot(db)
+    db.close()
+    reopened = Database(str(data_dir / "student_management.db"))
+    try:
+        assert reopened.get_schema_version() == LATEST_VERSION
+        assert snapshot(reopened) == before
+    finally:
+        reopened.close()
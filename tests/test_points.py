@@ -0,0 +1,99 @@
+def punishment_points(db):
+    with db.reader() as conn:
+        return {row[0]: row[1:] for row in conn.execute(
+            "SELECT id, allocated_points, is_cleared FROM punishments ORDER BY id")}
+
+
+def test_points_are_allocated_in_date_order(db):
+    # 学生 16 的 80 分活动积分按 (日期, ID) 先分配给处分 13，它已核销，处分 14 分不到积分
+    points = punishment_points(db)
+    assert points[13] == (80, 1)
+    assert points[14] == (0, 0)
+    assert db.find_eligible_clearances() == []
+    assert db.verify_point_allocations() == []
+
+
+def test_clearing_never_reuses_points(db, repo):
+    """逐个核销处分，已核销处分的所需积分合计始终不超过获得的积分"""
+    first = repo.add_punishment("钱七", "男", 1, 1, 1, "迟到", "2025-04-01", 20)
+    second = repo.add_punishment("钱七", "男", 1, 1, 1, "早退", "2025-04-02", 20)
+    repo.add_activity("钱七", "男", 1, 1, "打扫", "2025-04-03", 1.0, 20)
+    student_id = first.student_id
+    assert punishment_points(db)[first.id] == (20, 0)
+    assert punishment_points(db)[second.id] == (0, 0)
+
+    while True:
+        eligible = [row.id for row in repo.eligible_clearances() if row.name == "钱七"]
+        if not eligible:
+            break
+        repo.clear_punishment(eligible[0])
+        with db.reader() as conn:
+            earned, cleared_required = conn.execute("""
+                SELECT (SELECT COALESCE(SUM(points), 0) FROM activities WHERE student_id = ?),
+                       (SELECT COALESCE(SUM(required_points), 0) FROM punishments
+                        WHERE student_id = ? AND is_cleared = 1)
+            """, (student_id, student_id)).fetchone()
+        assert cleared_required <= earned
+
+    assert punishment_points(db)[first.id] == (20, 1)
+    assert punishment_points(db)[second.id] == (0, 0)
+    assert repo.apply_clearances([second.id]) == 0
+
+
+def test_reallocation_only_updates_changed_punishments(db):
+    with db.writer() as conn:
+        conn.execute("UPDATE activities SET points = 90 WHERE id = 1")
+        # 多出的 10 分分给处分 14，处分 13 的值不变，不会被改写
+        punishment_updates = conn.execute(
+            "SELECT COUNT(*) FROM change_log WHERE table_name = 'punishments'").fetchone()[0]
+    assert punishment_points(db)[13] == (80, 1)
+    assert punishment_points(db)[14] == (10, 0)
+    assert punishment_updates == 1
+
+
+def test_clear_punishment_keeps_points_consistent(db, repo):
+    repo.add_activity("张三", "男", 1, 1, "打扫", "2025-04-01", 2.0, 60)
+    assert punishment_points(db)[14] == (60, 0)
+    record = repo.clear_punishment(14)
+    assert record.status == "已核销"
+    # 核销不改变积分分配
+    assert punishment_points(db)[13] == (80, 1)
+    assert punishment_points(db)[14] == (60, 1)
+    assert repo.eligible_clearances() == []
+    assert db.verify_point_allocations() == []
+    assert db.verify_student_points() == []
+    with db.reader() as conn:
+        assert conn.execute("SELECT cleared_count FROM student_points WHERE student_id = 16").fetchone()[0] == 2
+
+
+def test_activity_points_make_punishment_eligible(db, repo):
+    # 学生 17 的处分 12 需要 120 分，分两次获得
+    repo.add_activity("张三", "男", 2, 2, "打扫", "2025-04-01", 2.0, 100)
+    assert punishment_points(db)[12] == (100, 0)
+    assert 12 not in [row.id for row in repo.eligible_clearances()]
+
+    activity = repo.add_activity("张三", "男", 2, 2, "值班", "2025-04-02", 1.0, 30)
+    assert punishment_points(db)[12] == (120, 0)
+    assert 12 in [row.id for row in repo.eligible_clearances()]
+
+    # 删除活动后积分重新分配，处分不再满足核销条件
+    repo.delete_activity(activity.id)
+    assert punishment_points(db)[12] == (100, 0)
+    assert db.verify_point_allocations() == []
+
+
+def test_apply_clearances_skips_punishments_no_longer_eligible(db, repo):
+    with db.writer() as conn:
+        conn.execute("UPDATE activities SET points = 140 WHERE id = 1")
+    preview = [row.id for row in repo.eligible_clearances()]
+    assert preview == [14]
+    with db.writer() as conn:
+        conn.execute("UPDATE activities SET points = 100 WHERE id = 1")
+    assert repo.apply_clearances(preview) == 0
+
+    with db.writer() as conn:
+        conn.execute("UPDATE activities SET points = 140 WHERE id = 1")
+    assert repo.apply_clearances(preview) == 1
+    assert repo.apply_clearances(preview) == 0
+    assert punishment_points(db)[14][1] == 1
+    assert db.verify_student_points() == []
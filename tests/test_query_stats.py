@@ -0,0 +1,23 @@
+import sqlite3
+
+from database import QueryStats, connect
+
+
+def test_slow_query_plan_is_captured_while_executing(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    with sqlite3.connect(db_path) as setup:
+        setup.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+    setup.close()
+    log_path = tmp_path / "slow_queries.log"
+    stats = QueryStats(str(log_path), slow_threshold=0)
+    conn = connect(db_path, stats=stats)
+    cursor = conn.execute("SELECT name FROM t WHERE id = ?", (1,))
+    assert cursor._execution.plan
+
+    # 游标在连接关闭后才被回收，此时只写日志，不再执行 EXPLAIN
+    conn.close()
+    del cursor
+    log = log_path.read_text(encoding="utf-8")
+    assert "SQL: SELECT name FROM t WHERE id = ?" in log
+    assert "SEARCH t USING INTEGER PRIMARY KEY" in log
+    assert "无法获取查询计划" not in log
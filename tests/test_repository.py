@@ -0,0 +1,55 @@
+import pytest
+
+
+def student_of(db, punishment_id):
+    with db.reader() as conn:
+        return conn.execute("SELECT student_id FROM punishments WHERE id = ?", (punishment_id,)).fetchone()[0]
+
+
+def test_update_punishment_onto_existing_student(db, repo):
+    changes = []
+    db.changes.subscribe(changes.append)
+    target_id = db.find_or_create_student("李四", "女", 4, 9)
+    old_id = student_of(db, 12)
+
+    record = repo.update_punishment(12, "李四", "女", 4, 9, 6, "大全", "2025-03-16", 120)
+
+    assert record.student_id == target_id
+    assert record.name == "李四"
+    assert student_of(db, 12) == target_id
+    with db.reader() as conn:
+        # 原来的学生信息保持不变
+        assert conn.execute("SELECT name, gender, grade_id, class_id FROM students WHERE id = ?",
+                            (old_id,)).fetchone() == ("张三", "男", 2, 2)
+        assert conn.execute("SELECT COUNT(*) FROM students WHERE name = '李四' AND grade_id = 4").fetchone()[0] == 1
+    assert changes[-1].student_ids == frozenset({old_id, target_id})
+    assert changes[-1].punishment_ids == frozenset({12})
+
+
+def test_update_punishment_creates_missing_student(db, repo):
+    record = repo.update_punishment(15, "赵六", "男", 1, 1, 2, "二五", "2025-03-16", 40)
+
+    assert record.name == "赵六"
+    with db.reader() as conn:
+        assert conn.execute("SELECT name FROM students WHERE id = ?", (record.student_id,)).fetchone()[0] == "赵六"
+        # 原来的学生仍然存在，其他记录不受影响
+        assert conn.execute("SELECT name FROM students WHERE id = 24").fetchone()[0] == "李四"
+
+
+def test_name_index_follows_committed_students(db, repo):
+    index = db.name_index
+    with pytest.raises(RuntimeError):
+        with db.writer() as conn:
+            db.find_or_create_student("未提交", "男", 1, 1, conn.cursor())
+            raise RuntimeError("回滚")
+    assert "未提交" not in index.names()
+
+    record = repo.add_punishment("新同学", "男", 1, 1, 1, "迟到", "2025-04-01", 20)
+    assert "新同学" in index.names()
+
+    # 处分改到其他学生名下后原学生仍然存在，姓名保留；学生删除后姓名从索引中删除
+    repo.update_punishment(record.id, "改名后", "男", 1, 1, 1, "迟到", "2025-04-01", 20)
+    assert {"新同学", "改名后"} <= set(index.names())
+    repo.delete_student(record.student_id)
+    assert "新同学" not in index.names()
+    assert "改名后" in index.names()
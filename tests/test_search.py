@@ -0,0 +1,54 @@
+import pytest
+
+from repository import PUNISHMENT_LIST
+
+
+def add_punishment(repo, name, reason):
+    return repo.add_punishment(name, "女", 1, 1, 1, reason, "2025-04-01", 20).id
+
+
+def search_ids(db, repo, keyword):
+    """按关键词搜索处分，分别返回排序查询和等价筛选条件的结果"""
+    search = repo.punishment_keyword_search(keyword, 100)
+    with db.reader() as conn:
+        ranked = None
+        if search.query is not None:
+            ranked = sorted(row[0] for row in conn.execute(search.query.sql, search.query.params))
+        query = PUNISHMENT_LIST.page(search.filters)
+        filtered = sorted(row[0] for row in conn.execute(query.sql, query.params))
+    return ranked, filtered
+
+
+@pytest.fixture
+def punishments(repo):
+    return {
+        "name_and_reason": add_punishment(repo, "欧阳娜娜", "宿舍违规电器使用"),
+        "name_only": add_punishment(repo, "欧阳娜娜", "晚归"),
+        "reason_only": add_punishment(repo, "司马相如", "违规电器"),
+        "short_name": add_punishment(repo, "张三", "上课迟到"),
+    }
+
+
+def test_fts_terms_match_name_or_reason(db, repo, punishments):
+    assert db.fts_tokenizer == "trigram"
+    ranked, filtered = search_ids(db, repo, "欧阳娜娜 违规电器")
+    assert ranked == filtered == [punishments["name_and_reason"]]
+
+    ranked, filtered = search_ids(db, repo, "违规电器")
+    assert ranked == filtered == sorted([punishments["name_and_reason"], punishments["reason_only"]])
+
+
+def test_like_fallback_matches_each_term(db, repo, punishments):
+    # 两个字的关键词无法使用 trigram 索引，改用 LIKE，每个关键词仍可分别命中姓名或原因
+    ranked, filtered = search_ids(db, repo, "张三 迟到")
+    assert ranked is None
+    assert filtered == [punishments["short_name"]]
+
+    # 较长的关键词仍使用全文索引，与较短的关键词同时满足
+    ranked, filtered = search_ids(db, repo, "欧阳娜娜 晚归")
+    assert ranked is None
+    assert filtered == [punishments["name_only"]]
+
+
+def test_missing_term_matches_nothing(db, repo, punishments):
+    assert search_ids(db, repo, "欧阳娜娜 不存在的原因") == ([], [])
@@ -0,0 +1,45 @@
+def student_count(db):
+    with db.reader() as conn:
+        return conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+
+
+def test_existing_identity_returns_existing_student(db):
+    count = student_count(db)
+    assert db.find_or_create_student("张三", "男", 1, 1) == 16
+    assert db.find_or_create_student("李四", "女", 2, 5) == 24
+    assert student_count(db) == count
+
+
+def test_any_identity_column_distinguishes_students(db):
+    count = student_count(db)
+    new_ids = {
+        db.find_or_create_student("张三", "女", 1, 1),
+        db.find_or_create_student("张三", "男", 3, 1),
+        db.find_or_create_student("张三", "男", 1, 3),
+        db.find_or_create_student("张三丰", "男", 1, 1),
+    }
+    assert len(new_ids) == 4
+    assert 16 not in new_ids
+    assert student_count(db) == count + 4
+    # 再次查找得到同一条记录
+    assert db.find_or_create_student("张三丰", "男", 1, 1) in new_ids
+
+
+def test_conflict_inside_caller_transaction(db):
+    with db.writer() as conn:
+        cursor = conn.cursor()
+        first = db.find_or_create_student("赵六", "男", 1, 1, cursor)
+        second = db.find_or_create_student("赵六", "男", 1, 1, cursor)
+    assert first == second
+    with db.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM students WHERE name = '赵六'").fetchone()[0] == 1
+
+
+def test_null_grade_or_class_is_one_identity(db):
+    count = student_count(db)
+    first = db.find_or_create_student("孙八", "男", 1, None)
+    assert db.find_or_create_student("孙八", "男", 1, None) == first
+    other = db.find_or_create_student("孙八", "男", None, None)
+    assert db.find_or_create_student("孙八", "男", None, None) == other
+    assert other != first
+    assert student_count(db) == count + 2
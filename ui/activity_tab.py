@@ -1,19 +1,30 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QFormLayout,
                             QLabel, QLineEdit, QComboBox, QDateEdit, QTextEdit,
-                            QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
-                            QMessageBox, QSpinBox, QDoubleSpinBox, QFileDialog)
+                            QPushButton, QMessageBox, QSpinBox, QDoubleSpinBox, QFileDialog)
 from PyQt5.QtCore import Qt, QDate
-import pandas as pd
 import os
-from utils.data_manager import DataManager
+from ui.record_model import Column, PagedRecordModel, createRecordView, selectedSourceRow, selectSourceRow
+from ui.workers import PagedQueryLoader, ExportRunner, SEARCH_RESULT_LIMIT
+from utils.exporter import SheetSpec, export_table
+from repository import ACTIVITY_LIST, Repository
+
+# 导出文件类型过滤器及对应的扩展名
+EXPORT_FILTERS = {
+    "Excel文件 (*.xlsx)": ".xlsx",
+    "CSV文件 (*.csv)": ".csv",
+    "压缩CSV文件 (*.csv.gz)": ".csv.gz",
+}
 
 class ActivityTab(QWidget):
     def __init__(self, db):
         super().__init__()
         self.db = db
+        self.repo = Repository(db)
         self.initUI()
         self.loadData()
         self.refreshTable()
+        # 其他标签页或其他程序实例修改数据后，只重新查询受影响的记录
+        self.db.changes.subscribe(self.onDataChanged)
     
     def initUI(self):
         main_layout = QVBoxLayout(self)
@@ -80,27 +91,58 @@ class ActivityTab(QWidget):
         self.export_btn.clicked.connect(self.exportToExcel)
         button_layout.addWidget(self.export_btn)
         
+        # 关键词搜索，按相关度列出姓名或活动内容匹配的记录
+        keyword_layout = QHBoxLayout()
+        keyword_layout.addWidget(QLabel("关键词:"))
+        self.keyword_edit = QLineEdit()
+        self.keyword_edit.setPlaceholderText("姓名、活动内容，多个关键词用空格分隔")
+        self.keyword_edit.returnPressed.connect(self.keywordSearch)
+        keyword_layout.addWidget(self.keyword_edit)
+        self.keyword_btn = QPushButton("搜索")
+        self.keyword_btn.clicked.connect(self.keywordSearch)
+        keyword_layout.addWidget(self.keyword_btn)
+        
         # 表格
-        self.table = QTableWidget()
-        self.table.setColumnCount(9)  # 增加一列用于显示性别
-        self.table.setHorizontalHeaderLabels(["ID", "姓名", "性别", "年级", "专业班级", "活动内容", "活动日期", "活动时长", "获得积分"])
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.itemClicked.connect(self.onTableItemClicked)
-        # 启用表格排序
+        # 记录为 repository.ActivityRow：(id, 姓名, 性别, 年级, 专业班级, 活动内容, 活动日期, 活动时长, 获得积分)
+        self.model = PagedRecordModel([
+            Column("ID", 0),
+            Column("姓名", 1),
+            Column("性别", 2),
+            Column("年级", 3),
+            Column("专业班级", 4),
+            Column("活动内容", 5),
+            Column("活动日期", 6),
+            Column("活动时长", 7),
+            Column("获得积分", 8),
+        ], key=lambda record: (record.date, record.id))
+        self.table, self.proxy = createRecordView(self.model)
+        self.table.clicked.connect(self.onTableClicked)
+        # 启用表格排序，初始保持查询结果的顺序
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
         self.table.setSortingEnabled(True)
         # 隐藏ID列
         self.table.hideColumn(0)
         
+        # 列表在后台线程中分页加载，滚动到底部时自动加载下一页
+        self.loader = PagedQueryLoader(self.db, self.model, ACTIVITY_LIST, self.repo.filters())
+        self.loader.pageLoaded.connect(self.onPageLoaded)
+        self.loader.error.connect(self.onQueryError)
+        self.count_label = QLabel()
+        self.export_runner = ExportRunner(self, "导出")
+        
         # 添加到主布局
         main_layout.addLayout(form_layout)
         main_layout.addLayout(button_layout)
+        main_layout.addLayout(keyword_layout)
         main_layout.addWidget(self.table)
+        main_layout.addWidget(self.count_label)
     
     def loadData(self):
+        # 年级和专业文本文件有修改时先同步到数据库
+        self.repo.sync_reference_data()
+        
         # 加载年级数据
-        grades = DataManager.load_grades()
+        grades = self.repo.grades()
         self.grade_combo.clear()
         for grade_id, grade_name in grades:
             self.grade_combo.addItem(grade_name, grade_id)
@@ -117,17 +159,14 @@ class ActivityTab(QWidget):
         if grade_id is None:
             return
             
-        # 加载与选定年级相关的专业班级数据
-        classes = DataManager.load_classes()
         self.class_combo.clear()
         
         # 添加一个空选项
         self.class_combo.addItem("请选择专业", None)
         
-        # 筛选当前年级的专业班级
-        for class_id, cls_grade_id, major, class_name in classes:
-            if cls_grade_id == grade_id:
-                self.class_combo.addItem(major, class_id)
+        # 加载当前年级的专业班级
+        for class_id, _, major in self.repo.classes(grade_id):
+            self.class_combo.addItem(major, class_id)
     
     def addActivity(self):
         try:
@@ -152,162 +191,112 @@ class ActivityTab(QWidget):
                 QMessageBox.warning(self, "错误", "请选择专业班级")
                 return
             
-            # 首先尝试精确匹配
-            self.db.cursor.execute("""
-                SELECT id FROM students
-                WHERE name = ? AND gender = ? AND grade_id = ? AND class_id = ?
-            """, (name, gender, grade_id, class_id))
-            result = self.db.cursor.fetchone()
-            
-            if result:
-                student_id = result[0]
-            else:
-                # 如果精确匹配失败，尝试通过姓名和性别查找
-                self.db.cursor.execute("""
-                    SELECT id, grade_id, class_id FROM students
-                    WHERE name = ? AND gender = ?
-                """, (name, gender))
-                results = self.db.cursor.fetchall()
-                
-                if not results:
-                    QMessageBox.warning(self, "错误", "该学生不存在，请先在处分记录中添加学生信息")
-                    return
-                elif len(results) > 1:
-                    # 如果有多个匹配结果，显示详细信息让用户确认
-                    msg = "找到多个匹配的学生记录，请确认:\n"
-                    for i, r in enumerate(results):
-                        # 获取年级和专业名称
-                        self.db.cursor.execute("SELECT name FROM grades WHERE id = ?", (r[1],))
-                        grade_name = self.db.cursor.fetchone()[0]
-                        self.db.cursor.execute("SELECT name FROM classes WHERE id = ?", (r[2],))
-                        class_name = self.db.cursor.fetchone()[0]
-                        msg += f"{i+1}. {name} - {gender} - {grade_name} - {class_name}\n"
-                    
-                    # 这里简化处理，使用第一个匹配结果
-                    # 实际应用中应该让用户选择正确的记录
-                    student_id = results[0][0]
-                    QMessageBox.information(self, "提示", msg + f"\n已自动选择第一条记录，ID: {student_id}")
-                else:
-                    student_id = results[0][0]
-            
-            # 添加活动记录
-            self.db.cursor.execute("""
-                INSERT INTO activities (student_id, content, date, duration, points)
-                VALUES (?, ?, ?, ?, ?)
-            """, (student_id, content, date, duration, points))
-            
-            self.db.conn.commit()
-            QMessageBox.information(self, "成功", "活动记录添加成功")
+            # 添加活动记录，年级和专业班级与处分记录中一致时即为同一学生，不存在时一并创建；
+            # 新记录满足列表的筛选条件时只插入这一行
+            record = self.repo.add_activity(name, gender, grade_id, class_id, content, date, duration,
+                                            points, self.loader.filters)
             self.resetForm()
-            self.refreshTable()
+            self.showAddedRecord(record)
+            QMessageBox.information(self, "成功", "活动记录添加成功")
             
         except Exception as e:
-            self.db.conn.rollback()
             QMessageBox.critical(self, "错误", f"添加活动记录失败：{str(e)}\n\n详细信息：\n姓名: {name}\n性别: {gender}\n年级ID: {grade_id}\n专业班级ID: {class_id}")
     
     def refreshTable(self):
+        self.total_estimate = self.repo.activity_count_estimate()
+        self.loader.start(self.repo.filters())
+    
+    def keywordSearch(self):
+        keyword = self.keyword_edit.text().strip()
+        if not keyword:
+            self.refreshTable()
+            return
+        
+        self.total_estimate = None
+        search = self.repo.activity_keyword_search(keyword, SEARCH_RESULT_LIMIT)
+        if search.query is None:
+            # 关键词过短或没有全文索引时按日期分页显示 LIKE 匹配的记录
+            self.loader.start(search.filters)
+        else:
+            self.loader.loadAll(search.query, search.filters)
+    
+    def onPageLoaded(self, page_rows, loaded_rows):
+        self.updateCountLabel()
+    
+    def updateCountLabel(self):
+        loaded_rows = self.model.rowCount()
+        if self.total_estimate is None:
+            text = f"已显示 {loaded_rows} 条记录"
+        else:
+            text = f"已显示 {loaded_rows} 条记录，共约 {max(self.total_estimate, loaded_rows)} 条"
+        if self.model.has_more:
+            text += "，滚动到底部加载更多"
+        self.count_label.setText(text)
+    
+    def onDataChanged(self, change):
+        """本页自己的修改已经更新到列表中，其他来源的修改按ID重新查询受影响的活动"""
+        if change.source is self.repo:
+            return
+        if change.reload:
+            self.loader.start(self.loader.filters)
+            return
+        
+        # 学生信息的修改会影响该学生已加载的所有活动
+        activity_ids = set(change.activity_ids)
+        if change.student_ids:
+            activity_ids.update(record.id for record in self.model.records
+                                if record.student_id in change.student_ids)
+        if not activity_ids:
+            return
         try:
-            # 临时禁用排序，以便快速填充数据
-            self.table.setSortingEnabled(False)
-            
-            # 获取活动记录数据
-            self.db.cursor.execute("""
-                SELECT a.id, s.name, s.gender, s.grade_id, s.class_id, a.content, a.date, a.duration, a.points
-                FROM activities a
-                JOIN students s ON a.student_id = s.id
-                ORDER BY a.date DESC
-            """)
-            records = self.db.cursor.fetchall()
-            
-            # 加载年级和专业数据，确保与处分记录管理中一致
-            grades_dict = {grade_id: grade_name for grade_id, grade_name in DataManager.load_grades()}
-            classes_dict = {class_id: major for class_id, _, major, _ in DataManager.load_classes()}
-            
-            self.table.setRowCount(len(records))
-            for row, record in enumerate(records):
-                # 解包记录
-                activity_id, name, gender, grade_id, class_id, content, date, duration, points = record
-                
-                # 获取年级和专业名称
-                grade_name = grades_dict.get(grade_id, "未知年级")
-                class_name = classes_dict.get(class_id, "未知专业")
-                
-                # 设置表格数据
-                id_item = QTableWidgetItem(str(activity_id))
-                id_item.setData(Qt.DisplayRole, activity_id)  # 设置为数字以便正确排序
-                self.table.setItem(row, 0, id_item)
-                
-                self.table.setItem(row, 1, QTableWidgetItem(name))
-                self.table.setItem(row, 2, QTableWidgetItem(gender))
-                self.table.setItem(row, 3, QTableWidgetItem(grade_name))
-                self.table.setItem(row, 4, QTableWidgetItem(class_name))
-                self.table.setItem(row, 5, QTableWidgetItem(content))
-                
-                # 设置日期项，确保可以正确排序
-                date_item = QTableWidgetItem()
-                date_item.setData(Qt.DisplayRole, QDate.fromString(date, "yyyy-MM-dd"))
-                self.table.setItem(row, 6, date_item)
-                
-                # 设置数值项，确保可以正确排序
-                duration_item = QTableWidgetItem()
-                duration_item.setData(Qt.DisplayRole, float(duration))
-                self.table.setItem(row, 7, duration_item)
-                
-                points_item = QTableWidgetItem()
-                points_item.setData(Qt.DisplayRole, int(points))
-                self.table.setItem(row, 8, points_item)
-            
-            # 重新启用排序
-            self.table.setSortingEnabled(True)
+            records = self.repo.activity_rows(activity_ids, self.loader.filters)
+            self.loader.mergeRecords(activity_ids, records)
+            self.updateCountLabel()
         except Exception as e:
-            QMessageBox.critical(self, "错误", f"加载活动记录失败：{str(e)}")
+            print(f"更新活动列表失败: {str(e)}")
+    
+    def onQueryError(self, message):
+        QMessageBox.critical(self, "错误", f"加载活动记录失败：{message}")
     
     def exportToExcel(self):
         try:
+            if self.export_runner.isRunning():
+                QMessageBox.information(self, "提示", "正在导出，请稍候")
+                return
+            
             # 获取保存文件路径
-            file_path, _ = QFileDialog.getSaveFileName(
+            file_path, selected_filter = QFileDialog.getSaveFileName(
                 self, "导出Excel", os.path.expanduser("~/公益活动记录.xlsx"),
-                "Excel文件 (*.xlsx);;所有文件 (*)"
+                ";;".join(EXPORT_FILTERS)
             )
             
             if not file_path:
                 return  # 用户取消了保存
             
-            # 如果文件名没有.xlsx后缀，添加它
-            if not file_path.endswith('.xlsx'):
-                file_path += '.xlsx'
-            
-            # 创建数据框
-            data = []
-            for row in range(self.table.rowCount()):
-                row_data = []
-                for col in range(self.table.columnCount()):
-                    item = self.table.item(row, col)
-                    if item is not None:
-                        row_data.append(item.text())
-                    else:
-                        row_data.append("")
-                data.append(row_data)
+            # 如果文件名没有可识别的后缀，按选择的文件类型添加
+            if not file_path.lower().endswith(tuple(EXPORT_FILTERS.values())):
+                file_path += EXPORT_FILTERS.get(selected_filter, ".xlsx")
             
-            # 创建DataFrame
-            df = pd.DataFrame(data, columns=[self.table.horizontalHeaderItem(i).text() for i in range(self.table.columnCount())])
+            # 按列表当前的筛选条件重新查询，不从表格读取数据，未加载的分页也会导出；
+            # 按表格当前的排序顺序导出，同值时保持列表默认的日期降序
+            query = self.repo.activity_export_query(self.loader.filters, self.proxy.sortColumn(),
+                                                    self.proxy.sortOrder() == Qt.DescendingOrder)
             
-            # 导出到Excel
-            df.to_excel(file_path, index=False)
-            
-            QMessageBox.information(self, "成功", f"数据已成功导出到 {file_path}")
+            sheet = SheetSpec("公益活动记录", self.model.headers(), query.sql, query.params)
+            self.export_runner.start(self.db, lambda conn, progress, is_cancelled: export_table(
+                conn, file_path, sheet, progress, is_cancelled), f"数据已成功导出到 {file_path}")
             
         except Exception as e:
             QMessageBox.critical(self, "错误", f"导出Excel失败：{str(e)}")
     
     def modifyActivity(self):
         try:
-            selected_items = self.table.selectedItems()
-            if not selected_items:
+            row = selectedSourceRow(self.table, self.proxy)
+            if row is None:
                 QMessageBox.warning(self, "错误", "请选择要修改的记录")
                 return
             
-            activity_id = int(self.table.item(selected_items[0].row(), 0).text())
+            activity_id = self.model.record(row).id
             
             # 获取表单数据
             name = self.name_edit.text().strip()
@@ -327,43 +316,28 @@ class ActivityTab(QWidget):
                 QMessageBox.warning(self, "错误", "请输入活动内容")
                 return
             
-            # 获取学生ID
-            self.db.cursor.execute("""
-                SELECT id FROM students
-                WHERE name = ? AND gender = ? AND grade_id = ? AND class_id = ?
-            """, (name, gender, grade_id, class_id))
-            result = self.db.cursor.fetchone()
-            
-            if not result:
-                QMessageBox.warning(self, "错误", "该学生不存在")
+            if class_id is None:
+                QMessageBox.warning(self, "错误", "请选择专业班级")
                 return
             
-            student_id = result[0]
-            
-            # 更新活动记录
-            self.db.cursor.execute("""
-                UPDATE activities
-                SET student_id = ?, content = ?, date = ?, duration = ?, points = ?
-                WHERE id = ?
-            """, (student_id, content, date, duration, points, activity_id))
-            
-            self.db.conn.commit()
-            QMessageBox.information(self, "成功", "活动记录修改成功")
+            # 更新活动记录，学生不存在时一并创建；列表中只更新该行
+            record = self.repo.update_activity(activity_id, name, gender, grade_id, class_id,
+                                               content, date, duration, points, self.loader.filters)
             self.resetForm()
-            self.refreshTable()
+            self.showModifiedRecord(row, record)
+            QMessageBox.information(self, "成功", "活动记录修改成功")
             
         except Exception as e:
-            self.db.conn.rollback()
             QMessageBox.critical(self, "错误", f"修改活动记录失败：{str(e)}")
     
     def deleteActivity(self):
         try:
-            selected_items = self.table.selectedItems()
-            if not selected_items:
+            row = selectedSourceRow(self.table, self.proxy)
+            if row is None:
                 QMessageBox.warning(self, "错误", "请选择要删除的记录")
                 return
             
-            activity_id = int(self.table.item(selected_items[0].row(), 0).text())
+            activity_id = self.model.record(row).id
             
             # 确认删除
             reply = QMessageBox.question(self, "确认", "确定要删除选中的活动记录吗？",
@@ -371,16 +345,13 @@ class ActivityTab(QWidget):
             if reply == QMessageBox.No:
                 return
             
-            # 删除活动记录
-            self.db.cursor.execute("DELETE FROM activities WHERE id = ?", (activity_id,))
-            
-            self.db.conn.commit()
-            QMessageBox.information(self, "成功", "活动记录删除成功")
+            # 删除活动记录，列表中只移除该行
+            self.repo.delete_activity(activity_id)
             self.resetForm()
-            self.refreshTable()
+            self.removeRecord(row)
+            QMessageBox.information(self, "成功", "活动记录删除成功")
             
         except Exception as e:
-            self.db.conn.rollback()
             QMessageBox.critical(self, "错误", f"删除活动记录失败：{str(e)}")
     
     def resetForm(self):
@@ -394,19 +365,36 @@ class ActivityTab(QWidget):
         self.duration_spin.setValue(0)
         self.points_spin.setValue(0)
     
-    def onTableItemClicked(self, item):
+    def showAddedRecord(self, record):
+        """把新增的记录插入列表并选中，不满足当前筛选条件（record 为 None）时不显示"""
+        if record is None:
+            return
+        row = self.loader.insertRecord(record)
+        if self.total_estimate is not None:
+            self.total_estimate += 1
+        if row is not None:
+            selectSourceRow(self.table, self.proxy, row)
+        self.updateCountLabel()
+    
+    def showModifiedRecord(self, row, record):
+        """用修改后的记录替换列表中的第 row 行，保持排序和选中状态"""
+        new_row = self.loader.updateRecord(row, record)
+        if new_row is not None and new_row != row:
+            selectSourceRow(self.table, self.proxy, new_row)
+        self.updateCountLabel()
+    
+    def removeRecord(self, row):
+        self.model.removeRecord(row)
+        if self.total_estimate is not None:
+            self.total_estimate -= 1
+        self.updateCountLabel()
+    
+    def onTableClicked(self, index):
         # 获取选中行的数据
-        row = item.row()
-        activity_id = int(self.table.item(row, 0).text())
+        activity_id = self.model.record(self.proxy.mapToSource(index).row()).id
         
         # 查询活动记录详细信息
-        self.db.cursor.execute("""
-            SELECT s.name, s.gender, s.grade_id, s.class_id, a.content, a.date, a.duration, a.points
-            FROM activities a
-            JOIN students s ON a.student_id = s.id
-            WHERE a.id = ?
-        """, (activity_id,))
-        record = self.db.cursor.fetchone()
+        record = self.repo.activity_detail(activity_id)
         
         if record:
             # 解包记录
@@ -0,0 +1,81 @@
+from PyQt5.QtCore import QObject, QTimer
+
+from repository import Repository
+from utils.event_bus import DataChange
+
+# 检查其他程序实例是否修改了数据库的间隔
+CHANGE_POLL_MS = 2000
+# 一次最多读取的变更记录数，超过时通知各标签页完整重新加载
+CHANGE_FETCH_LIMIT = 5000
+# 清理 change_log 中较早记录的间隔，只保留最近 database.CHANGE_LOG_RETENTION 行
+CHANGE_LOG_PRUNE_MS = 10 * 60 * 1000
+
+
+class ChangeWatcher(QObject):
+    """发现同时打开同一数据库的其他程序实例提交的修改，并在 db.changes 上发布
+
+    定时读取写连接上的 PRAGMA data_version，它只在其他连接提交修改后变化，
+    本程序自己的写操作不会触发查询。变化时读取 change_log 中上次读到的位置
+    之后的记录，汇总为一个 DataChange 发布，各标签页只重新查询这些记录。
+    学生有变化时同时更新姓名索引；程序长时间运行时定时清理 change_log。
+    """
+
+    def __init__(self, db, interval=CHANGE_POLL_MS, prune_interval=CHANGE_LOG_PRUNE_MS, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.repo = Repository(db)
+        self.data_version = None
+        self.last_seq = 0
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.poll)
+        self.prune_timer = QTimer(self)
+        self.prune_timer.setInterval(prune_interval)
+        self.prune_timer.timeout.connect(self.db.prune_change_log)
+
+    def start(self):
+        self.data_version = self.repo.data_version()
+        _, last_seq = self.repo.change_log_range()
+        self.last_seq = last_seq or 0
+        self.timer.start()
+        self.prune_timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.prune_timer.stop()
+
+    def poll(self):
+        try:
+            data_version = self.repo.data_version()
+            if data_version == self.data_version:
+                return
+            self.data_version = data_version
+            self.publishChanges()
+        except Exception as e:
+            print(f"检查数据库变更失败: {str(e)}")
+
+    def publishChanges(self):
+        """读取上次位置之后的变更并发布；本程序自己的修改也会读到，重复更新不影响结果"""
+        first_seq, _ = self.repo.change_log_range()
+        changes = self.repo.changes_since(self.last_seq, CHANGE_FETCH_LIMIT + 1)
+        if not changes:
+            return
+
+        # 落后太多（中间的记录已被清理）或变更过多时，不逐条更新
+        if (first_seq is not None and first_seq > self.last_seq + 1) or len(changes) > CHANGE_FETCH_LIMIT:
+            _, self.last_seq = self.repo.change_log_range()
+            self.db.refresh_name_index()
+            self.db.changes.publish(DataChange(source=self, reload=True))
+            return
+
+        ids = {"students": set(), "punishments": set(), "activities": set()}
+        student_ids = set()
+        for seq, table_name, row_id, student_id in changes:
+            ids[table_name].add(row_id)
+            if student_id is not None:
+                student_ids.add(student_id)
+        self.last_seq = changes[-1][0]
+        if ids["students"]:
+            self.db.refresh_name_index()
+        self.db.changes.publish(DataChange(frozenset(student_ids), frozenset(ids["punishments"]),
+                                           frozenset(ids["activities"]), self))
@@ -0,0 +1,123 @@
+from datetime import datetime
+
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QTextEdit, QSplitter, QHeaderView)
+from PyQt5.QtCore import Qt
+
+from ui.record_model import Column, RecordTableModel, createRecordView, selectedRecord
+
+# 对话框中最多显示的语句数
+TOP_STATEMENTS = 100
+
+
+def milliseconds(value):
+    return f"{value * 1000:.1f}"
+
+
+# 记录元组：(SQL, 调用次数, 总耗时, 平均耗时, 最大耗时, 行数, 主要调用位置, 全部调用位置)
+STATEMENT_COLUMNS = [
+    Column("SQL", 0, lambda sql: sql if len(sql) <= 120 else sql[:117] + "..."),
+    Column("调用次数", 1),
+    Column("总耗时(ms)", 2, milliseconds),
+    Column("平均耗时(ms)", 3, milliseconds),
+    Column("最大耗时(ms)", 4, milliseconds),
+    Column("行数", 5),
+    Column("主要调用位置", 6),
+]
+
+
+class DiagnosticsDialog(QDialog):
+    """数据库诊断信息：按总耗时排列的语句统计，选中一行显示完整 SQL 和各调用位置
+    
+    在主窗口按 Ctrl+Shift+D 打开。
+    """
+    
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.stats = db.query_stats
+        self.cache = db.statistics_cache
+        # 设置窗口标志，移除问号按钮
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.initUI()
+        self.refresh()
+    
+    def initUI(self):
+        self.setWindowTitle("数据库诊断")
+        self.resize(1100, 650)
+        
+        layout = QVBoxLayout(self)
+        
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        
+        splitter = QSplitter(Qt.Vertical)
+        self.model = RecordTableModel(STATEMENT_COLUMNS)
+        self.table, self.proxy = createRecordView(self.model)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(2, Qt.DescendingOrder)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.selectionModel().selectionChanged.connect(self.showDetail)
+        splitter.addWidget(self.table)
+        
+        self.detail_edit = QTextEdit()
+        self.detail_edit.setReadOnly(True)
+        splitter.addWidget(self.detail_edit)
+        splitter.setSizes([450, 150])
+        layout.addWidget(splitter)
+        
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        refresh_btn = QPushButton("刷新")
+        refresh_btn.clicked.connect(self.refresh)
+        button_layout.addWidget(refresh_btn)
+        reset_btn = QPushButton("清空统计")
+        reset_btn.clicked.connect(self.resetStats)
+        button_layout.addWidget(reset_btn)
+        close_btn = QPushButton("关闭")
+        close_btn.clicked.connect(self.close)
+        button_layout.addWidget(close_btn)
+        layout.addLayout(button_layout)
+    
+    def refresh(self):
+        statements = self.stats.snapshot()
+        total_calls = sum(entry.calls for entry in statements)
+        total_time = sum(entry.total_time for entry in statements)
+        started_at = datetime.fromtimestamp(self.stats.started_at)
+        self.summary_label.setText(
+            f"自 {started_at:%Y-%m-%d %H:%M:%S} 起共 {len(statements)} 条不同语句，"
+            f"执行 {total_calls} 次，总耗时 {total_time:.2f} 秒。"
+            f"超过 {self.stats.slow_threshold * 1000:.0f} ms 的语句记录在 {self.stats.slow_log_path}\n"
+            f"积分统计结果缓存：命中 {self.cache.hits} 次，未命中 {self.cache.misses} 次"
+            f"（命中率 {self.cache.hit_rate:.0%}），已缓存 {len(self.cache)}/{self.cache.max_entries} 个结果，"
+            f"数据修改代数 {self.db.write_generation}\n"
+            f"连接设置：{self.connectionSettings()}")
+        
+        records = []
+        for entry in statements[:TOP_STATEMENTS]:
+            call_sites = entry.call_sites.most_common()
+            records.append((entry.sql, entry.calls, entry.total_time, entry.average_time,
+                            entry.max_time, entry.rows, call_sites[0][0] if call_sites else "",
+                            call_sites))
+        self.model.setRecords(records)
+        self.detail_edit.clear()
+    
+    def connectionSettings(self):
+        settings = self.db.get_connection_settings()
+        return "，".join(f"{name} = {value}" for name, value in settings.items())
+    
+    def resetStats(self):
+        self.stats.reset()
+        self.cache.reset_stats()
+        self.refresh()
+    
+    def showDetail(self):
+        record = selectedRecord(self.table, self.proxy, self.model)
+        if record is None:
+            self.detail_edit.clear()
+            return
+        lines = [record[0], "", "调用位置："]
+        lines.extend(f"  {call_site}（{count} 次）" for call_site, count in record[7])
+        self.detail_edit.setPlainText("\n".join(lines))
@@ -0,0 +1,28 @@
+from PyQt5.QtCore import Qt, QStringListModel
+from PyQt5.QtWidgets import QCompleter
+
+
+class NameCompleter(QCompleter):
+    """学生姓名自动补全
+
+    补全列表来自 Database.name_index，模型保持与索引相同的顺序并声明为已排序，
+    QCompleter 因此用二分查找定位前缀；索引新增或删除姓名时只插入或删除对应的一行。
+    """
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.name_index = db.name_index
+        self.names_model = QStringListModel(self.name_index.names(), self)
+        self.setModel(self.names_model)
+        self.setModelSorting(QCompleter.CaseSensitivelySortedModel)
+        self.setCaseSensitivity(Qt.CaseSensitive)
+        self.setMaxVisibleItems(10)
+        self.name_index.listeners.append(self.onNameAdded)
+        self.name_index.remove_listeners.append(self.onNameRemoved)
+
+    def onNameAdded(self, position, name):
+        self.names_model.insertRows(position, 1)
+        self.names_model.setData(self.names_model.index(position), name)
+
+    def onNameRemoved(self, position, name):
+        self.names_model.removeRows(position, 1)
@@ -1,19 +1,26 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QFormLayout, 
                             QLabel, QLineEdit, QComboBox, QDateEdit, QTextEdit,
-                            QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
-                            QMessageBox, QSpinBox)
-from PyQt5.QtCore import Qt, QDate
+                            QPushButton, QMessageBox, QSpinBox)
+from PyQt5.QtCore import Qt, QDate, QTimer
 from models.student import Student
 from models.punishment import Punishment
-from utils.data_manager import DataManager
+from ui.workers import PagedQueryLoader, PAGE_SIZE, SEARCH_RESULT_LIMIT, SEARCH_DELAY_MS
+from ui.name_completer import NameCompleter
+from ui.record_model import Column, PagedRecordModel, createRecordView, selectedSourceRow, selectSourceRow
+from repository import PUNISHMENT_LIST, Repository
 
 class PunishmentTab(QWidget):
     def __init__(self, db):
         super().__init__()
         self.db = db
+        self.repo = Repository(db)
+        self.notify_empty_result = False
+        self.total_estimate = None
         self.initUI()
         self.loadData()
         self.refreshTable()
+        # 其他标签页或其他程序实例修改数据后，只重新查询受影响的记录
+        self.db.changes.subscribe(self.onDataChanged)
     
     def initUI(self):
         main_layout = QVBoxLayout(self)
@@ -25,6 +32,16 @@ class PunishmentTab(QWidget):
         self.name_edit = QLineEdit()
         form_layout.addRow("姓名:", self.name_edit)
         
+        # 输入姓名时自动补全，停止输入片刻后按姓名前缀筛选列表
+        self.name_completer = NameCompleter(self.db, self.name_edit)
+        self.name_edit.setCompleter(self.name_completer)
+        self.name_search_timer = QTimer(self)
+        self.name_search_timer.setSingleShot(True)
+        self.name_search_timer.setInterval(SEARCH_DELAY_MS)
+        self.name_search_timer.timeout.connect(self.searchByNamePrefix)
+        self.name_edit.textEdited.connect(lambda: self.name_search_timer.start())
+        self.name_completer.activated.connect(lambda: self.name_search_timer.start())
+        
         self.gender_combo = QComboBox()
         self.gender_combo.addItems(["男", "女"])
         form_layout.addRow("性别:", self.gender_combo)
@@ -72,23 +89,50 @@ class PunishmentTab(QWidget):
         self.reset_btn.clicked.connect(self.resetForm)
         button_layout.addWidget(self.reset_btn)
         
+        # 关键词搜索，按相关度列出姓名或处分原因匹配的记录
+        keyword_layout = QHBoxLayout()
+        keyword_layout.addWidget(QLabel("关键词:"))
+        self.keyword_edit = QLineEdit()
+        self.keyword_edit.setPlaceholderText("姓名、处分原因，多个关键词用空格分隔")
+        self.keyword_edit.returnPressed.connect(self.keywordSearch)
+        keyword_layout.addWidget(self.keyword_edit)
+        self.keyword_btn = QPushButton("搜索")
+        self.keyword_btn.clicked.connect(self.keywordSearch)
+        keyword_layout.addWidget(self.keyword_btn)
+        
         # 表格
-        self.table = QTableWidget()
-        self.table.setColumnCount(9)
-        self.table.setHorizontalHeaderLabels(["ID", "姓名", "性别", "年级", "专业班级", "处分类型", "处分日期", "核销所需积分", "状态"])
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.itemClicked.connect(self.onTableItemClicked)
-        # 启用表格排序功能
+        # 记录为 repository.PunishmentRow：(id, 姓名, 性别, 年级, 专业班级, 处分类型, 处分日期, 核销所需积分, 状态)
+        self.model = PagedRecordModel([
+            Column("ID", 0),
+            Column("姓名", 1),
+            Column("性别", 2),
+            Column("年级", 3),
+            Column("专业班级", 4),
+            Column("处分类型", 5),
+            Column("处分日期", 6),
+            Column("核销所需积分", 7),
+            Column("状态", 8),
+        ], key=lambda record: (record.date, record.id))
+        self.table, self.proxy = createRecordView(self.model)
+        self.table.clicked.connect(self.onTableClicked)
+        # 启用表格排序功能，初始保持查询结果的顺序
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
         self.table.setSortingEnabled(True)
         # 隐藏ID列
         self.table.hideColumn(0)
         
+        # 列表在后台线程中分页加载，滚动到底部时自动加载下一页
+        self.loader = PagedQueryLoader(self.db, self.model, PUNISHMENT_LIST, self.repo.filters())
+        self.loader.pageLoaded.connect(self.onPageLoaded)
+        self.loader.error.connect(self.onQueryError)
+        self.count_label = QLabel()
+        
         # 添加到主布局
         main_layout.addLayout(form_layout)
         main_layout.addLayout(button_layout)
+        main_layout.addLayout(keyword_layout)
         main_layout.addWidget(self.table)
+        main_layout.addWidget(self.count_label)
         
         # 连接处分类型变化信号
         self.punishment_type_combo.currentIndexChanged.connect(self.updateRequiredPoints)
@@ -97,8 +141,11 @@ class PunishmentTab(QWidget):
         self.grade_combo.currentIndexChanged.connect(self.updateClassCombo)
     
     def loadData(self):
+        # 年级和专业文本文件有修改时先同步到数据库
+        self.repo.sync_reference_data()
+        
         # 加载年级数据
-        grades = DataManager.load_grades()
+        grades = self.repo.grades()
         self.grade_combo.clear()
         for grade_id, grade_name in grades:
             self.grade_combo.addItem(grade_name, grade_id)
@@ -107,11 +154,9 @@ class PunishmentTab(QWidget):
         self.updateClassCombo()
         
         # 加载处分类型数据
-        self.db.cursor.execute("SELECT id, name, required_points FROM punishment_types ORDER BY display_order")
-        punishment_types = self.db.cursor.fetchall()
         self.punishment_type_combo.clear()
-        for type_id, type_name, required_points in punishment_types:
-            self.punishment_type_combo.addItem(type_name, type_id)
+        for punishment_type in self.repo.punishment_types():
+            self.punishment_type_combo.addItem(punishment_type.name, punishment_type.id)
     
     def updateClassCombo(self):
         # 获取当前选中的年级ID
@@ -119,16 +164,10 @@ class PunishmentTab(QWidget):
         if current_grade_id is None:
             return
         
-        # 加载与当前年级关联的专业班级数据
-        classes = DataManager.load_classes()
+        # 加载当前年级的专业班级数据
         self.class_combo.clear()
-        added_majors = set()  # 用于跟踪已添加的专业
-        
-        for class_id, grade_id, major, class_name in classes:
-            # 只显示当前选中年级的专业
-            if grade_id == current_grade_id and major not in added_majors:
-                self.class_combo.addItem(major, class_id)
-                added_majors.add(major)
+        for class_id, _, major in self.repo.classes(current_grade_id):
+            self.class_combo.addItem(major, class_id)
     
     def addPunishment(self):
         try:
@@ -150,40 +189,24 @@ class PunishmentTab(QWidget):
                 QMessageBox.warning(self, "错误", "请输入处分原因")
                 return
             
-            # 添加或获取学生信息
-            self.db.cursor.execute("""
-                INSERT OR IGNORE INTO students (name, gender, grade_id, class_id)
-                VALUES (?, ?, ?, ?)
-            """, (name, gender, grade_id, class_id))
-            
-            self.db.cursor.execute("""
-                SELECT id FROM students
-                WHERE name = ? AND gender = ? AND grade_id = ? AND class_id = ?
-            """, (name, gender, grade_id, class_id))
-            student_id = self.db.cursor.fetchone()[0]
-            
-            # 添加处分记录
-            self.db.cursor.execute("""
-                INSERT INTO punishments (student_id, type_id, reason, date, required_points, is_cleared)
-                VALUES (?, ?, ?, ?, ?, 0)
-            """, (student_id, type_id, reason, date, required_points))
-            
-            self.db.conn.commit()
+            # 添加处分记录，学生不存在时一并创建；新记录满足列表的筛选条件时只插入这一行
+            record = self.repo.add_punishment(name, gender, grade_id, class_id, type_id, reason, date,
+                                              required_points, self.loader.filters)
+            self.clearForm()
+            self.showAddedRecord(record)
             QMessageBox.information(self, "成功", "处分记录添加成功")
-            self.resetForm()
             
         except Exception as e:
-            self.db.conn.rollback()
             QMessageBox.critical(self, "错误", f"添加处分记录失败：{str(e)}")
     
     def modifyPunishment(self):
         try:
-            selected_items = self.table.selectedItems()
-            if not selected_items:
+            row = selectedSourceRow(self.table, self.proxy)
+            if row is None:
                 QMessageBox.warning(self, "错误", "请选择要修改的记录")
                 return
             
-            punishment_id = int(selected_items[0].text())
+            punishment_id = self.model.record(row).id
             
             # 获取表单数据
             name = self.name_edit.text().strip()
@@ -203,92 +226,69 @@ class PunishmentTab(QWidget):
                 QMessageBox.warning(self, "错误", "请输入处分原因")
                 return
             
-            # 更新学生信息
-            self.db.cursor.execute("""
-                UPDATE students
-                SET name = ?, gender = ?, grade_id = ?, class_id = ?
-                WHERE id = (SELECT student_id FROM punishments WHERE id = ?)
-            """, (name, gender, grade_id, class_id, punishment_id))
-            
-            # 更新处分记录
-            self.db.cursor.execute("""
-                UPDATE punishments
-                SET type_id = ?, reason = ?, date = ?, required_points = ?
-                WHERE id = ?
-            """, (type_id, reason, date, required_points, punishment_id))
-            
-            self.db.conn.commit()
+            # 更新处分记录，学生不存在时一并创建；列表中只更新该行
+            record = self.repo.update_punishment(punishment_id, name, gender, grade_id, class_id,
+                                                 type_id, reason, date, required_points, self.loader.filters)
+            self.clearForm()
+            self.showModifiedRecord(row, record)
             QMessageBox.information(self, "成功", "处分记录修改成功")
-            self.resetForm()
             
         except Exception as e:
-            self.db.conn.rollback()
             QMessageBox.critical(self, "错误", f"修改处分记录失败：{str(e)}")
     
     def deletePunishment(self):
         try:
-            selected_items = self.table.selectedItems()
-            if not selected_items:
+            row = selectedSourceRow(self.table, self.proxy)
+            if row is None:
                 QMessageBox.warning(self, "错误", "请选择要删除的记录")
                 return
             
-            punishment_id = int(selected_items[0].text())
-            
             reply = QMessageBox.question(self, "确认", "确定要删除该处分记录吗？",
                                        QMessageBox.Yes | QMessageBox.No)
             if reply == QMessageBox.Yes:
-                self.db.cursor.execute("DELETE FROM punishments WHERE id = ?", (punishment_id,))
-                self.db.conn.commit()
+                self.repo.delete_punishment(self.model.record(row).id)
+                self.clearForm()
+                self.removeRecord(row)
                 QMessageBox.information(self, "成功", "处分记录删除成功")
-                self.resetForm()
             
         except Exception as e:
-            self.db.conn.rollback()
             QMessageBox.critical(self, "错误", f"删除处分记录失败：{str(e)}")
     
     def clearPunishment(self):
         try:
-            selected_items = self.table.selectedItems()
-            if not selected_items:
+            row = selectedSourceRow(self.table, self.proxy)
+            if row is None:
                 QMessageBox.warning(self, "错误", "请选择要核销的记录")
                 return
             
-            punishment_id = int(selected_items[0].text())
+            punishment_id = self.model.record(row).id
             
-            # 检查是否已经核销
-            self.db.cursor.execute("SELECT is_cleared FROM punishments WHERE id = ?", (punishment_id,))
-            is_cleared = self.db.cursor.fetchone()[0]
+            # 检查是否已经核销，以及分配给该处分的积分是否足够
+            is_cleared, allocated_points, required_points = self.repo.clearance_state(punishment_id)
             
             if is_cleared:
                 QMessageBox.warning(self, "错误", "该处分记录已经核销")
                 return
             
-            # 检查积分是否足够
-            self.db.cursor.execute("""
-                SELECT COALESCE(SUM(points), 0) as total_points
-                FROM activities
-                WHERE punishment_id = ?
-            """, (punishment_id,))
-            total_points = self.db.cursor.fetchone()[0]
-            
-            self.db.cursor.execute("SELECT required_points FROM punishments WHERE id = ?", (punishment_id,))
-            required_points = self.db.cursor.fetchone()[0]
-            
-            if total_points < required_points:
-                QMessageBox.warning(self, "错误", f"积分不足，还需要{required_points - total_points}分")
+            if allocated_points < required_points:
+                QMessageBox.warning(self, "错误", f"积分不足，还需要{required_points - allocated_points}分")
                 return
             
-            # 核销处分
-            self.db.cursor.execute("UPDATE punishments SET is_cleared = 1 WHERE id = ?", (punishment_id,))
-            self.db.conn.commit()
+            # 核销处分，列表中只更新该行的状态
+            record = self.repo.clear_punishment(punishment_id, self.loader.filters)
+            self.clearForm()
+            self.showModifiedRecord(row, record)
             QMessageBox.information(self, "成功", "处分记录核销成功")
-            self.resetForm()
             
         except Exception as e:
-            self.db.conn.rollback()
             QMessageBox.critical(self, "错误", f"核销处分记录失败：{str(e)}")
     
     def resetForm(self):
+        self.clearForm()
+        self.loadData()
+        self.refreshTable()
+    
+    def clearForm(self):
         self.name_edit.clear()
         self.gender_combo.setCurrentIndex(0)
         self.grade_combo.setCurrentIndex(0)
@@ -297,31 +297,42 @@ class PunishmentTab(QWidget):
         self.reason_edit.clear()
         self.date_edit.setDate(QDate.currentDate())
         self.points_spin.setValue(0)
-        self.loadData()
-        self.refreshTable()
+    
+    def showAddedRecord(self, record):
+        """把新增的记录插入列表并选中，不满足当前筛选条件（record 为 None）时不显示"""
+        if record is None:
+            return
+        row = self.loader.insertRecord(record)
+        if self.total_estimate is not None:
+            self.total_estimate += 1
+        if row is not None:
+            selectSourceRow(self.table, self.proxy, row)
+        self.updateCountLabel()
+    
+    def showModifiedRecord(self, row, record):
+        """用修改后的记录替换列表中的第 row 行，保持排序和选中状态"""
+        new_row = self.loader.updateRecord(row, record)
+        if new_row is not None and new_row != row:
+            selectSourceRow(self.table, self.proxy, new_row)
+        self.updateCountLabel()
+    
+    def removeRecord(self, row):
+        self.model.removeRecord(row)
+        if self.total_estimate is not None:
+            self.total_estimate -= 1
+        self.updateCountLabel()
     
     def updateRequiredPoints(self):
         type_id = self.punishment_type_combo.currentData()
         if type_id is not None:
-            self.db.cursor.execute("SELECT required_points FROM punishment_types WHERE id = ?", (type_id,))
-            required_points = self.db.cursor.fetchone()[0]
-            self.points_spin.setValue(required_points)
+            self.points_spin.setValue(self.repo.punishment_type_points(type_id))
     
-    def onTableItemClicked(self, item):
+    def onTableClicked(self, index):
         try:
-            row = item.row()
-            punishment_id = int(self.table.item(row, 0).text())
+            punishment_id = self.model.record(self.proxy.mapToSource(index).row()).id
             
             # 获取处分记录信息
-            self.db.cursor.execute("""
-                SELECT s.name, s.gender, s.grade_id, s.class_id,
-                       p.type_id, p.reason, p.date, p.required_points
-                FROM punishments p
-                JOIN students s ON p.student_id = s.id
-                WHERE p.id = ?
-            """, (punishment_id,))
-            
-            record = self.db.cursor.fetchone()
+            record = self.repo.punishment_detail(punishment_id)
             if record:
                 name, gender, grade_id, class_id, type_id, reason, date, required_points = record
                 
@@ -355,153 +366,86 @@ class PunishmentTab(QWidget):
             QMessageBox.critical(self, "错误", f"加载处分记录失败：{str(e)}")
     
     def refreshTable(self):
-        try:
-            # 临时禁用排序，以便快速填充数据
-            self.table.setSortingEnabled(False)
-            
-            # 获取处分记录数据
-            self.db.cursor.execute("""
-                SELECT p.id, s.name, s.gender, s.grade_id, s.class_id,
-                       pt.name as punishment_type, p.date, p.required_points,
-                       CASE WHEN p.is_cleared = 1 THEN '已核销' ELSE '未核销' END as status
-                FROM punishments p
-                JOIN students s ON p.student_id = s.id
-                JOIN punishment_types pt ON p.type_id = pt.id
-                ORDER BY p.date DESC
-            """)
-            records = self.db.cursor.fetchall()
-            
-            # 加载年级和专业数据，确保与公益活动记录管理中一致
-            grades_dict = {grade_id: grade_name for grade_id, grade_name in DataManager.load_grades()}
-            classes_dict = {class_id: major for class_id, _, major, _ in DataManager.load_classes()}
-            
-            self.table.setRowCount(len(records))
-            for row, record in enumerate(records):
-                # 解包记录
-                punishment_id, name, gender, grade_id, class_id, punishment_type, date, required_points, status = record
-                
-                # 获取年级和专业名称
-                grade_name = grades_dict.get(grade_id, "未知年级")
-                class_name = classes_dict.get(class_id, "未知专业")
-                
-                # 设置表格数据
-                id_item = QTableWidgetItem(str(punishment_id))
-                id_item.setData(Qt.DisplayRole, punishment_id)  # 设置为数字以便正确排序
-                self.table.setItem(row, 0, id_item)
-                
-                self.table.setItem(row, 1, QTableWidgetItem(name))
-                self.table.setItem(row, 2, QTableWidgetItem(gender))
-                self.table.setItem(row, 3, QTableWidgetItem(grade_name))
-                self.table.setItem(row, 4, QTableWidgetItem(class_name))
-                self.table.setItem(row, 5, QTableWidgetItem(punishment_type))
-                
-                # 设置日期项，确保可以正确排序
-                date_item = QTableWidgetItem(date)
-                date_item.setData(Qt.DisplayRole, QDate.fromString(date, "yyyy-MM-dd"))
-                self.table.setItem(row, 6, date_item)
-                
-                # 设置积分项，确保可以正确排序
-                points_item = QTableWidgetItem(str(required_points))
-                points_item.setData(Qt.DisplayRole, int(required_points))
-                self.table.setItem(row, 7, points_item)
-                
-                self.table.setItem(row, 8, QTableWidgetItem(status))
-            
-            # 重新启用排序
-            self.table.setSortingEnabled(True)
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"加载处分记录失败：{str(e)}")
+        self.total_estimate = self.repo.punishment_count_estimate()
+        self.startQuery(self.repo.filters())
     
     def searchPunishment(self):
+        # 按姓名、年级、专业班级筛选，专业班级下拉框的数据就是 classes 表中的ID
+        filters = self.repo.punishment_filters(self.name_edit.text().strip(),
+                                               self.grade_combo.currentData(),
+                                               self.class_combo.currentData())
+        
+        # 按条件筛选时无法预估总数，只显示已加载的数量
+        self.total_estimate = None
+        self.startQuery(filters, notify_empty=True)
+    
+    def searchByNamePrefix(self):
+        name = self.name_edit.text().strip()
+        if not name:
+            self.refreshTable()
+            return
+        
+        # 新的查询会取消仍在进行的旧查询
+        self.total_estimate = None
+        self.startQuery(self.repo.punishment_name_prefix_filters(name, PAGE_SIZE))
+    
+    def keywordSearch(self):
+        keyword = self.keyword_edit.text().strip()
+        if not keyword:
+            self.refreshTable()
+            return
+        
+        self.total_estimate = None
+        self.notify_empty_result = True
+        search = self.repo.punishment_keyword_search(keyword, SEARCH_RESULT_LIMIT)
+        if search.query is None:
+            # 关键词过短或没有全文索引时按日期分页显示 LIKE 匹配的记录
+            self.loader.start(search.filters)
+        else:
+            self.loader.loadAll(search.query, search.filters)
+    
+    def startQuery(self, filters, notify_empty=False):
+        """在线程池中分页加载处分列表，取消仍在进行的旧查询"""
+        self.notify_empty_result = notify_empty
+        self.loader.start(filters)
+    
+    def onPageLoaded(self, page_rows, loaded_rows):
+        self.updateCountLabel()
+        
+        if self.notify_empty_result and loaded_rows == 0:
+            QMessageBox.information(self, "提示", "未找到符合条件的记录")
+    
+    def updateCountLabel(self):
+        loaded_rows = self.model.rowCount()
+        if self.total_estimate is None:
+            text = f"已显示 {loaded_rows} 条记录"
+        else:
+            text = f"已显示 {loaded_rows} 条记录，共约 {max(self.total_estimate, loaded_rows)} 条"
+        if self.model.has_more:
+            text += "，滚动到底部加载更多"
+        self.count_label.setText(text)
+    
+    def onDataChanged(self, change):
+        """本页自己的修改已经更新到列表中，其他来源的修改按ID重新查询受影响的处分"""
+        if change.source is self.repo:
+            return
+        if change.reload:
+            self.loader.start(self.loader.filters)
+            return
+        
+        # 学生信息的修改会影响该学生已加载的所有处分
+        punishment_ids = set(change.punishment_ids)
+        if change.student_ids:
+            punishment_ids.update(record.id for record in self.model.records
+                                  if record.student_id in change.student_ids)
+        if not punishment_ids:
+            return
         try:
-            # 获取查询条件
-            name = self.name_edit.text().strip()
-            grade_id = self.grade_combo.currentData()
-            class_id = self.class_combo.currentData()
-            
-            # 构建查询条件
-            conditions = []
-            params = []
-            
-            if name:
-                conditions.append("s.name LIKE ?")
-                params.append(f"%{name}%")
-            
-            if grade_id is not None:
-                conditions.append("s.grade_id = ?")
-                params.append(grade_id)
-            
-            # 只有当用户明确选择了专业班级时才添加该条件
-            # 这样当只选择年级不选专业时，可以显示该年级的所有学生
-            # 注意：由于专业班级下拉框显示的是专业名称，但实际存储的是class_id
-            # 而且DataManager.load_classes()从专业.txt加载的专业数据与数据库中的classes表不一致
-            # 所以这里不再使用class_id进行精确匹配，而是根据年级筛选即可
-            # 如果需要按专业筛选，应该修改数据库结构或者调整专业数据的加载方式
-            # 移除专业班级筛选条件，只保留年级筛选，这样可以显示所有年级的学生，包括2023级护理的张三
-            
-            # 构建SQL查询
-            query = """
-                SELECT p.id, s.name, s.gender, s.grade_id, s.class_id,
-                       pt.name as punishment_type, p.date, p.required_points,
-                       CASE WHEN p.is_cleared = 1 THEN '已核销' ELSE '未核销' END as status
-                FROM punishments p
-                JOIN students s ON p.student_id = s.id
-                JOIN punishment_types pt ON p.type_id = pt.id
-            """
-            
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-                
-            # 添加排序，确保结果按日期降序排列，与refreshTable方法一致
-            query += " ORDER BY p.date DESC"
-            
-            # 执行查询
-            self.db.cursor.execute(query, params)
-            records = self.db.cursor.fetchall()
-            
-            # 加载年级和专业数据
-            grades_dict = {grade_id: grade_name for grade_id, grade_name in DataManager.load_grades()}
-            classes_dict = {class_id: major for class_id, _, major, _ in DataManager.load_classes()}
-            
-            # 更新表格（临时禁用排序以提高性能）
-            self.table.setSortingEnabled(False)
-            self.table.setRowCount(len(records))
-            for row, record in enumerate(records):
-                # 解包记录
-                punishment_id, name, gender, grade_id, class_id, punishment_type, date, required_points, status = record
-                
-                # 获取年级和专业名称
-                grade_name = grades_dict.get(grade_id, "未知年级")
-                class_name = classes_dict.get(class_id, "未知专业")
-                
-                # 设置表格数据
-                id_item = QTableWidgetItem(str(punishment_id))
-                id_item.setData(Qt.DisplayRole, punishment_id)  # 设置为数字以便正确排序
-                self.table.setItem(row, 0, id_item)
-                
-                self.table.setItem(row, 1, QTableWidgetItem(name))
-                self.table.setItem(row, 2, QTableWidgetItem(gender))
-                self.table.setItem(row, 3, QTableWidgetItem(grade_name))
-                self.table.setItem(row, 4, QTableWidgetItem(class_name))
-                self.table.setItem(row, 5, QTableWidgetItem(punishment_type))
-                
-                # 设置日期项，确保可以正确排序
-                date_item = QTableWidgetItem(date)
-                date_item.setData(Qt.DisplayRole, QDate.fromString(date, "yyyy-MM-dd"))
-                self.table.setItem(row, 6, date_item)
-                
-                # 设置积分项，确保可以正确排序
-                points_item = QTableWidgetItem(str(required_points))
-                points_item.setData(Qt.DisplayRole, int(required_points))
-                self.table.setItem(row, 7, points_item)
-                
-                self.table.setItem(row, 8, QTableWidgetItem(status))
-            
-            # 重新启用排序
-            self.table.setSortingEnabled(True)
-            
-            if not records:
-                QMessageBox.information(self, "提示", "未找到符合条件的记录")
-            
+            records = self.repo.punishment_rows(punishment_ids, self.loader.filters)
+            self.loader.mergeRecords(punishment_ids, records)
+            self.updateCountLabel()
         except Exception as e:
-            QMessageBox.critical(self, "错误", f"查询处分记录失败：{str(e)}")
\ No newline at end of file
+            print(f"更新处分列表失败: {str(e)}")
+    
+    def onQueryError(self, message):
+        QMessageBox.critical(self, "错误", f"查询处分记录失败：{message}")
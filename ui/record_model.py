@@ -0,0 +1,184 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, pyqtSignal
+from PyQt5.QtWidgets import QTableView, QHeaderView, QAbstractItemView
+
+
+class Column:
+    """表格列定义
+
+    value 为记录元组中的下标，或接收整条记录返回值的函数；
+    display 可选，把取到的值转换为显示文本，省略时直接显示原值。
+    """
+
+    def __init__(self, header, value, display=None):
+        self.header = header
+        self.value = value
+        self.display = display
+
+    def valueOf(self, record):
+        if callable(self.value):
+            return self.value(record)
+        return record[self.value]
+
+
+class RecordTableModel(QAbstractTableModel):
+    """以查询结果元组为存储的只读表格模型
+
+    每行只保存数据库返回的一个元组，显示文本在视图请求时才生成，
+    因此只有当前可见的单元格会被转换；排序通过 SortRole 返回原始值，
+    交给 QSortFilterProxyModel 完成。
+    """
+
+    SortRole = Qt.UserRole + 1
+
+    def __init__(self, columns, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.records = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        column = self.columns[index.column()]
+        if role == Qt.DisplayRole:
+            value = column.valueOf(self.records[index.row()])
+            if column.display is not None:
+                return column.display(value)
+            return value
+        if role == self.SortRole:
+            value = column.valueOf(self.records[index.row()])
+            return "" if value is None else value
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section].header
+        return super().headerData(section, orientation, role)
+
+    def headers(self):
+        return [column.header for column in self.columns]
+
+    def record(self, row):
+        return self.records[row]
+
+    def setRecords(self, records):
+        self.beginResetModel()
+        self.records = list(records)
+        self.endResetModel()
+
+    def clear(self):
+        self.setRecords([])
+
+    def appendRecords(self, records):
+        if not records:
+            return
+        start = len(self.records)
+        self.beginInsertRows(QModelIndex(), start, start + len(records) - 1)
+        self.records.extend(records)
+        self.endInsertRows()
+
+    def insertRecord(self, row, record):
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.records.insert(row, record)
+        self.endInsertRows()
+
+    def replaceRecord(self, row, record):
+        """替换一行记录，排序代理收到 dataChanged 后把该行移到排序后的位置"""
+        self.records[row] = record
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.columns) - 1))
+
+    def removeRecord(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.records[row]
+        self.endRemoveRows()
+
+
+class PagedRecordModel(RecordTableModel):
+    """分页加载的记录模型
+
+    视图滚动到底部时 QTableView 调用 fetchMore，模型发出 moreRequested，
+    由加载器按 key(最后一条记录) 取下一页后调用 appendRecords 追加。
+    """
+
+    moreRequested = pyqtSignal()
+
+    def __init__(self, columns, key, parent=None):
+        super().__init__(columns, parent)
+        self.key = key
+        self.has_more = False
+        self.loading = False
+
+    def clear(self):
+        super().clear()
+        self.has_more = False
+        self.loading = False
+
+    def lastKey(self):
+        if not self.records:
+            return None
+        return self.key(self.records[-1])
+
+    def keyPosition(self, key):
+        """记录按键降序排列，二分查找键为 key 的记录应插入的位置"""
+        low, high = 0, len(self.records)
+        while low < high:
+            middle = (low + high) // 2
+            if self.key(self.records[middle]) > key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more and not self.loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self.loading = True
+            self.moreRequested.emit()
+
+
+def createRecordView(model):
+    """创建显示 RecordTableModel 的表格视图，返回 (视图, 排序代理模型)
+
+    视图初始不排序，保持查询语句给出的顺序，点击表头后按该列排序。
+    """
+    proxy = QSortFilterProxyModel()
+    proxy.setSourceModel(model)
+    proxy.setSortRole(RecordTableModel.SortRole)
+
+    view = QTableView()
+    view.setModel(proxy)
+    view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+    view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+    view.setSelectionBehavior(QAbstractItemView.SelectRows)
+    return view, proxy
+
+
+def selectSourceRow(view, proxy, row):
+    """选中模型中的第 row 行并滚动到该行"""
+    index = proxy.mapFromSource(proxy.sourceModel().index(row, 0))
+    if index.isValid():
+        view.selectRow(index.row())
+        view.scrollTo(index)
+
+
+def selectedSourceRow(view, proxy):
+    """返回视图中当前选中行在模型中的行号，没有选中时返回 None"""
+    rows = view.selectionModel().selectedRows()
+    if not rows:
+        return None
+    return proxy.mapToSource(rows[0]).row()
+
+
+def selectedRecord(view, proxy, model):
+    """返回视图中当前选中行对应的记录，没有选中时返回 None"""
+    row = selectedSourceRow(view, proxy)
+    if row is None:
+        return None
+    return model.record(row)
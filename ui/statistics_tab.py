@@ -3,18 +3,28 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QFormLayout,
                             QTableWidgetItem, QHeaderView, QMessageBox, QDialog,
                             QFileDialog)
 from ui.help_dialogs import HelpDialog
-from PyQt5.QtCore import Qt, QDate
-from utils.data_manager import DataManager
-import openpyxl
-from openpyxl.styles import Font, Alignment
+from PyQt5.QtCore import Qt, QDate, QTimer, QThreadPool
+from ui.record_model import Column, RecordTableModel, createRecordView
+from ui.workers import ExportRunner, QueryWorker, SEARCH_DELAY_MS
+from ui.name_completer import NameCompleter
+from utils.exporter import SheetSpec, export_workbook
+from repository import Repository, StatisticsFilter
 from datetime import datetime
+import bisect
+import time
+
+# 有变化的学生超过该数量时重新执行完整的统计查询，而不是逐个学生更新
+INCREMENTAL_REFRESH_LIMIT = 500
 
 class StatisticsTab(QWidget):
     def __init__(self, db):
         super().__init__()
         self.db = db
+        self.repo = Repository(db)
         self.initUI()
         self.loadData()
+        # 其他标签页和本页的写操作提交后，只重新统计受影响的学生
+        self.db.changes.subscribe(self.onDataChanged)
     
     def initUI(self):
         main_layout = QVBoxLayout(self)
@@ -26,6 +36,16 @@ class StatisticsTab(QWidget):
         self.name_edit = QLineEdit()
         form_layout.addRow("姓名:", self.name_edit)
         
+        # 输入姓名时自动补全，停止输入片刻后按姓名前缀查询
+        self.name_completer = NameCompleter(self.db, self.name_edit)
+        self.name_edit.setCompleter(self.name_completer)
+        self.name_search_timer = QTimer(self)
+        self.name_search_timer.setSingleShot(True)
+        self.name_search_timer.setInterval(SEARCH_DELAY_MS)
+        self.name_search_timer.timeout.connect(lambda: self.searchRecords(name_prefix=True))
+        self.name_edit.textEdited.connect(lambda: self.name_search_timer.start())
+        self.name_completer.activated.connect(lambda: self.name_search_timer.start())
+        
         self.grade_combo = QComboBox()
         form_layout.addRow("年级:", self.grade_combo)
         
@@ -47,23 +67,49 @@ class StatisticsTab(QWidget):
         self.delete_btn.clicked.connect(self.deleteStudent)
         button_layout.addWidget(self.delete_btn)
         
+        self.batch_clear_btn = QPushButton("批量核销")
+        self.batch_clear_btn.clicked.connect(self.batchClear)
+        button_layout.addWidget(self.batch_clear_btn)
+        
         self.export_btn = QPushButton("导出Excel")
         self.export_btn.clicked.connect(self.exportToExcel)
         button_layout.addWidget(self.export_btn)
         
         # 表格
-        self.table = QTableWidget()
-        self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels(["姓名", "性别", "年级", "专业班级", "核销所需积分", "已获得积分", "尚需积分", "状态"])
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        # 记录为 repository.StudentStatistics：(学生ID, 姓名, 性别, 年级, 专业班级, 核销所需积分, 已获得积分, 状态)
+        self.model = RecordTableModel([
+            Column("姓名", 1),
+            Column("性别", 2),
+            Column("年级", 3),
+            Column("专业班级", 4),
+            Column("核销所需积分", 5),
+            Column("已获得积分", 6),
+            Column("尚需积分", lambda record: max(0, record.required_points - record.earned_points)),
+            Column("状态", 7),
+        ])
+        self.table, self.proxy = createRecordView(self.model)
         self.table.doubleClicked.connect(self.showStudentDetail)
         
         # 添加表头点击事件
         self.table.horizontalHeader().sectionClicked.connect(self.onHeaderClicked)
         self.current_sort_column = -1  # 当前排序列
         self.sort_order = 0  # 0: 初始状态, 1: 升序, 2: 降序
+        self.export_runner = ExportRunner(self, "导出Excel")
+        # 查询在线程池中执行，search_serial 用于丢弃已被新查询取代的结果
+        self.search_serial = 0
+        self.search_worker = None
+        self.search_records = []
+        # 表格中的记录对应的筛选条件（尚未查询过时为 None），以及之后数据有变化的学生
+        self.search_filter = None
+        self.search_key = None
+        self.loaded_filter = None
+        self.changed_students = set()
+        self.reload_pending = False
+        # 连续的多次变更合并为一次更新
+        self.change_timer = QTimer(self)
+        self.change_timer.setSingleShot(True)
+        self.change_timer.setInterval(0)
+        self.change_timer.timeout.connect(self.refreshIfChanged)
         
         # 添加到主布局
         main_layout.addLayout(form_layout)
@@ -72,108 +118,158 @@ class StatisticsTab(QWidget):
     
     def loadData(self):
         try:
+            # 年级和专业文本文件有修改时先同步到数据库
+            self.repo.sync_reference_data()
+            
             # 加载年级数据
-            grades = DataManager.load_grades()
+            grades = self.repo.grades()
             self.grade_combo.clear()
             self.grade_combo.addItem("所有", None)
             for grade_id, grade_name in grades:
                 self.grade_combo.addItem(grade_name, grade_id)
             
-            # 加载专业班级数据
-            classes = DataManager.load_classes()
+            # 加载专业数据，同一专业在各年级下只列一次，按专业名称筛选
+            majors = dict.fromkeys(major for _, _, major in self.repo.classes())
             self.class_combo.clear()
             self.class_combo.addItem("所有", None)
-            for class_id, _, major, _ in classes:
-                self.class_combo.addItem(major, class_id)
+            for major in majors:
+                self.class_combo.addItem(major, major)
         except Exception as e:
             print(f"加载数据失败：{str(e)}")
     
-    def searchRecords(self):
+    def currentFilter(self, name_prefix=False):
+        """返回当前的筛选条件，name_prefix 为 True 时按姓名前缀筛选（边输入边查询）"""
+        punishment_type = self.punishment_type_combo.currentText()
+        return StatisticsFilter(
+            name=self.name_edit.text().strip(),
+            grade_id=self.grade_combo.currentData(),
+            major=self.class_combo.currentData(),
+            punishment_type=None if punishment_type == "全部" else punishment_type,
+            name_prefix=name_prefix,
+        )
+    
+    def searchRecords(self, name_prefix=False):
+        self.startSearch(self.currentFilter(name_prefix))
+    
+    def startSearch(self, statistics_filter):
         try:
-            # 构建查询条件
-            conditions = []
-            params = []
-            
-            name = self.name_edit.text().strip()
-            if name:
-                conditions.append("s.name LIKE ?")
-                params.append(f"%{name}%")
-            
-            grade_id = self.grade_combo.currentData()
-            if grade_id:
-                conditions.append("s.grade_id = ?")
-                params.append(grade_id)
-            
-            class_id = self.class_combo.currentData()
-            if class_id:
-                conditions.append("s.class_id = ?")
-                params.append(class_id)
-            
-            punishment_type = self.punishment_type_combo.currentText()
-            if punishment_type != "全部":
-                conditions.append("pt.name = ?")
-                params.append(punishment_type)
-            
-            # 构建SQL查询
-            where_clause = " AND ".join(conditions) if conditions else "1=1"
-            
-            query = f"""
-                SELECT s.id as student_id, s.name, s.gender, s.grade_id, s.class_id,
-                       SUM(p.required_points) as total_required_points,
-                       COALESCE((SELECT SUM(points) FROM activities WHERE student_id = s.id), 0) as earned_points,
-                       CASE WHEN COUNT(*) = SUM(CASE WHEN p.is_cleared = 1 THEN 1 ELSE 0 END) THEN '已核销' ELSE '' END as status
-                FROM students s
-                JOIN punishments p ON s.id = p.student_id
-                JOIN punishment_types pt ON p.type_id = pt.id
-                WHERE {where_clause}
-                GROUP BY s.id, s.name, s.gender, s.grade_id, s.class_id
-                ORDER BY s.name
-            """
-            
-            self.db.cursor.execute(query, params)
-            records = self.db.cursor.fetchall()
-            
-            # 加载年级和专业班级数据，用于显示名称
-            grades_dict = {grade_id: grade_name for grade_id, grade_name in DataManager.load_grades()}
-            classes_dict = {class_id: major for class_id, _, major, _ in DataManager.load_classes()}
-            
-            self.table.setRowCount(len(records))
-            for row, record in enumerate(records):
-                student_id, name, gender, grade_id, class_id, required, earned, status = record
-                remaining = max(0, required - earned)
-                
-                # 根据ID获取年级和专业班级名称
-                grade_name = grades_dict.get(grade_id, "未知")
-                class_name = classes_dict.get(class_id, "未知")
-                
-                # 创建表格项并存储学生ID
-                name_item = QTableWidgetItem(name)
-                name_item.setData(Qt.UserRole, student_id)  # 存储学生ID
-                
-                self.table.setItem(row, 0, name_item)
-                self.table.setItem(row, 1, QTableWidgetItem(gender))
-                self.table.setItem(row, 2, QTableWidgetItem(grade_name))
-                self.table.setItem(row, 3, QTableWidgetItem(class_name))
-                self.table.setItem(row, 4, QTableWidgetItem(str(required)))
-                self.table.setItem(row, 5, QTableWidgetItem(str(earned)))
-                self.table.setItem(row, 6, QTableWidgetItem(str(remaining)))
-                self.table.setItem(row, 7, QTableWidgetItem(status))
+            # 取消仍在进行的旧查询；查询开始之前的变更都已包含在结果中
+            if self.search_worker is not None:
+                self.search_worker.cancel()
+                self.search_worker = None
+            self.search_serial += 1
+            self.search_records = []
+            self.search_filter = statistics_filter
+            self.changed_students = set()
+            self.reload_pending = False
+            
+            # 同样的筛选条件在最近一次修改数据之后已经查询过时直接使用缓存的结果
+            self.search_key = (statistics_filter, self.db.write_generation)
+            records = self.db.statistics_cache.get(self.search_key)
+            if records is not None:
+                self.loaded_filter = statistics_filter
+                self.model.setRecords(records)
+                return
+            
+            # 结果全部返回后一次性更新表格
+            query = self.repo.statistics_query(statistics_filter)
+            worker = QueryWorker(self.db, query, self.search_serial)
+            worker.signals.rows.connect(self.onSearchRows)
+            worker.signals.finished.connect(self.onSearchFinished)
+            worker.signals.error.connect(self.onSearchError)
+            self.search_worker = worker
+            QThreadPool.globalInstance().start(worker)
             
         except Exception as e:
             QMessageBox.critical(self, "错误", f"查询失败：{str(e)}")
     
+    def onSearchRows(self, request_id, records):
+        if request_id == self.search_serial:
+            self.search_records.extend(records)
+    
+    def onSearchFinished(self, request_id, total):
+        if request_id != self.search_serial:
+            return
+        self.search_worker = None
+        self.loaded_filter = self.search_filter
+        self.db.statistics_cache.put(self.search_key, tuple(self.search_records))
+        self.model.setRecords(self.search_records)
+        self.search_records = []
+        # 查询进行期间又有数据变化时接着更新这些学生
+        if (self.changed_students or self.reload_pending) and self.isVisible():
+            self.change_timer.start()
+    
+    def onSearchError(self, request_id, message):
+        if request_id != self.search_serial:
+            return
+        self.search_worker = None
+        self.search_records = []
+        QMessageBox.critical(self, "错误", f"查询失败：{message}")
+    
+    def onDataChanged(self, change):
+        """记录数据有变化的学生，本页正在显示时随即更新，否则在切换到本页时更新"""
+        if self.loaded_filter is None and self.search_worker is None:
+            return
+        if change.reload:
+            self.reload_pending = True
+        elif change.student_ids:
+            self.changed_students.update(change.student_ids)
+        else:
+            return
+        if self.isVisible():
+            self.change_timer.start()
+    
+    def refreshIfChanged(self):
+        """尚未查询过时执行完整查询；否则只重新统计数据有变化的学生，没有变化时不查询"""
+        if self.loaded_filter is None:
+            if self.search_worker is None:
+                self.searchRecords()
+            return
+        if not (self.changed_students or self.reload_pending) or self.search_worker is not None:
+            return
+        
+        student_ids, self.changed_students = self.changed_students, set()
+        if self.reload_pending or len(student_ids) > INCREMENTAL_REFRESH_LIMIT:
+            self.startSearch(self.loaded_filter)
+            return
+        try:
+            records = self.repo.student_statistics(self.loaded_filter, student_ids)
+            self.mergeStudentRecords(student_ids, records)
+            # 更新后的表格即为当前数据下的查询结果，切换回这组筛选条件时可以直接使用
+            self.db.statistics_cache.put((self.loaded_filter, self.db.write_generation),
+                                         tuple(self.model.records))
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"查询失败：{str(e)}")
+    
+    def mergeStudentRecords(self, student_ids, records):
+        """用重新统计的结果更新这些学生的行：不再满足筛选条件的移除，新满足的按姓名顺序插入"""
+        updated = {record.student_id: record for record in records}
+        for row in reversed(range(self.model.rowCount())):
+            old_record = self.model.record(row)
+            if old_record.student_id not in student_ids:
+                continue
+            record = updated.get(old_record.student_id)
+            if record is not None and record.name == old_record.name:
+                self.model.replaceRecord(row, record)
+                del updated[record.student_id]
+            else:
+                self.model.removeRecord(row)
+        # 表格按姓名排序，在姓名列表中二分查找插入位置，并与表格同步插入
+        names = [record.name for record in self.model.records]
+        for record in updated.values():
+            row = bisect.bisect_right(names, record.name)
+            names.insert(row, record.name)
+            self.model.insertRecord(row, record)
+    
     def showStudentDetail(self):
         try:
-            row = self.table.currentRow()
-            if row < 0:
+            index = self.table.currentIndex()
+            if not index.isValid():
                 return
             
-            # 获取学生信息，包括存储在表格项中的学生ID
-            name_item = self.table.item(row, 0)
-            student_name = name_item.text()
-            student_id = name_item.data(Qt.UserRole)  # 获取存储的学生ID
-            grade_name = self.table.item(row, 2).text()
-            class_name = self.table.item(row, 3).text()
+            # 获取学生信息，记录中包含学生ID
+            record = self.model.record(self.proxy.mapToSource(index).row())
+            student_id, student_name = record.student_id, record.name
             
             # 创建详情对话框
             dialog = QDialog(self)
@@ -196,17 +292,7 @@ class StatisticsTab(QWidget):
             punishment_table.setSortingEnabled(True)
             
             # 查询处分记录 - 直接使用学生ID查询，避免同名问题
-            self.db.cursor.execute("""
-                SELECT pt.name, p.reason, p.date, p.required_points,
-                       CASE WHEN p.is_cleared = 1 THEN '已核销' ELSE '未核销' END,
-                       p.id, s.id
-                FROM punishments p
-                JOIN punishment_types pt ON p.type_id = pt.id
-                JOIN students s ON p.student_id = s.id
-                WHERE s.id = ?
-                ORDER BY p.date DESC
-            """, (student_id,))
-            punishments = self.db.cursor.fetchall()
+            punishments = self.repo.student_punishments(student_id)
             
             punishment_table.setRowCount(len(punishments))
             for row, record in enumerate(punishments):
@@ -217,7 +303,7 @@ class StatisticsTab(QWidget):
                         item.setData(Qt.DisplayRole, int(record[col]))
                     punishment_table.setItem(row, col, item)
                 # 存储处分ID和学生ID作为表格项的数据
-                punishment_table.item(row, 0).setData(Qt.UserRole, (record[5], record[6]))
+                punishment_table.item(row, 0).setData(Qt.UserRole, (record.id, student_id))
             
             # 活动记录表格
             activity_table = QTableWidget()
@@ -229,14 +315,7 @@ class StatisticsTab(QWidget):
             activity_table.setSortingEnabled(True)
             
             # 查询活动记录 - 直接使用学生ID查询，避免同名问题
-            self.db.cursor.execute("""
-                SELECT content, date, duration, points
-                FROM activities a
-                JOIN students s ON a.student_id = s.id
-                WHERE s.id = ?
-                ORDER BY date DESC
-            """, (student_id,))
-            activities = self.db.cursor.fetchall()
+            activities = self.repo.student_activities(student_id)
             
             activity_table.setRowCount(len(activities))
             for row, record in enumerate(activities):
@@ -297,45 +376,80 @@ class StatisticsTab(QWidget):
             if reply == QMessageBox.No:
                 return
             
-            # 检查公益积分是否足够
-            self.db.cursor.execute("""
-                SELECT 
-                    (SELECT COALESCE(SUM(points), 0) FROM activities WHERE student_id = ?) as earned_points,
-                    (SELECT required_points FROM punishments WHERE id = ?) as required_points
-            """, (student_id, punishment_id))
-            
-            points = self.db.cursor.fetchone()
-            if not points:
+            # 检查分配给该处分的公益积分是否足够
+            state = self.repo.clearance_state(punishment_id)
+            if not state:
                 QMessageBox.warning(self, "错误", "无法获取积分信息")
                 return
                 
-            earned_points, required_points = points
+            allocated_points, required_points = state.allocated_points, state.required_points
             
-            if earned_points < required_points:
-                QMessageBox.warning(self, "提示", f"公益积分不足，还需要{required_points - earned_points}分")
+            if allocated_points < required_points:
+                QMessageBox.warning(self, "提示", f"公益积分不足，还需要{required_points - allocated_points}分")
                 return
             
             # 只更新处分状态为已核销，不扣除活动积分
-            self.db.cursor.execute("""
-                UPDATE punishments
-                SET is_cleared = 1
-                WHERE id = ?
-            """, (punishment_id,))
+            self.repo.clear_punishment(punishment_id)
             
-            self.db.conn.commit()
-            
-            # 更新表格显示
+            # 更新表格显示，主表格中该学生的统计随数据变更通知更新
             status_item.setText("已核销")
-            self.searchRecords()  # 刷新主表格
             
             QMessageBox.information(self, "成功", "处分已成功核销")
             
         except Exception as e:
             QMessageBox.critical(self, "错误", f"核销处分失败：{str(e)}")
-            self.db.conn.rollback()
     
 
 
+    def batchClear(self):
+        try:
+            # 一次查询找出所有可核销的处分，预览后再统一核销
+            started_at = time.perf_counter()
+            eligible = self.repo.eligible_clearances()
+            elapsed = time.perf_counter() - started_at
+            
+            if not eligible:
+                QMessageBox.information(self, "提示", "没有可核销的处分")
+                return
+            
+            dialog = QDialog(self)
+            dialog.setWindowFlags(dialog.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+            dialog.setWindowTitle("批量核销")
+            dialog.setMinimumWidth(800)
+            layout = QVBoxLayout(dialog)
+            layout.addWidget(QLabel(f"以下 {len(eligible)} 条处分的已分配积分已达到核销所需积分（查询用时 {elapsed:.2f} 秒）："))
+            
+            # 记录为 repository.EligibleClearance：(处分ID, 姓名, 性别, 年级, 专业班级, 处分类型, 处分日期, 核销所需积分, 已分配积分)
+            model = RecordTableModel([Column(header, index) for index, header in enumerate(
+                ["姓名", "性别", "年级", "专业班级", "处分类型", "处分日期", "核销所需积分", "已分配积分"], 1)])
+            model.setRecords(eligible)
+            table, _ = createRecordView(model)
+            table.setSortingEnabled(True)
+            layout.addWidget(table)
+            
+            button_layout = QHBoxLayout()
+            button_layout.addStretch()
+            apply_btn = QPushButton("全部核销")
+            apply_btn.clicked.connect(dialog.accept)
+            button_layout.addWidget(apply_btn)
+            cancel_btn = QPushButton("取消")
+            cancel_btn.clicked.connect(dialog.reject)
+            button_layout.addWidget(cancel_btn)
+            layout.addLayout(button_layout)
+            
+            if dialog.exec_() != QDialog.Accepted:
+                return
+            
+            # 在一个事务中核销，预览后积分发生变化而不再满足条件的处分不会核销
+            started_at = time.perf_counter()
+            cleared = self.repo.apply_clearances([record.id for record in eligible])
+            elapsed = time.perf_counter() - started_at
+            
+            QMessageBox.information(self, "成功", f"已核销 {cleared} 条处分，用时 {elapsed:.2f} 秒")
+            
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"批量核销失败：{str(e)}")
+    
     def onHeaderClicked(self, logical_index):
         if self.current_sort_column == logical_index:
             # 同一列的点击，切换排序状态
@@ -346,14 +460,18 @@ class StatisticsTab(QWidget):
             self.sort_order = 1
 
         if self.sort_order == 0:
-            # 恢复初始排序（按姓名排序）
-            self.table.sortItems(0)
+            # 恢复查询结果的初始顺序（按姓名排序）
+            self.proxy.sort(-1)
         else:
             # 根据点击的列进行排序
-            self.table.sortItems(logical_index, Qt.AscendingOrder if self.sort_order == 1 else Qt.DescendingOrder)
+            self.proxy.sort(logical_index, Qt.AscendingOrder if self.sort_order == 1 else Qt.DescendingOrder)
     
     def exportToExcel(self):
         try:
+            if self.export_runner.isRunning():
+                QMessageBox.information(self, "提示", "正在导出，请稍候")
+                return
+            
             # 获取保存文件路径
             file_name = f"学生处分核销统计_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
             save_path, _ = QFileDialog.getSaveFileName(self, "保存Excel文件", file_name, "Excel文件 (*.xlsx)")
@@ -361,91 +479,42 @@ class StatisticsTab(QWidget):
             if not save_path:
                 return
             
-            # 创建Excel工作簿
-            wb = openpyxl.Workbook()
-            
-            # 创建学生统计表
-            ws_stats = wb.active
-            ws_stats.title = "学生统计"
-            
-            # 设置表头
-            headers = ["姓名", "性别", "年级", "专业班级", "核销所需积分", "已获得积分", "尚需积分", "状态"]
-            for col, header in enumerate(headers, 1):
-                cell = ws_stats.cell(row=1, column=col)
-                cell.value = header
-                cell.font = Font(bold=True)
-                cell.alignment = Alignment(horizontal='center')
-            
-            # 写入学生统计数据
-            for row in range(self.table.rowCount()):
-                for col in range(self.table.columnCount()):
-                    cell = ws_stats.cell(row=row+2, column=col+1)
-                    cell.value = self.table.item(row, col).text()
-                    cell.alignment = Alignment(horizontal='center')
-            
-            # 创建处分记录表
-            ws_punishments = wb.create_sheet("处分记录")
-            ws_punishments.append(["姓名", "处分类型", "处分原因", "处分日期", "核销所需积分", "状态"])
-            
-            # 查询处分记录
-            self.db.cursor.execute("""
-                SELECT s.name, pt.name, p.reason, p.date, p.required_points,
-                       CASE WHEN p.is_cleared = 1 THEN '已核销' ELSE '未核销' END
-                FROM punishments p
-                JOIN students s ON p.student_id = s.id
-                JOIN punishment_types pt ON p.type_id = pt.id
-                ORDER BY s.name, p.date DESC
-            """)
-            
-            for record in self.db.cursor.fetchall():
-                ws_punishments.append(record)
-            
-            # 创建活动记录表
-            ws_activities = wb.create_sheet("公益活动记录")
-            ws_activities.append(["姓名", "活动内容", "活动日期", "活动时长", "获得积分"])
-            
-            # 查询活动记录
-            self.db.cursor.execute("""
-                SELECT s.name, a.content, a.date, a.duration, a.points
-                FROM activities a
-                JOIN students s ON a.student_id = s.id
-                ORDER BY s.name, a.date DESC
-            """)
-            
-            for record in self.db.cursor.fetchall():
-                ws_activities.append(record)
-            
-            # 调整列宽
-            for ws in [ws_stats, ws_punishments, ws_activities]:
-                for column in ws.columns:
-                    max_length = 0
-                    column = list(column)
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = (max_length + 2)
-                    ws.column_dimensions[column[0].column_letter].width = adjusted_width
-            
-            # 保存文件
-            wb.save(save_path)
-            QMessageBox.information(self, "成功", "Excel文件导出成功！")
+            # 学生统计表按当前筛选条件重新查询，并按表格当前的排序顺序导出
+            sort_column = self.current_sort_column if self.sort_order != 0 else -1
+            stats, punishments, activities = self.repo.statistics_export_queries(
+                self.currentFilter(), sort_column, self.sort_order == 2)
+            
+            sheets = [
+                SheetSpec("学生统计",
+                          ["姓名", "性别", "年级", "专业班级", "核销所需积分", "已获得积分", "尚需积分", "状态"],
+                          stats.sql, stats.params, centered=True),
+                SheetSpec("处分记录",
+                          ["姓名", "处分类型", "处分原因", "处分日期", "核销所需积分", "状态"],
+                          punishments.sql, punishments.params),
+                SheetSpec("公益活动记录",
+                          ["姓名", "活动内容", "活动日期", "活动时长", "获得积分"],
+                          activities.sql, activities.params),
+            ]
+            
+            # 在后台线程中流式写入文件，进度对话框可取消导出
+            self.export_runner.start(self.db, lambda conn, progress, is_cancelled: export_workbook(
+                conn, save_path, sheets, progress, is_cancelled), "Excel文件导出成功！")
             
         except Exception as e:
             QMessageBox.critical(self, "错误", f"导出Excel失败：{str(e)}")
-
+    
     def deleteStudent(self):
         try:
             # 获取当前选中的行
-            row = self.table.currentRow()
-            if row < 0:
+            index = self.table.currentIndex()
+            if not index.isValid():
                 QMessageBox.warning(self, "错误", "请选择要删除的学生")
                 return
             
-            # 获取学生姓名
-            student_name = self.table.item(row, 0).text()
+            # 获取学生信息，按学生ID删除，避免删除同名的其他学生
+            row = self.proxy.mapToSource(index).row()
+            record = self.model.record(row)
+            student_name = record.name
             
             # 确认删除
             reply = QMessageBox.question(self, "确认", f"确定要删除学生 {student_name} 的所有记录吗？\n此操作将删除该学生的所有处分记录和公益活动记录。",
@@ -454,27 +523,13 @@ class StatisticsTab(QWidget):
             if reply == QMessageBox.No:
                 return
             
-            # 获取学生ID
-            self.db.cursor.execute("SELECT id FROM students WHERE name = ?", (student_name,))
-            student = self.db.cursor.fetchone()
-            if not student:
-                QMessageBox.warning(self, "错误", "找不到该学生的记录")
-                return
-            
-            student_id = student[0]
-            
             # 删除该学生的所有记录
-            self.db.cursor.execute("DELETE FROM activities WHERE student_id = ?", (student_id,))
-            self.db.cursor.execute("DELETE FROM punishments WHERE student_id = ?", (student_id,))
-            self.db.cursor.execute("DELETE FROM students WHERE id = ?", (student_id,))
-            
-            self.db.conn.commit()
+            self.repo.delete_student(record.student_id)
             
             # 从表格中移除该行
-            self.table.removeRow(row)
+            self.model.removeRecord(row)
             
             QMessageBox.information(self, "成功", f"已删除学生 {student_name} 的所有记录")
             
         except Exception as e:
-            self.db.conn.rollback()
             QMessageBox.critical(self, "错误", f"删除记录失败：{str(e)}")
\ No newline at end of file
@@ -0,0 +1,334 @@
+import sqlite3
+import threading
+
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtWidgets import QMessageBox, QProgressDialog
+
+# 列表分页加载时每页的记录数
+PAGE_SIZE = 200
+# 按相关度排序的关键词搜索最多显示的记录数
+SEARCH_RESULT_LIMIT = 500
+# 边输入边查询时，停止输入多少毫秒后开始查询
+SEARCH_DELAY_MS = 250
+
+
+class QuerySignals(QObject):
+    # 每个信号都带有请求编号，界面据此丢弃过期查询的结果
+    rows = pyqtSignal(int, list)      # (请求编号, 一批记录)
+    finished = pyqtSignal(int, int)   # (请求编号, 记录总数)
+    error = pyqtSignal(int, str)      # (请求编号, 错误信息)
+
+
+class QueryWorker(QRunnable):
+    """在 QThreadPool 中执行只读查询，并分批通过信号把结果送回界面线程
+
+    query 为 repository.Query；指定了 row_type 时每行转换为该类型再送回。
+    """
+
+    def __init__(self, db, query, request_id, batch_size=500):
+        super().__init__()
+        self.db = db
+        self.query = query
+        self.request_id = request_id
+        self.batch_size = batch_size
+        self.signals = QuerySignals()
+        self._cancelled = threading.Event()
+        self._conn = None
+        self._conn_lock = threading.Lock()
+
+    def cancel(self):
+        """取消查询：尚未开始的不再执行，正在执行的语句被中断"""
+        self._cancelled.set()
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def isCancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        if self.isCancelled():
+            return
+        try:
+            with self.db.reader() as conn:
+                with self._conn_lock:
+                    self._conn = conn
+                try:
+                    total = 0
+                    row_type = self.query.row_type
+                    cursor = conn.execute(self.query.sql, self.query.params)
+                    while not self.isCancelled():
+                        batch = cursor.fetchmany(self.batch_size)
+                        if not batch:
+                            break
+                        if row_type is not None:
+                            batch = [row_type._make(row) for row in batch]
+                        total += len(batch)
+                        self.signals.rows.emit(self.request_id, batch)
+                    cursor.close()
+                finally:
+                    with self._conn_lock:
+                        self._conn = None
+            if not self.isCancelled():
+                self.signals.finished.emit(self.request_id, total)
+        except sqlite3.OperationalError as e:
+            # 被 cancel() 中断的查询不算错误
+            if not self.isCancelled():
+                self.signals.error.emit(self.request_id, str(e))
+        except Exception as e:
+            self.signals.error.emit(self.request_id, str(e))
+
+
+class PagedQueryLoader(QObject):
+    """按键集分页把列表查询结果加载到 PagedRecordModel
+
+    statement 为 repository.PagedStatement，记录按其键列降序排列；
+    每页的查询由 statement.page 以当前筛选条件和已加载的最后一条记录生成。
+    """
+
+    # (本页记录数, 已加载记录数)
+    pageLoaded = pyqtSignal(int, int)
+    error = pyqtSignal(str)
+
+    def __init__(self, db, model, statement, filters, page_size=PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.model = model
+        self.statement = statement
+        self.page_size = page_size
+        self.filters = filters
+        self.serial = 0
+        self.worker = None
+        self.paged = True
+        self.search_query = None
+        self.model.moreRequested.connect(self.loadNextPage)
+
+    def cancel(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+
+    def start(self, filters):
+        """以新的筛选条件（repository.FilterBuilder）重新加载，取消仍在进行的查询"""
+        self.reset(filters)
+        self.paged = True
+        self.loadNextPage()
+
+    def loadAll(self, query, filters):
+        """不分页地加载一个完整的查询，如按相关度排序的关键词搜索结果
+
+        filters 为与该查询结果等价的筛选条件，供导出等需要按当前筛选条件
+        重新查询的地方使用。
+        """
+        self.reset(filters)
+        self.paged = False
+        self.search_query = query
+        self.run(query, SEARCH_RESULT_LIMIT)
+
+    def reload(self):
+        """以当前的筛选条件或搜索查询从头重新加载"""
+        if self.paged:
+            self.start(self.filters)
+        else:
+            self.loadAll(self.search_query, self.filters)
+
+    def reset(self, filters):
+        self.cancel()
+        self.serial += 1
+        self.filters = filters
+        self.model.clear()
+        self.model.loading = True
+
+    def loadNextPage(self):
+        query = self.statement.page(self.filters, self.model.lastKey(), self.page_size)
+        self.run(query, self.page_size)
+
+    def insertRecord(self, record):
+        """把新写入的记录插入到重新加载时它应在的位置，返回所在行
+
+        分页加载时按键找到位置，位置在已加载的页之后时不插入，由之后的分页加载；
+        不分页的搜索结果放在最前面。列表仍在加载时改为重新加载，返回 None。
+        """
+        if self.model.loading:
+            self.reload()
+            return None
+        if self.paged:
+            row = self.model.keyPosition(self.model.key(record))
+            if row == self.model.rowCount() and self.model.has_more:
+                return None
+        else:
+            row = 0
+        self.model.insertRecord(row, record)
+        return row
+
+    def updateRecord(self, row, record):
+        """用修改后的记录替换第 row 行，返回其新的所在行
+
+        record 为 None（记录已不满足筛选条件）时移除该行；排序键变化时移到新的位置。
+        """
+        if record is None:
+            self.model.removeRecord(row)
+            return None
+        if not self.paged or self.model.key(record) == self.model.key(self.model.record(row)):
+            self.model.replaceRecord(row, record)
+            return row
+        self.model.removeRecord(row)
+        return self.insertRecord(record)
+
+    def mergeRecords(self, record_ids, records):
+        """把按ID重新查询的记录合并到列表中
+
+        record_ids 为有变化的记录ID，records 为其中仍满足筛选条件的记录：
+        已加载的行原位替换或移除，新满足条件的记录插入到应在的位置。
+        """
+        if self.model.loading:
+            # 正在进行的查询可能读不到这些变化，重新加载
+            self.reload()
+            return
+        updated = {record.id: record for record in records}
+        for row in reversed(range(self.model.rowCount())):
+            old_record = self.model.record(row)
+            if old_record.id not in record_ids:
+                continue
+            record = updated.get(old_record.id)
+            if record is not None and (not self.paged or self.model.key(record) == self.model.key(old_record)):
+                self.model.replaceRecord(row, record)
+                del updated[record.id]
+            else:
+                self.model.removeRecord(row)
+        for record in updated.values():
+            self.insertRecord(record)
+
+    def run(self, query, batch_size):
+        worker = QueryWorker(self.db, query, self.serial, batch_size=batch_size)
+        worker.signals.rows.connect(self.onRows)
+        worker.signals.finished.connect(self.onFinished)
+        worker.signals.error.connect(self.onError)
+        self.worker = worker
+        QThreadPool.globalInstance().start(worker)
+
+    def onRows(self, request_id, records):
+        if request_id != self.serial:
+            return
+        self.model.appendRecords(records)
+
+    def onFinished(self, request_id, total):
+        if request_id != self.serial:
+            return
+        self.worker = None
+        self.model.loading = False
+        self.model.has_more = self.paged and total == self.page_size
+        self.pageLoaded.emit(total, self.model.rowCount())
+
+    def onError(self, request_id, message):
+        if request_id != self.serial:
+            return
+        self.worker = None
+        self.model.loading = False
+        self.model.has_more = False
+        self.error.emit(message)
+
+
+class ExportSignals(QObject):
+    progress = pyqtSignal(int, int)   # (已导出行数, 总行数)
+    finished = pyqtSignal(int)        # 导出的行数
+    cancelled = pyqtSignal()
+    error = pyqtSignal(str)
+
+
+class ExportWorker(QRunnable):
+    """在 QThreadPool 中执行导出
+
+    export 为 export(conn, progress, is_cancelled) 形式的函数，使用只读连接
+    从数据库读取数据写入文件并返回导出的行数，例如绑定了文件路径和
+    工作表定义的 utils.exporter.export_workbook。
+    """
+
+    def __init__(self, db, export):
+        super().__init__()
+        self.db = db
+        self.export = export
+        self.signals = ExportSignals()
+        self._cancelled = threading.Event()
+        self._conn = None
+        self._conn_lock = threading.Lock()
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def isCancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        try:
+            with self.db.reader() as conn:
+                with self._conn_lock:
+                    self._conn = conn
+                try:
+                    total = self.export(conn, self.signals.progress.emit, self.isCancelled)
+                finally:
+                    with self._conn_lock:
+                        self._conn = None
+            self.signals.finished.emit(total)
+        except Exception as e:
+            # 取消时正在执行的语句被中断，也按取消处理
+            if self.isCancelled():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.error.emit(str(e))
+
+
+class ExportRunner(QObject):
+    """在后台线程中执行导出，显示可取消的进度对话框并在结束时提示结果"""
+
+    def __init__(self, parent, title):
+        super().__init__(parent)
+        self.parent_widget = parent
+        self.title = title
+        self.worker = None
+        self.dialog = None
+        self.success_message = ""
+
+    def isRunning(self):
+        return self.worker is not None
+
+    def start(self, db, export, success_message):
+        self.success_message = success_message
+        self.dialog = QProgressDialog(f"正在{self.title}...", "取消", 0, 0, self.parent_widget)
+        self.dialog.setWindowTitle(self.title)
+        self.dialog.setWindowModality(Qt.WindowModal)
+        self.dialog.setAutoClose(False)
+        self.dialog.setAutoReset(False)
+        self.dialog.setMinimumDuration(500)
+        
+        worker = ExportWorker(db, export)
+        worker.signals.progress.connect(self.onProgress)
+        worker.signals.finished.connect(self.onFinished)
+        worker.signals.cancelled.connect(self.onCancelled)
+        worker.signals.error.connect(self.onError)
+        self.dialog.canceled.connect(worker.cancel)
+        self.worker = worker
+        QThreadPool.globalInstance().start(worker)
+
+    def onProgress(self, done, total):
+        self.dialog.setMaximum(max(total, 1))
+        self.dialog.setValue(done)
+
+    def end(self):
+        self.worker = None
+        self.dialog.close()
+
+    def onFinished(self, total):
+        self.end()
+        QMessageBox.information(self.parent_widget, "成功", self.success_message)
+
+    def onCancelled(self):
+        self.end()
+        QMessageBox.information(self.parent_widget, "提示", f"已取消{self.title}")
+
+    def onError(self, message):
+        self.end()
+        QMessageBox.critical(self.parent_widget, "错误", f"{self.title}失败：{message}")
@@ -1,12 +1,46 @@
 import os
+import threading
+
+GRADE_FILE_NAME = '年级.txt'
+MAJOR_FILE_NAME = '专业.txt'
 
 class DataManager:
+    # 年级.txt 和 专业.txt 所在目录，Database 初始化时设为数据库文件所在目录
+    data_dir = 'data'
+    # 年级和专业数据的进程内缓存，文本文件的修改时间变化后才重新读取
+    _lock = threading.Lock()
+    _mtimes = None
+    _grades = None
+    _classes = None
+
+    @classmethod
+    def set_data_dir(cls, data_dir):
+        with cls._lock:
+            cls.data_dir = data_dir
+            cls._grades = None
+            cls._classes = None
+            cls._mtimes = None
+
+    @classmethod
+    def _file_paths(cls):
+        return (os.path.join(cls.data_dir, GRADE_FILE_NAME),
+                os.path.join(cls.data_dir, MAJOR_FILE_NAME))
+
+    @classmethod
+    def _file_mtimes(cls):
+        mtimes = []
+        for file_path in cls._file_paths():
+            try:
+                mtimes.append(os.path.getmtime(file_path))
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
     @staticmethod
-    def load_grades():
-        """从文本文件加载年级数据"""
+    def _read_grades(grade_file):
+        """从文本文件读取年级数据，年级ID为所在行号"""
         grades = []
         try:
-            grade_file = os.path.join('data', '年级.txt')
             with open(grade_file, 'r', encoding='utf-8') as f:
                 for i, line in enumerate(f.readlines(), 1):
                     grade_name = line.strip()
@@ -17,27 +51,54 @@ class DataManager:
         return grades
 
     @staticmethod
-    def load_classes():
-        """从文本文件加载专业班级数据"""
+    def _read_classes(major_file, grades):
+        """从文本文件读取专业，为每个专业创建与所有年级的关联"""
         classes = []
         try:
-            # 加载专业班级数据
-            major_file = os.path.join('data', '专业.txt')
             with open(major_file, 'r', encoding='utf-8') as f:
                 class_id = 1
-                # 获取所有年级
-                grades = DataManager.load_grades()
                 grade_ids = [grade_id for grade_id, _ in grades]
-                
+
                 for line in f.readlines():
                     major = line.strip()
                     if major:
-                        # 为每个专业创建与所有年级的关联
                         for grade_id in grade_ids:
                             class_name = f"{major}"
                             classes.append((class_id, grade_id, major, class_name))
                             class_id += 1
-                    
+
         except Exception as e:
             print(f"加载专业班级数据失败：{str(e)}")
-        return classes
\ No newline at end of file
+        return classes
+
+    @classmethod
+    def refresh(cls, force=False):
+        """检查文本文件的修改时间，有变化时重新读取"""
+        mtimes = cls._file_mtimes()
+        with cls._lock:
+            if not force and cls._grades is not None and mtimes == cls._mtimes:
+                return
+            grade_file, major_file = cls._file_paths()
+            grades = cls._read_grades(grade_file)
+            classes = cls._read_classes(major_file, grades)
+            cls._grades = grades
+            cls._classes = classes
+            cls._mtimes = mtimes
+
+    @classmethod
+    def load_grades(cls):
+        """加载年级数据，返回 [(年级ID, 年级名称), ...]"""
+        cls.refresh()
+        return list(cls._grades)
+
+    @classmethod
+    def load_classes(cls):
+        """加载专业班级数据，返回 [(专业班级ID, 年级ID, 专业, 班级名称), ...]"""
+        cls.refresh()
+        return list(cls._classes)
+
+    @classmethod
+    def version(cls):
+        """返回两个文本文件的修改时间，用于判断是否需要重新同步到数据库"""
+        cls.refresh()
+        return cls._mtimes
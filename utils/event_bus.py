@@ -0,0 +1,51 @@
+"""进程内的数据变更通知
+
+写操作提交后发布 DataChange，说明哪些学生、处分和公益活动记录发生了变化；
+界面各部分订阅后只更新受影响的数据，不必重新查询全部记录。
+"""
+import threading
+from typing import FrozenSet, NamedTuple
+
+
+class DataChange(NamedTuple):
+    """一次已提交的数据变更，各字段为受影响记录的ID集合"""
+    student_ids: FrozenSet[int] = frozenset()
+    punishment_ids: FrozenSet[int] = frozenset()
+    activity_ids: FrozenSet[int] = frozenset()
+    # 发布变更的对象（如 repository.Repository），订阅者据此忽略自己发出的变更
+    source: object = None
+    # 变更过多或无法确定变更了哪些记录，订阅者应完整重新加载
+    reload: bool = False
+
+
+class EventBus:
+    """数据变更的发布和订阅
+
+    回调在发布者的线程中按订阅顺序同步调用；写操作都在界面线程中执行，
+    因此界面部件可以直接在回调中更新自身。单个回调出错不影响其他订阅者。
+    generation 在每次发布时加一（在调用回调之前），用于判断缓存的结果是否过期。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self.generation = 0
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, change):
+        with self._lock:
+            self.generation += 1
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(change)
+            except Exception as e:
+                print(f"处理数据变更通知失败: {str(e)}")
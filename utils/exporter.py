@@ -0,0 +1,185 @@
+import csv
+import gzip
+import os
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment
+from openpyxl.utils import get_column_letter
+
+# 每次从游标读取并写入文件的行数
+EXPORT_BATCH_SIZE = 1000
+# 列宽上限，避免个别超长文本（如处分原因）把整列撑得过宽
+MAX_COLUMN_WIDTH = 60
+
+
+class ExportCancelled(Exception):
+    """导出过程中被用户取消"""
+
+
+class SheetSpec:
+    """一个工作表的导出定义
+
+    query 为产生数据行的 SELECT 语句，列的顺序与 headers 一致；
+    centered 为 True 时数据单元格居中显示。
+    """
+
+    def __init__(self, title, headers, query, params=(), centered=False):
+        self.title = title
+        self.headers = headers
+        self.query = query
+        self.params = list(params)
+        self.centered = centered
+
+
+def sheet_summary(conn, sheet):
+    """用一条聚合查询取得工作表的行数和各列宽度，返回 (行数, [列宽, ...])
+
+    列宽取表头和该列最长文本中较长者再加 2，与逐个单元格计算的结果相同，
+    但计算在 SQLite 中完成，不需要把数据读到 Python 中扫描。
+    """
+    columns = [f"c{i}" for i in range(len(sheet.headers))]
+    lengths = ", ".join(f"MAX(LENGTH(CAST({column} AS TEXT)))" for column in columns)
+    row = conn.execute(f"""
+        WITH q({', '.join(columns)}) AS ({sheet.query})
+        SELECT COUNT(*), {lengths} FROM q
+    """, sheet.params).fetchone()
+    widths = [min(max(len(header), length or 0) + 2, MAX_COLUMN_WIDTH)
+              for header, length in zip(sheet.headers, row[1:])]
+    return row[0], widths
+
+
+def check_cancelled(is_cancelled):
+    if is_cancelled is not None and is_cancelled():
+        raise ExportCancelled()
+
+
+def export_workbook(conn, path, sheets, progress=None, is_cancelled=None,
+                    batch_size=EXPORT_BATCH_SIZE):
+    """把各工作表的查询结果以只写模式流式写入 Excel 文件，返回写入的数据行数
+
+    数据按批从游标读取后直接追加到工作表，不在内存中保留整个工作簿。
+    所有查询在同一个读事务中执行，各工作表看到的是同一时刻的数据。
+    progress(已写入行数, 总行数) 在每批写入后调用；is_cancelled() 返回 True 时
+    抛出 ExportCancelled，此时不会生成文件。
+    """
+    conn.execute("BEGIN")
+    try:
+        summaries = [sheet_summary(conn, sheet) for sheet in sheets]
+        total = sum(count for count, _ in summaries)
+        done = 0
+        if progress is not None:
+            progress(done, total)
+        
+        wb = Workbook(write_only=True)
+        try:
+            done = _write_sheets(conn, wb, sheets, summaries, done, total,
+                                 progress, is_cancelled, batch_size)
+        except BaseException:
+            # 放弃导出时结束各工作表的临时文件写入，不生成目标文件
+            for ws in wb.worksheets:
+                try:
+                    ws.close()
+                except Exception:
+                    pass
+            raise
+        wb.save(path)
+        return done
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+
+
+def _write_sheets(conn, wb, sheets, summaries, done, total, progress, is_cancelled, batch_size):
+    """依次创建工作表并按批写入查询结果，返回累计写入的行数"""
+    header_font = Font(bold=True)
+    center = Alignment(horizontal='center')
+    
+    for sheet, (_, widths) in zip(sheets, summaries):
+        ws = wb.create_sheet(sheet.title)
+        # 只写模式下列宽必须在写入第一行之前设置
+        for col, width in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        
+        header_cells = []
+        for header in sheet.headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = header_font
+            cell.alignment = center
+            header_cells.append(cell)
+        ws.append(header_cells)
+        
+        cursor = conn.execute(sheet.query, sheet.params)
+        while True:
+            check_cancelled(is_cancelled)
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            for record in batch:
+                if sheet.centered:
+                    row = []
+                    for value in record:
+                        cell = WriteOnlyCell(ws, value=value)
+                        cell.alignment = center
+                        row.append(cell)
+                    ws.append(row)
+                else:
+                    ws.append(record)
+            done += len(batch)
+            if progress is not None:
+                progress(done, total)
+    
+    check_cancelled(is_cancelled)
+    return done
+
+
+def count_rows(conn, query, params=()):
+    """返回查询结果的行数，用于显示导出进度"""
+    return conn.execute(f"SELECT COUNT(*) FROM ({query})", list(params)).fetchone()[0]
+
+
+def export_csv(conn, path, sheet, progress=None, is_cancelled=None,
+               batch_size=EXPORT_BATCH_SIZE):
+    """把查询结果按批写入 CSV 文件，路径以 .gz 结尾时写入 gzip 压缩文件，返回写入的数据行数
+
+    文件使用带 BOM 的 UTF-8 编码，Excel 直接打开时中文不会乱码。
+    取消导出时删除已写入一部分的文件。
+    """
+    opener = gzip.open if path.lower().endswith(".gz") else open
+    conn.execute("BEGIN")
+    try:
+        total = count_rows(conn, sheet.query, sheet.params)
+        done = 0
+        if progress is not None:
+            progress(done, total)
+        
+        try:
+            with opener(path, "wt", encoding="utf-8-sig", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(sheet.headers)
+                cursor = conn.execute(sheet.query, sheet.params)
+                while True:
+                    check_cancelled(is_cancelled)
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    writer.writerows(batch)
+                    done += len(batch)
+                    if progress is not None:
+                        progress(done, total)
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        return done
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+
+
+def export_table(conn, path, sheet, progress=None, is_cancelled=None,
+                 batch_size=EXPORT_BATCH_SIZE):
+    """按文件扩展名把一个查询导出为 .xlsx、.csv 或 .csv.gz 文件，返回写入的数据行数"""
+    if path.lower().endswith(".xlsx"):
+        return export_workbook(conn, path, [sheet], progress, is_cancelled, batch_size)
+    return export_csv(conn, path, sheet, progress, is_cancelled, batch_size)
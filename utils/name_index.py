@@ -0,0 +1,66 @@
+import bisect
+import threading
+
+
+class NameIndex:
+    """学生姓名的内存前缀索引
+
+    姓名按字符顺序保存在有序列表中，前缀查找用二分法定位，新增姓名时插入到
+    对应位置，不需要重新排序。listeners 中的函数在插入新姓名后以 (位置, 姓名)
+    调用，remove_listeners 中的函数在删除姓名后以 (位置, 姓名) 调用，供界面上的
+    自动补全模型同步插入和删除。
+    """
+
+    def __init__(self, names=()):
+        self._lock = threading.Lock()
+        self._names = sorted(set(names))
+        self.listeners = []
+        self.remove_listeners = []
+
+    def __len__(self):
+        return len(self._names)
+
+    def names(self):
+        with self._lock:
+            return list(self._names)
+
+    def add(self, name):
+        """加入一个姓名，已存在时不做修改；返回插入的位置，已存在时返回 None"""
+        with self._lock:
+            position = bisect.bisect_left(self._names, name)
+            if position < len(self._names) and self._names[position] == name:
+                return None
+            self._names.insert(position, name)
+        for listener in self.listeners:
+            listener(position, name)
+        return position
+
+    def remove(self, name):
+        """删除一个姓名，不存在时不做修改；返回删除的位置，不存在时返回 None"""
+        with self._lock:
+            position = bisect.bisect_left(self._names, name)
+            if position >= len(self._names) or self._names[position] != name:
+                return None
+            del self._names[position]
+        for listener in self.remove_listeners:
+            listener(position, name)
+        return position
+
+    def _range(self, prefix):
+        start = bisect.bisect_left(self._names, prefix)
+        end = bisect.bisect_left(self._names, prefix + "\U0010ffff", start)
+        return start, end
+
+    def prefixed(self, prefix, limit=None):
+        """返回以 prefix 开头的姓名，按字符顺序排列，最多 limit 个"""
+        with self._lock:
+            start, end = self._range(prefix)
+            if limit is not None:
+                end = min(end, start + limit)
+            return self._names[start:end]
+
+    def count(self, prefix):
+        """返回以 prefix 开头的不同姓名的数量，只做两次二分查找"""
+        with self._lock:
+            start, end = self._range(prefix)
+            return end - start
@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+
+# 默认最多缓存的查询结果数
+RESULT_CACHE_SIZE = 32
+
+
+class ResultCache:
+    """按最近使用顺序淘汰的查询结果缓存
+
+    键中包含 Database.write_generation，数据修改后旧键不会再被命中，
+    随后按最近使用顺序被淘汰，因此不会返回过期的结果。缓存的结果应为
+    不可变对象（如元组）。hits 和 misses 记录命中情况，在诊断对话框中显示。
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key):
+        """返回缓存的结果并标记为最近使用，没有时返回 None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0